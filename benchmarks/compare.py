@@ -0,0 +1,66 @@
+"""Compare two results files of benchmarks/run.py.
+
+    python benchmarks/compare.py before.json after.json --threshold 1.1
+
+Prints the time and peak RSS ratios (after / before) of the cases found in both
+files, and exits with an error code if a case is slower than the threshold.
+"""
+import argparse
+import json
+import sys
+
+_KEY = ("benchmark", "n_points", "point_format", "kind", "extra_dims")
+
+
+def load(path) -> tuple:
+    with open(path) as f:
+        content = json.load(f)
+    results = {tuple(r[k] for k in _KEY): r for r in content["results"]}
+    return content["meta"], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.1,
+        help="time ratio above which a case is reported as a regression",
+    )
+    args = parser.parse_args()
+
+    meta_before, before = load(args.before)
+    meta_after, after = load(args.after)
+    print(f"before: {meta_before['commit']}, after: {meta_after['commit']}")
+    print(f"{'case':<60} {'time':>7} {'rss':>7}")
+
+    regressions = 0
+    for key in sorted(before.keys() & after.keys(), key=str):
+        time_ratio = after[key]["seconds"] / before[key]["seconds"]
+        rss_ratio = ratio(after[key]["peak_rss_mb"], before[key]["peak_rss_mb"])
+        flag = ""
+        if time_ratio > args.threshold:
+            flag = "  slower"
+            regressions += 1
+        benchmark, n_points, point_format, kind, extra_dims = key
+        name = f"{benchmark} n={n_points} format={point_format} {kind or '-'}"
+        name += f" extra={extra_dims}"
+        print(f"{name:<60} {time_ratio:>7.2f} {rss_ratio:>7}{flag}")
+
+    missing = before.keys() ^ after.keys()
+    if missing:
+        print(f"{len(missing)} cases are only in one of the files")
+
+    sys.exit(1 if regressions else 0)
+
+
+def ratio(after, before) -> str:
+    if after is None or before is None:
+        return "-"
+    return f"{after / before:.2f}"
+
+
+if __name__ == "__main__":
+    main()
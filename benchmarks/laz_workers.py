@@ -0,0 +1,49 @@
+"""Throughput of LAZ compression and decompression depending on the workers.
+
+    python benchmarks/laz_workers.py --points 20000000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import jaklas
+from synthetic import synthetic_cloud
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=5_000_000)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()]
+    )
+    args = parser.parse_args()
+
+    data = synthetic_cloud(args.points, point_format=1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "bench.laz"
+        print(f"{args.points} points, {os.cpu_count()} cpus")
+        columns = ("workers", "write s", "Mpts/s", "read s", "Mpts/s")
+        print(" ".join(f"{c:>9}" for c in columns))
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            jaklas.write(data, path, workers=workers)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            jaklas.read(path, workers=workers)
+            read_time = time.perf_counter() - start
+
+            values = (
+                write_time,
+                args.points / write_time / 1e6,
+                read_time,
+                args.points / read_time / 1e6,
+            )
+            print(f"{workers:>9} " + " ".join(f"{v:>9.2f}" for v in values))
+
+
+if __name__ == "__main__":
+    main()
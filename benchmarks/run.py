@@ -0,0 +1,279 @@
+"""Benchmark suite of jaklas on synthetic point clouds.
+
+Each case runs in a fresh python process, so that its peak RSS is measured
+independently of the other cases. Results are saved as json, with the commit
+and the versions of the dependencies, to be compared with compare.py:
+
+    python benchmarks/run.py --counts 1e4 1e6 1e7 --output before.json
+    git checkout my-branch
+    python benchmarks/run.py --counts 1e4 1e6 1e7 --output after.json
+    python benchmarks/compare.py before.json after.json
+
+Input files are generated in --workdir, which can be reused between runs
+to avoid generating large files again.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+import jaklas
+from jaklas import point_formats
+from jaklas.__about__ import __version__
+from synthetic import synthetic_cloud
+
+BENCHMARKS = [
+    "write",
+    "read",
+    "read_pandas",
+    "read_header",
+    "laspy_read_header",
+    "best_point_format",
+]
+
+# these benchmarks don't depend on the file being compressed
+_NOT_FILE_BENCHMARKS = ["best_point_format"]
+
+# headers are fast to read, time many of them to get a stable measure
+_HEADER_CALLS = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--counts",
+        type=lambda value: int(float(value)),
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="numbers of points, like 1e4 1e8",
+    )
+    parser.add_argument(
+        "--formats",
+        type=int,
+        nargs="+",
+        default=point_formats.supported_point_formats,
+        choices=point_formats.supported_point_formats,
+        help="point formats (jaklas doesn't write formats 4 and 5)",
+    )
+    parser.add_argument("--kinds", nargs="+", default=["las", "laz"])
+    parser.add_argument(
+        "--extra-dims",
+        type=int,
+        nargs="+",
+        default=[0, 4],
+        help="numbers of float32 extra dimensions",
+    )
+    parser.add_argument(
+        "--benchmarks", nargs="+", default=BENCHMARKS, choices=BENCHMARKS
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="the best is kept")
+    parser.add_argument("--workdir", type=Path, help="where input files are written")
+    parser.add_argument("--output", type=Path, help="defaults to results/<commit>.json")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # child process running a single case
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    meta = metadata()
+    output = args.output or Path(__file__).parent / "results" / f"{meta['commit']}.json"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workdir = args.workdir or Path(temp_dir)
+        workdir.mkdir(parents=True, exist_ok=True)
+
+        results = []
+        for case in cases(args, workdir):
+            result = run_in_subprocess(case)
+            results.append(result)
+            print(format_result(result), flush=True)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+    print(f"Results saved to {output}")
+
+
+def cases(args, workdir: Path):
+    for benchmark, n_points, point_format, kind, extra_dims in itertools.product(
+        args.benchmarks, args.counts, args.formats, args.kinds, args.extra_dims
+    ):
+        if benchmark in _NOT_FILE_BENCHMARKS:
+            if kind != args.kinds[0]:
+                continue
+            kind = None
+
+        case = {
+            "benchmark": benchmark,
+            "n_points": n_points,
+            "point_format": point_format,
+            "kind": kind,
+            "extra_dims": extra_dims,
+            "repeat": args.repeat,
+        }
+        if kind is not None:
+            case["path"] = str(input_file(workdir, case))
+        yield case
+
+
+def input_file(workdir: Path, case: dict) -> Path:
+    """Returns the path of the input file of a case, writing it if needed."""
+    path = workdir / "{n_points}-{point_format}-{extra_dims}.{kind}".format(**case)
+    if not path.exists():
+        data = synthetic_cloud(
+            case["n_points"], case["point_format"], case["extra_dims"]
+        )
+        jaklas.write(data, path, point_format=case["point_format"])
+    return path
+
+
+def run_in_subprocess(case: dict) -> dict:
+    command = [sys.executable, __file__, "--case", json.dumps(case)]
+    process = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def run_case(case: dict) -> dict:
+    benchmark = case["benchmark"]
+    n_points = case["n_points"]
+    path = case.get("path")
+
+    data = None
+    if benchmark in ("write", "best_point_format"):
+        data = synthetic_cloud(n_points, case["point_format"], case["extra_dims"])
+
+    if benchmark == "write":
+        output = Path(path).with_name("output" + Path(path).suffix)
+
+        def function():
+            jaklas.write(data, output, point_format=case["point_format"])
+
+    elif benchmark == "read":
+
+        def function():
+            jaklas.read(path)
+
+    elif benchmark == "read_pandas":
+
+        def function():
+            jaklas.read_pandas(path)
+
+    elif benchmark == "read_header":
+
+        def function():
+            for _ in range(_HEADER_CALLS):
+                jaklas.read_header(path)
+
+    elif benchmark == "laspy_read_header":
+        import laspy
+
+        def function():
+            for _ in range(_HEADER_CALLS):
+                with laspy.open(path) as f:
+                    f.header
+
+    elif benchmark == "best_point_format":
+
+        def function():
+            point_formats.best_point_format(data)
+
+    setup_rss = peak_rss_mb()
+    seconds = min(timed(function) for _ in range(case["repeat"]))
+
+    result = {key: value for key, value in case.items() if key != "path"}
+    result.update(
+        seconds=seconds,
+        points_per_second=None,
+        mb_per_second=None,
+        peak_rss_mb=peak_rss_mb(),
+        setup_rss_mb=setup_rss,
+    )
+    if benchmark in ("read_header", "laspy_read_header"):
+        result["seconds"] = seconds / _HEADER_CALLS
+    else:
+        result["points_per_second"] = n_points / seconds
+    if benchmark in ("write", "read", "read_pandas"):
+        # the size of the file written or read
+        size = os.path.getsize(output if benchmark == "write" else path)
+        result["mb_per_second"] = size / 1e6 / seconds
+    return result
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def metadata() -> dict:
+    import laspy
+    import lazrs
+    import pandas
+
+    def git(*command):
+        try:
+            return subprocess.run(
+                ["git", *command],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=Path(__file__).parent,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "jaklas": __version__,
+            "laspy": laspy.__version__,
+            "lazrs": getattr(lazrs, "__version__", None),
+            "numpy": np.__version__,
+            "pandas": pandas.__version__,
+        },
+    }
+
+
+def format_result(result: dict) -> str:
+    speed = ""
+    if result["points_per_second"] is not None:
+        speed = f"{result['points_per_second'] / 1e6:8.2f} Mpts/s"
+    rss = result["peak_rss_mb"]
+    rss = "" if rss is None else f"{rss:8.1f} MB"
+    return (
+        f"{result['benchmark']:<18} n={result['n_points']:<10} "
+        f"format={result['point_format']} {result['kind'] or '-':<4} "
+        f"extra={result['extra_dims']} {result['seconds']:10.5f} s{speed}{rss}"
+    )
+
+
+if __name__ == "__main__":
+    main()
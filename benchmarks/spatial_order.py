@@ -0,0 +1,49 @@
+"""LAZ file size and bbox read time depending on the spatial order of the points.
+
+    python benchmarks/spatial_order.py --points 10000000 --bbox-size 100
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import jaklas
+from synthetic import synthetic_cloud
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=5_000_000)
+    parser.add_argument(
+        "--bbox-size", type=float, default=100, help="side of the queried bbox, in m"
+    )
+    args = parser.parse_args()
+
+    # the synthetic points are in random order, the worst case for compression
+    data = synthetic_cloud(args.points, point_format=6)
+    center = data["xyz"][:, :2].min(axis=0) + 500
+    bbox = (*(center - args.bbox_size / 2), *(center + args.bbox_size / 2))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "bench.laz"
+        print(f"{args.points} points, bbox of {args.bbox_size} m")
+        columns = ("order", "write s", "size MB", "bbox read s", "points")
+        print(" ".join(f"{c:>12}" for c in columns))
+        for spatial_order in [None, "morton", "hilbert"]:
+            start = time.perf_counter()
+            jaklas.write(data, path, spatial_order=spatial_order)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = jaklas.read(path, bbox=bbox, other_dims=[])
+            read_time = time.perf_counter() - start
+
+            print(
+                f"{str(spatial_order):>12} {write_time:>12.2f} "
+                f"{path.stat().st_size / 1e6:>12.1f} {read_time:>12.3f} "
+                f"{len(result['xyz']):>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
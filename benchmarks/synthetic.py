@@ -0,0 +1,34 @@
+"""Synthetic point clouds used by the benchmarks."""
+import numpy as np
+
+from jaklas import point_formats
+
+
+def synthetic_cloud(
+    n_points: int, point_format: int = 6, extra_dims: int = 0, seed: int = 0
+) -> dict:
+    """Random points having the fields that jaklas writes for a point format.
+
+    The coordinates are spread over a 1 km georeferenced tile, the gps time
+    increases like in an acquisition and the classifications fit in the point
+    format. `extra_dims` float32 extra dimensions are added, named extra_0, ...
+    """
+    rng = np.random.default_rng(seed)
+    fields = point_formats.point_formats[point_format]
+
+    data = {
+        "xyz": rng.random((n_points, 3)) * (1000, 1000, 50) + (3e5, 5e6, 0),
+        "intensity": rng.integers(0, 2 ** 16, n_points, dtype="u2"),
+        "classification": rng.integers(
+            0, 256 if point_format >= 6 else 32, n_points, dtype="u1"
+        ),
+    }
+    if "gps_time" in fields:
+        data["gps_time"] = np.sort(rng.random(n_points) * 3600)
+    if "red" in fields:
+        for color in ["red", "green", "blue"]:
+            data[color] = rng.integers(0, 2 ** 16, n_points, dtype="u2")
+    for n in range(extra_dims):
+        data[f"extra_{n}"] = rng.random(n_points, dtype="f4")
+
+    return data
@@ -26,7 +26,7 @@ setup(
     url="https://github.com/jakarto3d/jaklas",
     packages=find_packages(where="src"),
     package_dir={"": "src"},
-    python_requires=">=3.6",
+    python_requires=">=3.9",
     include_package_data=True,
     install_requires=requirements,
     license="Jakarto Licence",
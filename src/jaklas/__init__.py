@@ -1,7 +1,21 @@
 # flake8: noqa: F401
 
+from .catalog import Catalog, catalog
 from .point_formats import best_point_format
-from .read import read, read_header, read_pandas
-from .write import write
+from .prefetch import aiter_files, iter_files
+from .profiling import profile
+from .read import (
+    iter_read,
+    iter_read_arrow,
+    iter_read_pandas,
+    read,
+    read_arrow,
+    read_header,
+    read_many,
+    read_pandas,
+)
+from .statistics import Stats, stats
+from .update import update
+from .write import WritePlan, Writer, append, write, write_tiled
 
 pandas2las = write  # backward compatibility
@@ -0,0 +1,215 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from . import spatial
+from .header import Header
+
+_COLUMNS = (
+    "path",
+    "mtime",
+    "size",
+    "point_format",
+    "point_count",
+    "scale",
+    "offset",
+    "min",
+    "max",
+)
+
+
+class Catalog:
+    """Columnar table of las file headers.
+
+    Each attribute is a numpy array with one row per file:
+
+    - path: the file paths, as strings
+    - mtime, size: the file modification time (in ns) and size, used to invalidate
+      the on-disk cache
+    - point_format, point_count
+    - scale, offset, min, max: arrays of shape (n_files, 3)
+    """
+
+    def __init__(self, columns: dict):
+        for name in _COLUMNS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def empty(cls) -> "Catalog":
+        return cls(
+            {
+                "path": np.array([], dtype=str),
+                "mtime": np.array([], dtype="i8"),
+                "size": np.array([], dtype="i8"),
+                "point_format": np.array([], dtype="u1"),
+                "point_count": np.array([], dtype="u8"),
+                "scale": np.empty((0, 3), dtype="d"),
+                "offset": np.empty((0, 3), dtype="d"),
+                "min": np.empty((0, 3), dtype="d"),
+                "max": np.empty((0, 3), dtype="d"),
+            }
+        )
+
+    @classmethod
+    def load(cls, path: Union[Path, str]) -> "Catalog":
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in _COLUMNS})
+
+    def save(self, path: Union[Path, str]) -> None:
+        """Save the catalog to a numpy .npz file.
+
+        The file is written next to its destination and then renamed,
+        so that concurrent jobs never read a partially written cache.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, **self.columns())
+        os.replace(temp_path, path)
+
+    def columns(self) -> dict:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.path)
+
+    def __getitem__(self, index) -> "Catalog":
+        """Select rows using an integer array, a boolean mask or a slice."""
+        return Catalog({name: values[index] for name, values in self.columns().items()})
+
+    def query(self, bbox=None, polygon=None) -> "Catalog":
+        """Returns the files whose header bounds overlap bbox and polygon.
+
+        The polygon is only compared to the bounding box of the files, so some
+        returned files could have no point inside the polygon itself.
+
+        Args:
+            bbox (Sequence[float], optional): (xmin, ymin, xmax, ymax) or
+                (xmin, ymin, zmin, xmax, ymax, zmax)
+            polygon (array-like, optional): The (n, 2) vertices of a polygon.
+        """
+        return self[self.overlaps(bbox, polygon)]
+
+    def overlaps(self, bbox=None, polygon=None) -> np.ndarray:
+        """Returns a boolean mask of the files overlapping bbox and polygon."""
+        mask = np.ones(len(self), dtype=bool)
+        for min_, max_ in spatial.query_bounds(bbox, polygon):
+            mask &= np.all(self.max >= min_, axis=1)
+            mask &= np.all(self.min <= max_, axis=1)
+        return mask
+
+    def to_pandas(self):
+        import pandas as pd
+
+        data = {}
+        for name, values in self.columns().items():
+            if values.ndim == 2:
+                for axis, values_axis in zip("xyz", values.T):
+                    data[f"{name}_{axis}"] = values_axis
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def catalog(
+    paths: Union[str, Iterable[Union[Path, str]]],
+    *,
+    workers: Optional[int] = None,
+    cache: Optional[Union[Path, str]] = None,
+) -> Catalog:
+    """Read the headers of many las files into a Catalog.
+
+    Headers are read concurrently with a thread pool. When a cache path is given,
+    the catalog is also saved there, and on the next call only the headers of the
+    files that are new, or whose modification time or size changed, are read again.
+
+    Args:
+        paths (Union[str, Iterable]): A glob pattern (recursive '**' is supported)
+            or an iterable of paths.
+        workers (int, optional): The number of threads reading headers.
+            Defaults to the ThreadPoolExecutor default.
+        cache (Union[Path, str], optional): The .npz file used to store the catalog.
+
+    Returns:
+        Catalog: The catalog, in the order of the given paths
+        (sorted for a glob pattern).
+    """
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths, recursive=True))
+    paths = [str(p) for p in paths]
+
+    cached = {}
+    if cache is not None and Path(cache).exists():
+        previous = Catalog.load(cache)
+        cached = {path: n for n, path in enumerate(previous.path)}
+    else:
+        previous = Catalog.empty()
+
+    if not paths:
+        return Catalog.empty()
+
+    if workers is None:
+        # same default as ThreadPoolExecutor
+        workers = min(32, (os.cpu_count() or 1) + 4)
+
+    # read headers by batches to limit the overhead of the executor
+    n_jobs = min(len(paths), workers * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batches = [paths[n::n_jobs] for n in range(n_jobs)]
+        results = executor.map(
+            lambda batch: [_read_row(p, previous, cached.get(p)) for p in batch],
+            batches,
+        )
+        rows = [None] * len(paths)
+        for n, batch_rows in enumerate(results):
+            rows[n::n_jobs] = batch_rows
+
+    columns = {"path": np.array(paths, dtype=str)}
+    for i, name in enumerate(_COLUMNS[1:], start=1):
+        dtype = getattr(previous, name).dtype
+        columns[name] = np.array([row[i] for row in rows], dtype=dtype)
+    result = Catalog(columns)
+
+    if cache is not None and not _same_rows(result, previous):
+        result.save(cache)
+
+    return result
+
+
+def _read_row(path: str, previous: Catalog, cached_index: Optional[int]):
+    stat = os.stat(path)
+    if (
+        cached_index is not None
+        and previous.mtime[cached_index] == stat.st_mtime_ns
+        and previous.size[cached_index] == stat.st_size
+    ):
+        return tuple(getattr(previous, name)[cached_index] for name in _COLUMNS)
+
+    with open(path, "rb") as f:
+        header = Header(f)
+
+    return (
+        path,
+        stat.st_mtime_ns,
+        stat.st_size,
+        header.point_format,
+        header.point_count,
+        header.scale,
+        header.offset,
+        header.min,
+        header.max,
+    )
+
+
+def _same_rows(catalog: Catalog, other: Catalog) -> bool:
+    return (
+        len(catalog) == len(other)
+        and np.array_equal(catalog.path, other.path)
+        and np.array_equal(catalog.mtime, other.mtime)
+        and np.array_equal(catalog.size, other.size)
+    )
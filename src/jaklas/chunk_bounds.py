@@ -0,0 +1,102 @@
+"""Bounding boxes of consecutive chunks of points, stored in a VLR of a las file.
+
+`jaklas.write` records them when the points are sorted with `spatial_order`,
+so that reading with a bbox or a polygon only decodes the chunks overlapping it.
+The VLR data is the number of points in a chunk (uint64) followed by the
+(xmin, ymin, zmin, xmax, ymax, zmax) of each chunk (float64).
+
+`jaklas.append` can't add the bounds of the new chunks without moving the
+points, so it sets the chunk size to 0, and the bounds are then ignored.
+"""
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import laspy
+import numpy as np
+
+from . import spatial
+from .header import Header
+
+USER_ID = "jaklas"
+RECORD_ID = 1
+
+# the default LAZ chunk size, so that the skipped chunks are whole LAZ chunks
+CHUNK_SIZE = 50_000
+
+_CHUNK_SIZE = struct.Struct("<Q")
+
+
+def compute(
+    xyz: Sequence[np.ndarray],
+    order: Optional[np.ndarray],
+    xyz_offset: Sequence[float],
+    scales: Sequence[float],
+    chunk_size: int = CHUNK_SIZE,
+) -> np.ndarray:
+    """Returns the (n_chunks, 6) bounds of the chunks of points, in file order.
+
+    The bounds are padded by a scale step, to contain the quantized coordinates.
+    """
+    n_points = len(xyz[0])
+    bounds = np.empty((-(-n_points // chunk_size), 6), dtype="d")
+    for n, start in enumerate(range(0, n_points, chunk_size)):
+        take = slice(start, start + chunk_size)
+        if order is not None:
+            take = order[take]
+        for axis in range(3):
+            values = xyz[axis][take]
+            bounds[n, axis] = values.min() + xyz_offset[axis] - scales[axis]
+            bounds[n, axis + 3] = values.max() + xyz_offset[axis] + scales[axis]
+    return bounds
+
+
+def vlr(bounds: np.ndarray, chunk_size: int = CHUNK_SIZE) -> laspy.VLR:
+    data = _CHUNK_SIZE.pack(chunk_size) + np.asarray(bounds, "<f8").tobytes()
+    return laspy.VLR(USER_ID, RECORD_ID, "chunk bounds", data)
+
+
+def read(header: Header) -> Optional[Tuple[int, np.ndarray]]:
+    """Returns the chunk size and the chunk bounds of a file, if it has them."""
+    vlr = header.find_vlr(USER_ID, RECORD_ID)
+    if vlr is None:
+        return None
+    (chunk_size,) = _CHUNK_SIZE.unpack_from(vlr.data)
+    if not chunk_size:
+        # stale bounds
+        return None
+    bounds = np.frombuffer(vlr.data, "<f8", offset=_CHUNK_SIZE.size).reshape(-1, 6)
+    return chunk_size, bounds
+
+
+def mark_stale(header: laspy.LasHeader) -> None:
+    """Set the chunk size of the chunk bounds VLR of a laspy header to 0,
+    keeping the size of the VLR so that the header can be rewritten in place."""
+    for vlr in header.vlrs:
+        if vlr.user_id == USER_ID and vlr.record_id == RECORD_ID:
+            vlr.record_data = _CHUNK_SIZE.pack(0) + vlr.record_data[_CHUNK_SIZE.size :]
+
+
+def ranges(
+    header: Header, bbox=None, polygon=None
+) -> Optional[List[Tuple[int, int]]]:
+    """Returns the (start, stop) point ranges of the consecutive chunks
+    overlapping bbox and polygon, or None when the file has no chunk bounds."""
+    chunks = read(header)
+    if chunks is None:
+        return None
+
+    chunk_size, bounds = chunks
+    overlapping = np.ones(len(bounds), dtype=bool)
+    for min_, max_ in spatial.query_bounds(bbox, polygon):
+        overlapping &= np.all(bounds[:, 3:] >= min_, axis=1)
+        overlapping &= np.all(bounds[:, :3] <= max_, axis=1)
+
+    result = []
+    for n in np.flatnonzero(overlapping):
+        start = int(n) * chunk_size
+        stop = min(start + chunk_size, header.point_count)
+        if result and result[-1][1] == start:
+            result[-1] = (result[-1][0], stop)
+        else:
+            result.append((start, stop))
+    return result
@@ -0,0 +1,247 @@
+"""Cloud Optimized Point Cloud (COPC) files, see https://copc.io
+
+A COPC file is a LAZ 1.4 file of point format 6, 7 or 8 whose points are
+grouped by the nodes of an octree, each node being a variable size LAZ chunk.
+The first VLR gives the octree cube and the position of the hierarchy EVLR,
+which lists the file offset and the point count of each node.
+
+Each node keeps about one point per cell of a grid of `GRID_SIZE` cells
+per axis, and the other points go to its children, so reading the nodes
+down to a depth gives a decimated version of the point cloud. Nodes with
+at most `MAX_NODE_POINTS` points are leaves, and keep all their points.
+"""
+import struct
+from copy import deepcopy
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+import laspy
+import lazrs
+import numpy as np
+from laspy.vlrs.known import LasZipVlr
+
+from . import spatial
+
+GRID_SIZE = 128
+MAX_NODE_POINTS = 100_000
+# 3 * (level + log2(GRID_SIZE)) bits must fit in the int64 cell keys
+MAX_DEPTH = 13
+
+_INFO = struct.Struct("<5d2Q2d88x")
+_ENTRY = struct.Struct("<4iQ2i")
+_EVLR_HEADER = struct.Struct("<H16sHQ32s")
+
+
+def is_copc(path: Union[Path, str]) -> bool:
+    """COPC files are written when the file name ends with .copc.laz"""
+    return Path(path).name.lower().endswith(".copc.laz")
+
+
+class Octree:
+    """The nodes of the octree of some points.
+
+    The coordinates of the cube are in file coordinates, after `xyz_offset`
+    is added to the points.
+
+    Attributes:
+        center, halfsize: The cube of the root node.
+        spacing: The distance between the grid cells of the root node.
+        order: The indices of the points, sorted by node.
+        keys: The (level, x, y, z) of each node, in the order of the points.
+        counts: The number of points of each node.
+    """
+
+    def __init__(
+        self,
+        xyz: Sequence[np.ndarray],
+        xyz_offset: Sequence[float] = (0, 0, 0),
+        max_node_points: int = MAX_NODE_POINTS,
+        grid_size: int = GRID_SIZE,
+    ):
+        min_ = np.array([np.min(values) for values in xyz], "d")
+        max_ = np.array([np.max(values) for values in xyz], "d")
+        self.center = (min_ + max_) / 2
+        self.halfsize = float(np.max(max_ - min_)) / 2 or 1.0
+        self.spacing = 2 * self.halfsize / grid_size
+
+        order, keys, counts = [], [], []
+        remaining = np.arange(len(xyz[0]))
+        level = 0
+        while len(remaining):
+            position = np.stack(
+                [np.asarray(xyz[axis])[remaining] for axis in range(3)], axis=1
+            )
+            position -= self.center - self.halfsize
+
+            nodes_per_axis = 2 ** level
+            node_size = 2 * self.halfsize / nodes_per_axis
+            node_xyz = _cells(position, node_size, nodes_per_axis)
+            node_ids = _cell_ids(node_xyz, nodes_per_axis)
+            _, inverse, node_counts = np.unique(
+                node_ids, return_inverse=True, return_counts=True
+            )
+
+            keep = node_counts[inverse] <= max_node_points
+            if level < MAX_DEPTH:
+                # one point per grid cell stays in the nodes that are too large
+                cells_per_axis = nodes_per_axis * grid_size
+                candidates = np.flatnonzero(~keep)
+                cells = _cells(
+                    position[candidates], self.spacing / nodes_per_axis, cells_per_axis
+                )
+                _, first = np.unique(
+                    _cell_ids(cells, cells_per_axis), return_index=True
+                )
+                keep[candidates[first]] = True
+            else:
+                keep[:] = True
+
+            kept = np.flatnonzero(keep)
+            kept = kept[np.argsort(node_ids[kept], kind="stable")]
+            order.append(remaining[kept])
+            nodes, first, level_counts = np.unique(
+                node_ids[kept], return_index=True, return_counts=True
+            )
+            level_keys = np.empty((len(nodes), 4), dtype=np.int32)
+            level_keys[:, 0] = level
+            level_keys[:, 1:] = node_xyz[kept[first]]
+            keys.append(level_keys)
+            counts.append(level_counts)
+
+            remaining = remaining[~keep]
+            level += 1
+
+        self.order = np.concatenate(order) if order else np.zeros(0, np.intp)
+        self.keys = np.concatenate(keys) if keys else np.zeros((0, 4), np.int32)
+        self.counts = np.concatenate(counts) if counts else np.zeros(0, np.int64)
+        self.center += xyz_offset
+
+
+def _cells(position: np.ndarray, size: float, per_axis: int) -> np.ndarray:
+    """The integer cells of size `size` of the positions, in [0, per_axis)."""
+    cells = np.floor(position / size).astype(np.int64)
+    return np.clip(cells, 0, per_axis - 1, out=cells)
+
+
+def _cell_ids(cells: np.ndarray, per_axis: int) -> np.ndarray:
+    return (cells[:, 0] * per_axis + cells[:, 1]) * per_axis + cells[:, 2]
+
+
+def write_points(
+    output_path: Union[Path, str],
+    header: laspy.LasHeader,
+    octree: Octree,
+    blocks: Iterator[laspy.ScaleAwarePointRecord],
+    gps_time_range: Tuple[float, float] = (0.0, 0.0),
+) -> None:
+    """Write a COPC file, the points of the blocks must be in the octree order."""
+    if header.point_format.id not in (6, 7, 8):
+        raise ValueError(
+            f"COPC files need point formats 6, 7 or 8, not {header.point_format.id}"
+        )
+
+    header = deepcopy(header)
+    header.partial_reset()
+    vlr = lazrs.LazVlr.new_for_compression(
+        header.point_format.id,
+        header.point_format.num_extra_bytes,
+        use_variable_size_chunks=True,
+    )
+    # the COPC info VLR must be the first one, it's patched on close
+    header.vlrs.insert(0, laspy.VLR("copc", 1, "copc info", bytes(_INFO.size)))
+    header.vlrs.append(LasZipVlr(vlr.record_data()))
+    header.are_points_compressed = True
+    header.global_encoding.wkt = 1
+
+    node_ends = np.cumsum(octree.counts)
+    with open(output_path, "w+b") as f:
+        header.write_to(f)
+        compressor = lazrs.LasZipCompressor(f, vlr)
+
+        position = 0
+        node = 0
+        for points in blocks:
+            header.grow(points)
+            array = np.ascontiguousarray(points.array)
+            start = 0
+            while start < len(array):
+                stop = min(len(array), start + int(node_ends[node]) - position)
+                compressor.compress_many(array[start:stop].view(np.uint8))
+                position += stop - start
+                start = stop
+                if position == node_ends[node] and node + 1 < len(node_ends):
+                    compressor.finish_current_chunk()
+                    node += 1
+        compressor.done()
+
+        f.seek(header.offset_to_point_data)
+        chunk_table = lazrs.read_chunk_table(f, vlr)
+        chunk_sizes = np.array([byte_count for _, byte_count in chunk_table])
+        offsets = header.offset_to_point_data + 8 + np.cumsum(chunk_sizes)
+        offsets -= chunk_sizes
+
+        f.seek(0, 2)
+        hierarchy = b"".join(
+            _ENTRY.pack(*key, offset, byte_count, count)
+            for key, offset, byte_count, count in zip(
+                octree.keys.tolist(),
+                offsets.tolist(),
+                chunk_sizes.tolist(),
+                octree.counts.tolist(),
+            )
+        )
+        header.start_of_first_evlr = f.tell()
+        header.number_of_evlrs = 1
+        f.write(_EVLR_HEADER.pack(0, b"copc", 1000, len(hierarchy), b"copc hierarchy"))
+        hierarchy_offset = f.tell()
+        f.write(hierarchy)
+
+        header.vlrs[0].record_data = _INFO.pack(
+            *octree.center,
+            octree.halfsize,
+            octree.spacing,
+            hierarchy_offset,
+            len(hierarchy),
+            *gps_time_range,
+        )
+        f.seek(0)
+        header.write_to(f, ensure_same_size=True)
+
+
+def read_points(
+    path,
+    bbox=None,
+    polygon=None,
+    max_depth: Optional[int] = None,
+    resolution: Optional[float] = None,
+    selection: Optional[laspy.DecompressionSelection] = None,
+) -> laspy.ScaleAwarePointRecord:
+    """Decompress only the octree nodes of a COPC file overlapping bbox and polygon,
+    down to `max_depth` or to the depth having the given `resolution`."""
+    if max_depth is not None and resolution is not None:
+        raise ValueError("max_depth and resolution can't be used together")
+
+    kwargs = {}
+    if selection is not None:
+        kwargs["decompression_selection"] = selection
+
+    with laspy.CopcReader.open(str(path), **kwargs) as reader:
+        bounds = None
+        query_bounds = spatial.query_bounds(bbox, polygon)
+        if query_bounds:
+            mins = np.max([min_ for min_, _ in query_bounds], axis=0)
+            maxs = np.min([max_ for _, max_ in query_bounds], axis=0)
+            # laspy needs finite bounds
+            mins = np.maximum(mins, reader.header.mins)
+            maxs = np.minimum(maxs, reader.header.maxs)
+            if np.any(mins > maxs):
+                return laspy.ScaleAwarePointRecord.zeros(0, header=reader.header)
+            bounds = laspy.copc.Bounds(mins, maxs)
+
+        level = None if max_depth is None else range(0, max_depth + 1)
+        points = reader.query(bounds=bounds, resolution=resolution, level=level)
+
+    if query_bounds:
+        # laspy filters with rounded bounds, and not with the polygon
+        points = points[spatial.mask(points.x, points.y, points.z, bbox, polygon)]
+    return points
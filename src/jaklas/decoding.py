@@ -0,0 +1,55 @@
+"""Decoding of point records into preallocated arrays."""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# number of points decoded at a time, the float64 temporaries stay small
+_BLOCK_SIZE = 65_536
+
+
+def output_array(
+    out: Optional[Dict[str, np.ndarray]], key: str, shape: Tuple[int, ...], dtype
+) -> np.ndarray:
+    """Returns out[key] after checking its shape, or a new empty array."""
+    if out is None or key not in out:
+        return np.empty(shape, dtype=dtype)
+
+    array = out[key]
+    if array.shape != shape:
+        raise ValueError(f"out['{key}'] has shape {array.shape}, expected {shape}")
+    return array
+
+
+def scale_coordinates(
+    raw: np.ndarray, scale: float, offset: float, subtract: float, out: np.ndarray
+) -> np.ndarray:
+    """Compute `raw * scale + offset - subtract` in float64 and store it in out.
+
+    The points are processed by blocks, so the only full size array is out,
+    which can have any float dtype and be strided (a column of an (n, 3) array).
+    The result is the same as scaling the whole array at once.
+    """
+    block = np.empty(min(len(raw), _BLOCK_SIZE), dtype=np.float64)
+    for start in range(0, len(raw), _BLOCK_SIZE):
+        raw_block = raw[start : start + _BLOCK_SIZE]
+        values = block[: len(raw_block)]
+        np.multiply(raw_block, scale, out=values)
+        values += offset
+        values -= subtract
+        out[start : start + _BLOCK_SIZE] = values
+    return out
+
+
+def decode_xyz(
+    raw: Sequence[np.ndarray],
+    scales: Sequence[float],
+    offsets: Sequence[float],
+    subtract: Sequence[float],
+    out: np.ndarray,
+) -> np.ndarray:
+    """Decode the X, Y and Z integer arrays in the columns of an (n, 3) array."""
+    for axis in range(3):
+        scale_coordinates(
+            raw[axis], scales[axis], offsets[axis], subtract[axis], out[:, axis]
+        )
+    return out
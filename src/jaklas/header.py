@@ -1,17 +1,299 @@
-from struct import unpack
-from typing import BinaryIO
+from collections import namedtuple
+from struct import Struct
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Most headers and their VLRs fit in the first disk block
+_READ_SIZE = 4096
+
+# public header block of las 1.0 to 1.2
+_HEADER = Struct("<4sHH16sBB32s32sHHHIIBHI5I3d3d6d")
+# las 1.3: start of waveform data packet record
+_HEADER_1_3 = Struct("<Q")
+# las 1.4: evlrs and 64 bits point counts
+_HEADER_1_4 = Struct("<QIQ15Q")
+
+# the fields of the public header block updated by `patch_header`
+_LEGACY_COUNTS = Struct("<I5I")
+_LEGACY_COUNTS_OFFSET = 107
+_SCALE_OFFSET = Struct("<3d3d")
+_SCALE_OFFSET_OFFSET = 131
+_MIN_MAX = Struct("<6d")
+_MIN_MAX_OFFSET = 179
+_COUNTS = Struct("<Q15Q")
+_COUNTS_OFFSET = 247
+_START_OF_FIRST_EVLR = Struct("<Q")
+_START_OF_FIRST_EVLR_OFFSET = 235
+
+_VLR_HEADER = Struct("<H16sHH32s")
+_EVLR_HEADER = Struct("<H16sHQ32s")
+_EXTRA_BYTES = Struct("<HBB32s4s24s24s24s3d3d32s")
+
+# size of a point record without extra bytes, by point format
+_POINT_SIZES = {
+    0: 20,
+    1: 28,
+    2: 26,
+    3: 34,
+    4: 57,
+    5: 63,
+    6: 30,
+    7: 36,
+    8: 38,
+    9: 59,
+    10: 67,
+}
+
+_EXTRA_BYTES_TYPES = {
+    1: "u1",
+    2: "i1",
+    3: "u2",
+    4: "i2",
+    5: "u4",
+    6: "i4",
+    7: "u8",
+    8: "i8",
+    9: "f4",
+    10: "f8",
+}
+
+# bits of the extra bytes options
+_EXTRA_BYTES_SCALE = 0b0000_1000
+_EXTRA_BYTES_OFFSET = 0b0001_0000
+
+Vlr = namedtuple("Vlr", ["user_id", "record_id", "description", "data"])
 
 
 class Header:
-    def __init__(self, file_object: BinaryIO):
-        def get_prop(offset, format_, size):
-            file_object.seek(offset)
-            return list(unpack(format_, file_object.read(size)))
+    """Pure python parser of the las public header block and VLRs.
+
+    The header and the VLR directory are parsed from a single buffered read
+    at the start of the file (one more read is needed only if the VLRs are
+    larger than a disk block). EVLRs are read only if there are some.
+
+    The scale, offset, min and max attributes are lists of 3 floats (x, y, z).
+    """
 
-        self.scale = get_prop(131, "ddd", 8 * 3)
-        self.offset = get_prop(155, "ddd", 8 * 3)
+    def __init__(self, file_object: BinaryIO, read_evlrs: bool = True):
+        file_object.seek(0)
+        buffer = file_object.read(_READ_SIZE)
 
-        min_max = get_prop(179, "dddddd", 8 * 6)
+        if buffer[:4] != b"LASF":
+            raise ValueError("Not a las file, the file signature is not 'LASF'")
 
+        values = _HEADER.unpack_from(buffer)
+        (
+            _,
+            self.file_source_id,
+            self.global_encoding,
+            self.guid,
+            self.version_major,
+            self.version_minor,
+            system_identifier,
+            generating_software,
+            self.creation_day,
+            self.creation_year,
+            self.header_size,
+            self.offset_to_point_data,
+            self.number_of_vlrs,
+            point_format,
+            self.point_record_length,
+            self.legacy_point_count,
+        ) = values[:16]
+
+        self.system_identifier = _decode(system_identifier)
+        self.generating_software = _decode(generating_software)
+
+        # the 2 high bits are used by laszip to flag compressed files
+        self.point_format = point_format & 0b0011_1111
+        self._compression_bits = point_format & 0b1100_0000
+
+        legacy_points_by_return = list(values[16:21])
+        self.scale = list(values[21:24])
+        self.offset = list(values[24:27])
+
+        min_max = values[27:33]
         self.min = [min_max[1], min_max[3], min_max[5]]
         self.max = [min_max[0], min_max[2], min_max[4]]
+
+        self.start_of_waveform_data = 0
+        if self.version_minor >= 3:
+            (self.start_of_waveform_data,) = _HEADER_1_3.unpack_from(
+                buffer, _HEADER.size
+            )
+
+        self.start_of_first_evlr = 0
+        self.number_of_evlrs = 0
+        self.point_count = self.legacy_point_count
+        self.points_by_return = legacy_points_by_return
+        if self.version_minor >= 4:
+            (
+                self.start_of_first_evlr,
+                self.number_of_evlrs,
+                self.point_count,
+                *self.points_by_return,
+            ) = _HEADER_1_4.unpack_from(buffer, _HEADER.size + _HEADER_1_3.size)
+
+        if len(buffer) < self.offset_to_point_data:
+            buffer += file_object.read(self.offset_to_point_data - len(buffer))
+
+        self.vlrs = _parse_vlrs(buffer, self.header_size, self.number_of_vlrs)
+
+        self.evlrs = []
+        if read_evlrs and self.number_of_evlrs and self.start_of_first_evlr:
+            file_object.seek(self.start_of_first_evlr)
+            self.evlrs = _read_evlrs(file_object, self.number_of_evlrs)
+
+    @property
+    def version(self) -> str:
+        return f"{self.version_major}.{self.version_minor}"
+
+    @property
+    def is_compressed(self) -> bool:
+        """True for LAZ files."""
+        return bool(self._compression_bits) or (
+            self.find_vlr("laszip encoded", 22204) is not None
+        )
+
+    @property
+    def is_copc(self) -> bool:
+        """True for Cloud Optimized Point Cloud files, see `jaklas.copc`."""
+        return self.find_vlr("copc", 1) is not None
+
+    @property
+    def crs_wkt(self) -> Optional[str]:
+        """The WKT of the coordinate reference system, if there is one."""
+        vlr = self.find_vlr("LASF_Projection", 2112)
+        if vlr is None:
+            return None
+        return _decode(vlr.data) or None
+
+    @property
+    def extra_bytes_size(self) -> int:
+        return self.point_record_length - _POINT_SIZES[self.point_format]
+
+    @property
+    def extra_dimensions(self) -> List[Tuple[str, np.dtype]]:
+        """The names and types of the extra dimensions,
+        from the extra bytes VLR."""
+        return [(name, dtype) for name, dtype, _ in self._extra_bytes()]
+
+    @property
+    def scaled_extra_dimensions(self) -> List[str]:
+        """The names of the extra dimensions stored with a scale or an offset."""
+        return [
+            name
+            for name, _, options in self._extra_bytes()
+            if options & (_EXTRA_BYTES_SCALE | _EXTRA_BYTES_OFFSET)
+        ]
+
+    def find_vlr(self, user_id: str, record_id: int) -> Optional[Vlr]:
+        """Returns the first VLR or EVLR matching user_id and record_id."""
+        for vlr in self.vlrs + self.evlrs:
+            if vlr.user_id == user_id and vlr.record_id == record_id:
+                return vlr
+        return None
+
+    def _extra_bytes(self) -> List[Tuple[str, np.dtype, int]]:
+        vlr = self.find_vlr("LASF_Spec", 4)
+        if vlr is None:
+            return []
+
+        dimensions = []
+        for offset in range(0, len(vlr.data), _EXTRA_BYTES.size):
+            _, data_type, options, name, *_ = _EXTRA_BYTES.unpack_from(
+                vlr.data, offset
+            )
+            if data_type == 0:
+                # undocumented extra bytes, the size is stored in the options
+                dtype = np.dtype(f"V{options}")
+                options = 0
+            else:
+                base_type = _EXTRA_BYTES_TYPES[(data_type - 1) % 10 + 1]
+                count = (data_type - 1) // 10 + 1
+                dtype = np.dtype(base_type if count == 1 else (base_type, count))
+            dimensions.append((_decode(name), dtype, options))
+
+        return dimensions
+
+
+def patch_header(
+    buffer: bytearray,
+    *,
+    point_format: int,
+    version_minor: int,
+    point_count: int,
+    points_by_return: Sequence[int],
+    min_: Sequence[float],
+    max_: Sequence[float],
+    scale: Optional[Sequence[float]] = None,
+    offset: Optional[Sequence[float]] = None,
+) -> None:
+    """Write the point counts, the bounds and optionally the scale and the offset
+    in the first bytes of a las file (at least the size of its public header block).
+
+    The legacy point counts are only filled for point formats < 6, when the
+    count fits in 32 bits, like the las 1.4 specification recommends.
+
+    Args:
+        points_by_return (Sequence[int]): The number of points of each return
+            number, from 1 to 15.
+    """
+    points_by_return = list(points_by_return) + [0] * (15 - len(points_by_return))
+    legacy = point_format < 6 and point_count <= 0xFFFF_FFFF
+    if version_minor < 4:
+        legacy = True
+    _LEGACY_COUNTS.pack_into(
+        buffer,
+        _LEGACY_COUNTS_OFFSET,
+        point_count if legacy else 0,
+        *(points_by_return[:5] if legacy else [0] * 5),
+    )
+    if scale is not None and offset is not None:
+        _SCALE_OFFSET.pack_into(buffer, _SCALE_OFFSET_OFFSET, *scale, *offset)
+    _MIN_MAX.pack_into(
+        buffer,
+        _MIN_MAX_OFFSET,
+        max_[0],
+        min_[0],
+        max_[1],
+        min_[1],
+        max_[2],
+        min_[2],
+    )
+    if version_minor >= 4:
+        _COUNTS.pack_into(buffer, _COUNTS_OFFSET, point_count, *points_by_return)
+
+
+def patch_start_of_first_evlr(buffer: bytearray, start: int) -> None:
+    """Write the position of the first EVLR in the header of a las 1.4 file."""
+    _START_OF_FIRST_EVLR.pack_into(buffer, _START_OF_FIRST_EVLR_OFFSET, start)
+
+
+def _parse_vlrs(buffer: bytes, offset: int, number_of_vlrs: int) -> List[Vlr]:
+    vlrs = []
+    for _ in range(number_of_vlrs):
+        _, user_id, record_id, length, description = _VLR_HEADER.unpack_from(
+            buffer, offset
+        )
+        offset += _VLR_HEADER.size
+        data = buffer[offset : offset + length]
+        vlrs.append(Vlr(_decode(user_id), record_id, _decode(description), data))
+        offset += length
+    return vlrs
+
+
+def _read_evlrs(file_object: BinaryIO, number_of_evlrs: int) -> List[Vlr]:
+    evlrs = []
+    for _ in range(number_of_evlrs):
+        _, user_id, record_id, length, description = _EVLR_HEADER.unpack(
+            file_object.read(_EVLR_HEADER.size)
+        )
+        data = file_object.read(length)
+        evlrs.append(Vlr(_decode(user_id), record_id, _decode(description), data))
+    return evlrs
+
+
+def _decode(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode("utf-8", errors="replace")
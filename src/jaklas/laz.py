@@ -0,0 +1,436 @@
+"""Parallel LAZ compression and decompression, using the chunk table of the files.
+
+lazrs holds the GIL while it works, so the work is split between processes:
+
+- to read, each worker reads and decompresses a group of consecutive chunks,
+  and the decompressed records are copied in preallocated output arrays
+- to write, each worker compresses a group of chunks independently, and the
+  compressed chunks are written in order, followed by the chunk table
+"""
+import io
+import multiprocessing
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+import laspy
+import lazrs
+import numpy as np
+from laspy.vlrs.known import LasZipVlr
+
+from .header import Header, patch_start_of_first_evlr
+
+# laszip stores the offset to the chunk table before the first chunk
+_CHUNK_TABLE_OFFSET_SIZE = 8
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """The pool of processes used by the `workers` arguments of jaklas.
+
+    Spawned processes import the `__main__` module of the program again,
+    so a script using `workers` must call jaklas from an
+    `if __name__ == "__main__":` block, or the pool fails to start
+    (BrokenProcessPool).
+    """
+    # Forked workers hang in lazrs if the parent already used its parallel
+    # (rayon) backend, for example through laspy.read. Spawn clean processes.
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def laszip_vlr(header: Header) -> bytes:
+    vlr = header.find_vlr("laszip encoded", 22204)
+    if vlr is None:
+        raise ValueError("The file doesn't have a laszip VLR")
+    return vlr.data
+
+
+def read_chunk_table(path, header: Header) -> List[Tuple[int, int]]:
+    """Returns the (point_count, byte_count) of each chunk of a LAZ file."""
+    with open(path, "rb") as f:
+        f.seek(header.offset_to_point_data)
+        return lazrs.read_chunk_table(f, lazrs.LazVlr(laszip_vlr(header)))
+
+
+def read_points(
+    path,
+    workers: int,
+    selection: Optional[laspy.DecompressionSelection] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> laspy.ScaleAwarePointRecord:
+    """Decompress all the points of a LAZ file using `workers` processes.
+
+    With a selection, only these layers of point formats >= 6 are decompressed,
+    the other dimensions are left to zero.
+
+    An executor from `process_pool` can be given to share its processes
+    between files, it is not shut down.
+    """
+    header, las_header, tasks = _plan(path)
+
+    points = laspy.ScaleAwarePointRecord.zeros(header.point_count, header=las_header)
+    if not tasks:
+        return points
+
+    # a few tasks per worker, to balance the load
+    groups = _split(tasks, workers * 4)
+    if executor is not None:
+        futures = _submit(executor, path, header, groups, selection)
+        _gather(points.array, groups, futures)
+        return points
+
+    with process_pool(workers) as executor:
+        futures = _submit(executor, path, header, groups, selection)
+        _gather(points.array, groups, futures)
+
+    return points
+
+
+def iter_points(
+    path,
+    chunk_size: int,
+    workers: int,
+    selection: Optional[laspy.DecompressionSelection] = None,
+    ranges: Optional[List[Tuple[int, int]]] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[laspy.ScaleAwarePointRecord]:
+    """Decompress a LAZ file by batches of about `chunk_size` points,
+    using `workers` processes.
+
+    Batches are made of whole LAZ chunks, so they are rounded up to the chunk
+    size of the file (50 000 points by default). The next batch is decompressed
+    in the background while the current one is consumed.
+
+    With (start, stop) point `ranges`, only the chunks overlapping them are
+    decompressed. An executor from `process_pool` can be given, like for
+    `read_points`.
+    """
+    header, las_header, tasks = _plan(path)
+    if ranges is not None:
+        first_points = np.cumsum([0] + [task[1] for task in tasks[:-1]])
+        tasks = [
+            task
+            for task, first in zip(tasks, first_points.tolist())
+            if any(start < first + task[1] and first < stop for start, stop in ranges)
+        ]
+
+    batches = []
+    for task in tasks:
+        if not batches or sum(t[1] for t in batches[-1]) >= chunk_size:
+            batches.append([])
+        batches[-1].append(task)
+
+    def submit(executor, batch):
+        n_points = sum(task[1] for task in batch)
+        points = laspy.ScaleAwarePointRecord.zeros(n_points, header=las_header)
+        groups = _split(batch, workers)
+        futures = _submit(executor, path, header, groups, selection)
+        return points, groups, futures
+
+    def decompress(executor):
+        pending = submit(executor, batches[0]) if batches else None
+        for n in range(len(batches)):
+            points, groups, futures = pending
+            if n + 1 < len(batches):
+                pending = submit(executor, batches[n + 1])
+            _gather(points.array, groups, futures)
+            yield points
+
+    if executor is not None:
+        yield from decompress(executor)
+        return
+
+    with process_pool(workers) as executor:
+        yield from decompress(executor)
+
+
+def _plan(path):
+    """Returns the jaklas and laspy headers,
+    and the (start_byte, point_count, byte_count) of each chunk."""
+    with open(path, "rb") as f:
+        header = Header(f)
+        f.seek(0)
+        las_header = laspy.LasHeader.read_from(f)
+
+    if not header.is_compressed:
+        raise ValueError(f"{path} is not a LAZ file")
+
+    if not header.point_count:
+        return header, las_header, []
+
+    chunk_table = read_chunk_table(path, header)
+
+    tasks = []
+    start = header.offset_to_point_data + _CHUNK_TABLE_OFFSET_SIZE
+    remaining = header.point_count
+    for point_count, byte_count in chunk_table:
+        # with fixed size chunks, the table has the chunk size for the last chunk
+        point_count = min(point_count, remaining)
+        tasks.append((start, point_count, byte_count))
+        start += byte_count
+        remaining -= point_count
+
+    return header, las_header, tasks
+
+
+def rewrite_chunks(
+    path: Union[Path, str],
+    update: Callable[[int, np.ndarray], None],
+    selected: Optional[Callable[[int, int], bool]] = None,
+) -> None:
+    """Rewrite a LAZ file, decompressing and compressing again only some chunks.
+
+    For each chunk where selected(first_point, point_count) is True (all of
+    them by default), update(first_point, records) is called, in order, with
+    the decompressed records as bytes, and modifies them in place. The other
+    chunks are copied as they are. The new file is written next to path,
+    and then replaces it.
+    """
+    header, _, tasks = _plan(path)
+    vlr = laszip_vlr(header)
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".rewrite")
+
+    try:
+        with open(path, "rb") as src, open(temp_path, "wb") as dest:
+            head = bytearray(src.read(header.offset_to_point_data))
+            dest.write(head)
+            dest.write(b"\0" * _CHUNK_TABLE_OFFSET_SIZE)
+
+            chunk_table = []
+            first_point = 0
+            for start, point_count, byte_count in tasks:
+                src.seek(start)
+                if selected is None or selected(first_point, point_count):
+                    records = np.zeros(
+                        point_count * header.point_record_length, dtype=np.uint8
+                    )
+                    lazrs.decompress_points_with_chunk_table(
+                        src.read(byte_count), vlr, records, [(point_count, byte_count)]
+                    )
+                    update(first_point, records)
+                    compressed, table = _compress_chunks(vlr, records)
+                    dest.write(compressed)
+                    chunk_table.extend(table)
+                else:
+                    _copy(src, dest, byte_count)
+                    chunk_table.append((point_count, byte_count))
+                first_point += point_count
+
+            chunk_table_offset = dest.tell()
+            lazrs.write_chunk_table(dest, chunk_table, lazrs.LazVlr(vlr))
+            if header.number_of_evlrs and header.start_of_first_evlr:
+                patch_start_of_first_evlr(head, dest.tell())
+                src.seek(header.start_of_first_evlr)
+                _copy(src, dest)
+
+            dest.seek(0)
+            dest.write(head)
+            dest.write(struct.pack("<q", chunk_table_offset))
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def _copy(src, dest, size: Optional[int] = None, block_size: int = 1 << 24) -> None:
+    """Copy size bytes, or up to the end, from the position of src."""
+    while size is None or size > 0:
+        block = src.read(block_size if size is None else min(size, block_size))
+        if not block:
+            return
+        dest.write(block)
+        if size is not None:
+            size -= len(block)
+
+
+def _split(tasks, n_groups: int) -> List[list]:
+    """Split the chunks in at most n_groups groups of consecutive chunks
+    having about the same number of points."""
+    n_groups = max(1, min(n_groups, len(tasks)))
+    counts = np.cumsum([task[1] for task in tasks])
+    targets = np.linspace(0, counts[-1], n_groups + 1)[1:-1]
+    bounds = [0, *np.searchsorted(counts, targets, side="right"), len(tasks)]
+    groups = [tasks[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return [group for group in groups if group]
+
+
+def _submit(executor, path, header: Header, groups, selection=None):
+    vlr = laszip_vlr(header)
+    # lazrs selections can't be pickled, send the flags
+    selection = None if selection is None else int(selection)
+    return [
+        executor.submit(
+            _decompress_chunks,
+            str(path),
+            vlr,
+            header.point_record_length,
+            group,
+            selection,
+        )
+        for group in groups
+    ]
+
+
+def _gather(output: np.ndarray, groups, futures) -> None:
+    output = output.view(np.uint8)
+    position = 0
+    for group, future in zip(groups, futures):
+        decompressed = future.result()
+        output[position : position + len(decompressed)] = decompressed
+        position += len(decompressed)
+
+
+def _decompress_chunks(
+    path: str, vlr: bytes, record_length: int, group, selection: Optional[int] = None
+) -> np.ndarray:
+    start = group[0][0]
+    chunk_table = [(point_count, byte_count) for _, point_count, byte_count in group]
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        compressed = f.read(sum(byte_count for _, byte_count in chunk_table))
+
+    n_points = sum(point_count for point_count, _ in chunk_table)
+    # skipped layers must be zeros, like with laspy
+    decompressed = np.zeros(n_points * record_length, dtype=np.uint8)
+    if selection is not None:
+        selection = laspy.DecompressionSelection(selection).to_lazrs()
+    lazrs.decompress_points_with_chunk_table(
+        compressed, vlr, decompressed, chunk_table, selection
+    )
+    return decompressed
+
+
+class LazWriter:
+    """Write a LAZ file, compressing the points with `workers` processes.
+
+    The output is a standard LAZ file with fixed size chunks, that any LAZ
+    reader can open: the chunks are compressed independently by the workers,
+    then written in order followed by the chunk table.
+
+    Like laspy.LasWriter, the header point counts and bounds are updated with
+    each written batch and patched when the writer is closed.
+
+    An executor from `process_pool` can be given to share its processes
+    between writers, it is not shut down when the writer is closed.
+    """
+
+    # number of LAZ chunks compressed by each task sent to a worker
+    chunks_per_task = 4
+
+    def __init__(
+        self,
+        output_path: Union[Path, str],
+        header: laspy.LasHeader,
+        workers: int,
+        executor: Optional[ProcessPoolExecutor] = None,
+    ):
+        self.header = deepcopy(header)
+        try:
+            self.header.vlrs.pop(self.header.vlrs.index("LasZipVlr"))
+        except ValueError:
+            pass
+        self.header.partial_reset()
+        self.header.are_points_compressed = True
+
+        point_format = self.header.point_format
+        self.vlr = lazrs.LazVlr.new_for_compression(
+            point_format.id, point_format.num_extra_bytes
+        )
+        self.header.vlrs.append(LasZipVlr(self.vlr.record_data()))
+
+        self.workers = workers
+        self._owns_executor = executor is None
+        self._executor = process_pool(workers) if executor is None else executor
+        self._pending = deque()
+        self._remainder = np.empty(0, dtype=np.uint8)
+        self._chunk_table = []
+
+        self.dest = open(output_path, "wb")
+        self.header.write_to(self.dest)
+        self._chunk_table_offset_position = self.dest.tell()
+        self.dest.write(b"\0" * _CHUNK_TABLE_OFFSET_SIZE)
+
+    def write_points(self, points: laspy.PackedPointRecord) -> None:
+        if not len(points):
+            return
+
+        self.header.grow(points)
+
+        record_length = self.header.point_format.size
+        task_size = self.vlr.chunk_size() * record_length * self.chunks_per_task
+
+        data = np.frombuffer(np.ascontiguousarray(points.array), dtype=np.uint8)
+        if len(self._remainder):
+            data = np.concatenate([self._remainder, data])
+
+        n_tasks = len(data) // task_size
+        for n in range(n_tasks):
+            self._submit(data[n * task_size : (n + 1) * task_size])
+        self._remainder = data[n_tasks * task_size :].copy()
+
+    def close(self) -> None:
+        try:
+            if len(self._remainder):
+                self._submit(self._remainder)
+                self._remainder = np.empty(0, dtype=np.uint8)
+            while self._pending:
+                self._write_next()
+
+            chunk_table_offset = self.dest.tell()
+            lazrs.write_chunk_table(self.dest, self._chunk_table, self.vlr)
+            self.dest.seek(self._chunk_table_offset_position)
+            self.dest.write(struct.pack("<q", chunk_table_offset))
+
+            if self.header.point_count == 0:
+                self.header.maxs = [0.0, 0.0, 0.0]
+                self.header.mins = [0.0, 0.0, 0.0]
+            self.dest.seek(0)
+            self.header.write_to(self.dest, ensure_same_size=True)
+        finally:
+            if self._owns_executor:
+                self._executor.shutdown()
+            self.dest.close()
+
+    def __enter__(self) -> "LazWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _submit(self, data: np.ndarray) -> None:
+        # keep a bounded number of tasks in flight, to bound memory
+        if len(self._pending) >= self.workers * 2:
+            self._write_next()
+        future = self._executor.submit(_compress_chunks, self.vlr.record_data(), data)
+        self._pending.append(future)
+
+    def _write_next(self) -> None:
+        compressed, chunk_table = self._pending.popleft().result()
+        self.dest.write(compressed)
+        self._chunk_table.extend(chunk_table)
+
+
+def write_points(
+    output_path: Union[Path, str],
+    header: laspy.LasHeader,
+    points: laspy.PackedPointRecord,
+    workers: int,
+) -> None:
+    """Write points to a LAZ file, compressing them with `workers` processes."""
+    with LazWriter(output_path, header, workers) as writer:
+        writer.write_points(points)
+
+
+def _compress_chunks(vlr: bytes, data: np.ndarray):
+    vlr = lazrs.LazVlr(vlr)
+    compressed = lazrs.compress_points(vlr, data, False)
+    # compressed is: offset to chunk table, chunks, chunk table
+    (chunk_table_offset,) = struct.unpack_from("<q", compressed)
+    chunk_table = lazrs.read_chunk_table(io.BytesIO(compressed), vlr)
+    return compressed[_CHUNK_TABLE_OFFSET_SIZE:chunk_table_offset], chunk_table
@@ -0,0 +1,157 @@
+from collections.abc import Mapping
+from typing import Dict
+
+import numpy as np
+
+from . import decoding, point_formats
+from .header import Header
+
+
+class MappedPoints(Mapping):
+    """Dict-like view of the points of an uncompressed las file mapped in memory.
+
+    Opening the file only parses its header. The keys are the same as the ones
+    `read` returns, but the values are computed when they are accessed:
+
+    - raw dimensions (intensity, gps_time, extra dimensions, ...) are zero-copy
+      views of the file, so only the pages that are touched are loaded in memory
+    - scaled coordinates and bit field sub dimensions (return_number,
+      classification for point formats < 6, ...) are decoded on first access,
+      and then kept
+
+    With `xyz=False`, the coordinates are not part of the keys.
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        offset=None,
+        combine_xyz=True,
+        xyz_dtype=np.float64,
+        other_dims=None,
+        ignore_missing_dims=False,
+        xyz=True,
+    ):
+        with open(path, "rb") as f:
+            self.header = Header(f)
+
+        if self.header.is_compressed:
+            raise ValueError(
+                f"Only uncompressed las files can be memory mapped, {path} is not"
+            )
+
+        self.offset = np.zeros(3) if offset is None else np.asarray(offset, "d")
+        self.xyz_dtype = xyz_dtype
+
+        dtype = point_formats.record_dtype(
+            self.header.point_format,
+            self.header.extra_dimensions,
+            self.header.point_record_length,
+        )
+        if self.header.point_count:
+            self.array = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=self.header.offset_to_point_data,
+                shape=(self.header.point_count,),
+            )
+        else:
+            # an empty memory map is not allowed
+            self.array = np.zeros(0, dtype=dtype)
+
+        self._sub_fields = point_formats.composed_fields(self.header.point_format)
+
+        available_dims = []
+        for name in dtype.names:
+            if name in "XYZ":
+                continue
+            composed = [s for s, (c, _) in self._sub_fields.items() if c == name]
+            available_dims.extend(composed or [name])
+
+        if other_dims is None:
+            other_dims = available_dims
+        missing_dims = [dim for dim in other_dims if dim not in available_dims]
+        if missing_dims and not ignore_missing_dims:
+            raise KeyError(
+                f"Las file {path} does not have dimension '{missing_dims[0]}'"
+            )
+
+        if not xyz:
+            xyz_keys = []
+        elif combine_xyz:
+            xyz_keys = ["xyz"]
+        else:
+            xyz_keys = ["x", "y", "z"]
+        self._keys = xyz_keys + [dim for dim in other_dims if dim in available_dims]
+        self._decoded = {}
+        # contiguous copies of the composed fields, shared by their sub dimensions
+        self._composed = {}
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+
+        if key in self._decoded:
+            return self._decoded[key]
+
+        if key not in self._sub_fields and key not in ("xyz", "x", "y", "z"):
+            # raw dimensions are views of the memory map, nothing to decode
+            return self.array[key]
+
+        value = self._decode(key)
+        self._decoded[key] = value
+        return value
+
+    def to_dict(self, out=None) -> Dict[str, np.ndarray]:
+        """Decode all the keys, copying the raw dimensions out of the file.
+
+        Args:
+            out (dict, optional): Preallocated arrays to decode some keys into.
+        """
+        data = {}
+        for key in self._keys:
+            if key in self._decoded:
+                data[key] = self._decoded[key]
+            else:
+                data[key] = self._decode(key, out)
+        return data
+
+    def _decode(self, key, out=None) -> np.ndarray:
+        n_points = len(self.array)
+        if key in self._sub_fields:
+            composed_field, mask = self._sub_fields[key]
+            shift = (mask & -mask).bit_length() - 1
+            if composed_field not in self._composed:
+                self._composed[composed_field] = np.array(self.array[composed_field])
+            composed = self._composed[composed_field]
+            value = decoding.output_array(out, key, (n_points,), "u1")
+            np.right_shift(composed & mask, shift, out=value, casting="unsafe")
+        elif key == "xyz":
+            value = decoding.output_array(out, key, (n_points, 3), self.xyz_dtype)
+            raw = [self.array[name] for name in "XYZ"]
+            decoding.decode_xyz(
+                raw, self.header.scale, self.header.offset, self.offset, value
+            )
+        elif key in ("x", "y", "z"):
+            axis = "xyz".index(key)
+            value = decoding.output_array(out, key, (n_points,), self.xyz_dtype)
+            decoding.scale_coordinates(
+                self.array["XYZ"[axis]],
+                self.header.scale[axis],
+                self.header.offset[axis],
+                self.offset[axis],
+                value,
+            )
+        else:
+            raw = self.array[key]
+            value = decoding.output_array(out, key, raw.shape, raw.dtype)
+            np.copyto(value, raw, casting="same_kind")
+        return value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -1,7 +1,12 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-from laspy.point.dims import COMPOSED_FIELDS_6, POINT_FORMAT_DIMENSIONS
+from laspy import DecompressionSelection, PointFormat
+from laspy.point.dims import (
+    COMPOSED_FIELDS_0,
+    COMPOSED_FIELDS_6,
+    POINT_FORMAT_DIMENSIONS,
+)
 
 # laspy standard attributes depending on the point format
 _base_format_0 = {
@@ -50,6 +55,42 @@ point_formats = {
 
 supported_point_formats = list(point_formats)
 
+# LAZ layers of point formats >= 6, the other dimensions are extra bytes
+# (x, y, return_number, number_of_returns and scanner_channel are always decoded)
+_decompression_layers = {
+    "z": DecompressionSelection.Z,
+    "classification": DecompressionSelection.CLASSIFICATION,
+    "synthetic": DecompressionSelection.FLAGS,
+    "key_point": DecompressionSelection.FLAGS,
+    "withheld": DecompressionSelection.FLAGS,
+    "overlap": DecompressionSelection.FLAGS,
+    "scan_direction_flag": DecompressionSelection.FLAGS,
+    "edge_of_flight_line": DecompressionSelection.FLAGS,
+    "intensity": DecompressionSelection.INTENSITY,
+    "scan_angle": DecompressionSelection.SCAN_ANGLE,
+    "user_data": DecompressionSelection.USER_DATA,
+    "point_source_id": DecompressionSelection.POINT_SOURCE_ID,
+    "gps_time": DecompressionSelection.GPS_TIME,
+    "red": DecompressionSelection.RGB,
+    "green": DecompressionSelection.RGB,
+    "blue": DecompressionSelection.RGB,
+    "nir": DecompressionSelection.NIR,
+    "wavepacket_index": DecompressionSelection.WAVEPACKET,
+    "wavepacket_offset": DecompressionSelection.WAVEPACKET,
+    "wavepacket_size": DecompressionSelection.WAVEPACKET,
+    "return_point_wave_location": DecompressionSelection.WAVEPACKET,
+    "x_t": DecompressionSelection.WAVEPACKET,
+    "y_t": DecompressionSelection.WAVEPACKET,
+    "z_t": DecompressionSelection.WAVEPACKET,
+}
+_base_layer_dimensions = {
+    "x",
+    "y",
+    "return_number",
+    "number_of_returns",
+    "scanner_channel",
+}
+
 # everything that is not an extra dimension
 standard_dimensions = {
     name for format in POINT_FORMAT_DIMENSIONS.values() for name in format
@@ -97,3 +138,92 @@ def best_point_format(
         return default_format
 
     return min(possible_formats, key=lambda n: len(point_formats[n]))
+
+
+def copc_point_format(point_format: int) -> int:
+    """Returns the point format >= 6 having the dimensions of a point format,
+    COPC files only use point formats 6, 7 and 8."""
+    if point_format >= 6:
+        return point_format
+    return 7 if "red" in point_formats[point_format] else 6
+
+
+def record_dtype(
+    point_format: int,
+    extra_dimensions: Iterable[Tuple[str, np.dtype]] = (),
+    record_length: Optional[int] = None,
+) -> np.dtype:
+    """Returns the numpy structured dtype of a point record, as stored in a las file.
+
+    Composed fields (bit_fields, raw_classification, classification_flags) are
+    kept as raw bytes, use `composed_fields` to decode them.
+
+    Args:
+        point_format (int): The las point format type identifier.
+        extra_dimensions (Iterable[Tuple[str, np.dtype]]): The (name, dtype) of the
+            extra dimensions, in the order of the extra bytes VLR.
+        record_length (int, optional): The size of a point record. If larger than
+            the described fields, the remaining bytes are padding.
+    """
+    dtype = PointFormat(point_format).dtype()
+    names = list(dtype.names)
+    formats = [dtype.fields[name][0] for name in names]
+    offsets = [dtype.fields[name][1] for name in names]
+
+    size = dtype.itemsize
+    for name, extra_dtype in extra_dimensions:
+        extra_dtype = np.dtype(extra_dtype)
+        names.append(name)
+        formats.append(extra_dtype)
+        offsets.append(size)
+        size += extra_dtype.itemsize
+
+    return np.dtype(
+        {
+            "names": names,
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": max(size, record_length or 0),
+        }
+    )
+
+
+def composed_fields(point_format: int) -> Dict[str, Tuple[str, int]]:
+    """Returns the composed field and bit mask of each sub dimension.
+
+    For example: {"return_number": ("bit_fields", 0b0000_0111), ...}
+    """
+    fields = COMPOSED_FIELDS_0 if point_format < 6 else COMPOSED_FIELDS_6
+    return {
+        sub_field.name: (composed_field, sub_field.mask)
+        for composed_field, sub_fields in fields.items()
+        for sub_field in sub_fields
+    }
+
+
+def decompression_selection(
+    dimensions: Optional[Iterable[str]], xyz: bool = True
+) -> DecompressionSelection:
+    """Returns the LAZ layers to decompress to read some dimensions.
+
+    Only LAZ files with point formats >= 6 are compressed by layers,
+    the selection is ignored for the other files.
+
+    Args:
+        dimensions (Iterable[str], optional): The dimensions to read, other than
+            x, y and z. None means all of them.
+        xyz (bool): Whether the coordinates are read.
+    """
+    if dimensions is None:
+        return DecompressionSelection.all()
+
+    selection = DecompressionSelection.base()
+    if xyz:
+        selection |= DecompressionSelection.Z
+    for name in dimensions:
+        if name in _base_layer_dimensions:
+            continue
+        selection |= _decompression_layers.get(
+            name, DecompressionSelection.ALL_EXTRA_BYTES
+        )
+    return selection
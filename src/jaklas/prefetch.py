@@ -0,0 +1,169 @@
+"""Read files one after the other, decoding the next ones in the background.
+
+While the consumer processes a file, the next `prefetch` files are read by
+a pool of threads, or of processes with `workers`. LAZ decompression holds
+the GIL, so processes are needed to decode in parallel with python code.
+The decoded arrays of files read in a process are pickled back to the main
+process, which costs a copy.
+"""
+import asyncio
+import glob
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from . import laz
+from .read import _dimension_dtypes, read, read_header
+
+
+def iter_files(
+    paths,
+    *,
+    prefetch: int = 2,
+    workers: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    **read_kwargs,
+) -> Iterator[Tuple[str, Dict]]:
+    """Read las files one at a time, decoding the next ones in the background.
+
+        for path, data in jaklas.iter_files("tiles/*.laz", prefetch=2, workers=2):
+            jaklas.write(compute(data), output_dir / Path(path).name)
+
+    Args:
+        paths (Union[str, Iterable]): A glob pattern (recursive '**' is supported)
+            or an iterable of paths, consumed as files are read.
+        prefetch (int): The number of files read ahead of the one being processed.
+        workers (int, optional): Read the files in this number of processes.
+            By default, they're read by `prefetch` threads. Processes need an
+            `if __name__ == "__main__":` guard in scripts, see `jaklas.read`.
+        max_bytes (int, optional): A memory budget for the files read ahead and
+            the one being processed. The size of a file is estimated from its
+            header and the dimensions read. A file is read ahead only if it fits
+            in the budget, or if no other file is being read.
+        read_kwargs: The arguments given to `jaklas.read` for each file.
+
+    Yields:
+        Tuple[str, Dict]: Each path and its data, in the order of paths.
+    """
+    prefetcher = _Prefetcher(paths, prefetch, workers, max_bytes, read_kwargs)
+    try:
+        while True:
+            item = prefetcher.next()
+            if item is None:
+                return
+            path, size, future = item
+            yield path, future.result()
+            prefetcher.release(size)
+    finally:
+        prefetcher.close()
+
+
+async def aiter_files(
+    paths,
+    *,
+    prefetch: int = 2,
+    workers: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    **read_kwargs,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """The asyncio version of `iter_files`, the event loop isn't blocked
+    while waiting for a file:
+
+        async for path, data in jaklas.aiter_files(paths):
+            ...
+    """
+    prefetcher = _Prefetcher(paths, prefetch, workers, max_bytes, read_kwargs)
+    try:
+        while True:
+            item = prefetcher.next()
+            if item is None:
+                return
+            path, size, future = item
+            yield path, await asyncio.wrap_future(future)
+            prefetcher.release(size)
+    finally:
+        prefetcher.close()
+
+
+class _Prefetcher:
+    """Submit the reads of the next files, within the prefetch count
+    and the memory budget."""
+
+    def __init__(self, paths, prefetch, workers, max_bytes, read_kwargs):
+        if prefetch < 1:
+            raise ValueError(f"prefetch must be at least 1, got {prefetch}")
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(paths, recursive=True))
+
+        self.paths = iter(paths)
+        self.prefetch = prefetch
+        self.max_bytes = max_bytes
+        self.read_kwargs = read_kwargs
+
+        if workers is not None and workers > 1:
+            self.executor = laz.process_pool(workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=prefetch)
+
+        # (path, estimated size, future) of the files submitted and not yielded
+        self.pending = deque()
+        # the estimated size of the pending files and of the yielded file
+        self.in_flight = 0
+        self._next_path = None
+
+    def next(self) -> Optional[Tuple[str, int, Future]]:
+        """Returns the first submitted file, and submit the next ones so that
+        `prefetch` files are read while it's processed."""
+        self._fill()
+        if not self.pending:
+            return None
+        item = self.pending.popleft()
+        self._fill()
+        return item
+
+    def release(self, size: int) -> None:
+        """The consumer is done with the file of this size."""
+        self.in_flight -= size
+
+    def close(self) -> None:
+        for _, _, future in self.pending:
+            future.cancel()
+        self.executor.shutdown()
+
+    def _fill(self) -> None:
+        while len(self.pending) < self.prefetch:
+            if self._next_path is None:
+                path = next(self.paths, None)
+                if path is None:
+                    return
+                size = 0
+                if self.max_bytes is not None:
+                    size = _decoded_size(read_header(path), self.read_kwargs)
+                self._next_path = (str(path), size)
+
+            path, size = self._next_path
+            over_budget = (
+                self.max_bytes is not None
+                and self.in_flight + size > self.max_bytes
+            )
+            if over_budget and self.in_flight:
+                return
+
+            self._next_path = None
+            self.in_flight += size
+            future = self.executor.submit(read, path, **self.read_kwargs)
+            self.pending.append((path, size, future))
+
+
+def _decoded_size(header, read_kwargs) -> int:
+    """An estimate of the size of the arrays returned by `read` for a file."""
+    dtypes = _dimension_dtypes(header)
+    other_dims = read_kwargs.get("other_dims")
+    if other_dims is not None:
+        dtypes = {dim: dtypes[dim] for dim in other_dims if dim in dtypes}
+    point_size = sum(dtype.itemsize for dtype in dtypes.values())
+    if read_kwargs.get("xyz", True):
+        point_size += 3 * np.dtype(read_kwargs.get("xyz_dtype", np.float64)).itemsize
+    return header.point_count * point_size
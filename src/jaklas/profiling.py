@@ -0,0 +1,213 @@
+"""Opt-in timing and memory instrumentation of the phases of jaklas functions.
+
+    with jaklas.profile(memory=True) as report:
+        jaklas.write(df, "out.laz")
+    print(report)
+
+Instrumented functions record phases like "write.min_max_offset",
+"write.encode" or "read.points". A phase can be recorded many times
+(once per block of points for example), `Profile.summary` adds them up.
+
+When no profile is active, a phase is a shared no-op context manager,
+so the instrumentation costs a context variable lookup per phase.
+
+Threads don't inherit the context of the thread starting them, functions
+running in a thread pool are called with `thread_map` so that their phases
+are recorded too. With memory tracing, the peaks of phases running at the
+same time in different threads are mixed up.
+"""
+import contextvars
+import logging
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Phase = namedtuple("Phase", ["name", "seconds", "bytes", "peak_bytes", "calls"])
+Phase.__doc__ = """A phase of a jaklas function.
+
+seconds: wall time
+bytes: size of the data produced or processed, None if not relevant
+peak_bytes: peak memory allocated during the phase, above what was allocated
+    when it started, None if memory isn't traced
+calls: the number of recorded phases, for summaries
+"""
+
+_active: ContextVar[Optional["Profile"]] = ContextVar("jaklas_profile", default=None)
+
+
+class Profile:
+    """Records the phases of the jaklas functions called in a `profile` block."""
+
+    def __init__(
+        self, callback: Optional[Callable[[Phase], None]] = None, memory: bool = False
+    ):
+        self.callback = callback
+        self.memory = memory
+        self.phases: List[Phase] = []
+        # peaks of the running phases, to report the peak of nested phases
+        # to their parent (tracemalloc has a single peak counter)
+        self._peaks: List[int] = []
+
+    def summary(self) -> Dict[str, Phase]:
+        """The phases added up by name, in order of first appearance."""
+        summary = {}
+        for phase in self.phases:
+            if phase.name not in summary:
+                summary[phase.name] = phase
+                continue
+            total = summary[phase.name]
+            summary[phase.name] = Phase(
+                phase.name,
+                total.seconds + phase.seconds,
+                _add(total.bytes, phase.bytes),
+                _max(total.peak_bytes, phase.peak_bytes),
+                total.calls + phase.calls,
+            )
+        return summary
+
+    def __str__(self) -> str:
+        columns = ("calls", "seconds", "MB", "peak MB")
+        lines = [f"{'phase':<24} " + " ".join(f"{c:>10}" for c in columns)]
+        for phase in self.summary().values():
+            lines.append(
+                f"{phase.name:<24} {phase.calls:>10} {phase.seconds:>10.4f} "
+                f"{_megabytes(phase.bytes):>10} {_megabytes(phase.peak_bytes):>10}"
+            )
+        return "\n".join(lines)
+
+    def _record(self, phase: Phase) -> None:
+        self.phases.append(phase)
+        logger.debug(
+            "%s: %.4f s, %s bytes, %s peak bytes",
+            phase.name,
+            phase.seconds,
+            phase.bytes,
+            phase.peak_bytes,
+        )
+        if self.callback is not None:
+            self.callback(phase)
+
+
+@contextmanager
+def profile(
+    callback: Optional[Callable[[Phase], None]] = None, memory: bool = False
+) -> Iterator[Profile]:
+    """Context manager recording the phases of the jaklas functions it wraps.
+
+    Each phase is appended to the returned `Profile`, logged at the debug level
+    on the "jaklas.profiling" logger, and passed to `callback` if given.
+
+    Args:
+        callback (Callable[[Phase], None], optional): Called after each phase.
+        memory (bool): Trace the peak memory allocated by each phase with
+            tracemalloc. This slows down allocations a lot, the durations are
+            not representative when it is enabled.
+    """
+    report = Profile(callback, memory)
+    start_tracing = memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    token = _active.set(report)
+    try:
+        yield report
+    finally:
+        _active.reset(token)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+class _NullPhase:
+    enabled = False
+    bytes = None
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def __setattr__(self, name, value) -> None:
+        # the shared instance is never modified
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    enabled = True
+
+    def __init__(self, report: Profile, name: str):
+        self.profile = report
+        self.name = name
+        self.bytes = None
+
+    def __enter__(self) -> "_Phase":
+        peaks = self.profile._peaks
+        if self.profile.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._start_memory = current
+            peaks.append(current)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        seconds = time.perf_counter() - self._start
+
+        peak_bytes = None
+        peaks = self.profile._peaks
+        if self.profile.memory:
+            peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - self._start_memory
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+
+        if exc_type is None:
+            self.profile._record(Phase(self.name, seconds, self.bytes, peak_bytes, 1))
+
+
+def phase(name: str):
+    """Context manager timing a phase, if a profile is active.
+
+    The returned object has an `enabled` attribute, and a `bytes` attribute
+    that can be set in the block to report the size of the data processed.
+    """
+    report = _active.get()
+    if report is None:
+        return _NULL_PHASE
+    return _Phase(report, name)
+
+
+def thread_map(executor: Executor, function: Callable, *iterables: Iterable) -> list:
+    """Like executor.map, but each call runs in a copy of the current context,
+    so that an active profile records the phases of the threads."""
+    futures = [
+        executor.submit(contextvars.copy_context().run, function, *args)
+        for args in zip(*iterables)
+    ]
+    return [future.result() for future in futures]
+
+
+def _add(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None or b is None:
+        return a if b is None else b
+    return a + b
+
+
+def _max(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None or b is None:
+        return a if b is None else b
+    return max(a, b)
+
+
+def _megabytes(value: Optional[int]) -> str:
+    return "-" if value is None else f"{value / 1e6:.2f}"
@@ -0,0 +1,89 @@
+"""Coordinate reference systems, and the reprojection of coordinates.
+
+The WKT of each CRS and the transformers between two CRS are cached, so that
+writing or reading many files in the same CRS only builds them once.
+pyproj transformers are thread safe, and release the GIL while transforming,
+so blocks of points are transformed in parallel by a pool of threads.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pyproj
+
+# number of points transformed at a time
+_BLOCK_SIZE = 65_536
+
+
+@functools.lru_cache(maxsize=None)
+def wkt(crs) -> str:
+    """The WKT of a CRS given as an EPSG code, or anything that pyproj accepts."""
+    return pyproj.CRS.from_user_input(crs).to_wkt()
+
+
+@functools.lru_cache(maxsize=256)
+def transformer(source, target) -> pyproj.Transformer:
+    """A transformer from the source CRS to the target CRS, always in (x, y)
+    order (easting, northing or longitude, latitude), like las coordinates."""
+    return pyproj.Transformer.from_crs(
+        pyproj.CRS.from_user_input(source),
+        pyproj.CRS.from_user_input(target),
+        always_xy=True,
+    )
+
+
+def transform_xyz(
+    transformer: pyproj.Transformer,
+    xyz: Sequence[np.ndarray],
+    xyz_offset: Sequence[float] = (0, 0, 0),
+    subtract: Sequence[float] = (0, 0, 0),
+    out: Optional[Sequence[np.ndarray]] = None,
+    workers: Optional[int] = None,
+    scales: Optional[Sequence[float]] = None,
+) -> Sequence[np.ndarray]:
+    """Reproject coordinates block by block.
+
+    Each block is computed as `transform(xyz * scales + xyz_offset) - subtract`
+    in float64, so that the scaling of integer coordinates and the offsets
+    are done in the same pass as the reprojection.
+
+    Args:
+        xyz (Sequence[np.ndarray]): The x, y and z arrays.
+        out (Sequence[np.ndarray], optional): The x, y and z output arrays,
+            of any float dtype. They can be the columns of an (n, 3) array.
+            Defaults to new float64 arrays.
+        workers (int, optional): Transform the blocks with this number of threads.
+        scales (Sequence[float], optional): Multiply the coordinates by these
+            scales first, for the integer coordinates of las files.
+
+    Returns:
+        The x, y and z output arrays.
+    """
+    n_points = len(xyz[0])
+    if out is None:
+        out = [np.empty(n_points, dtype=np.float64) for _ in range(3)]
+    if scales is None:
+        scales = (1, 1, 1)
+
+    def transform_block(start):
+        block = slice(start, start + _BLOCK_SIZE)
+        values = [
+            np.multiply(xyz[axis][block], scales[axis], dtype=np.float64)
+            for axis in range(3)
+        ]
+        for axis in range(3):
+            values[axis] += xyz_offset[axis]
+        transformer.transform(*values, inplace=True)
+        for axis in range(3):
+            values[axis] -= subtract[axis]
+            out[axis][block] = values[axis]
+
+    starts = range(0, n_points, _BLOCK_SIZE)
+    if workers and workers > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(transform_block, starts))
+    else:
+        for start in starts:
+            transform_block(start)
+    return out
@@ -1,9 +1,23 @@
-from typing import Dict
+import glob
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator
 
 import laspy
 import numpy as np
 
+from . import (
+    chunk_bounds,
+    copc,
+    decoding,
+    laz,
+    point_formats,
+    profiling,
+    projection,
+    spatial,
+)
 from .header import Header
+from .memmap import MappedPoints
+from .thinning import Thinning
 
 
 def read(
@@ -14,26 +28,620 @@ def read(
     xyz_dtype=np.float64,
     other_dims=None,
     ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    chunk_size=1_000_000,
+    mmap=False,
+    workers=None,
+    xyz=True,
+    out=None,
+    max_depth=None,
+    resolution=None,
+    every_nth=None,
+    voxel_size=None,
+    voxel_centroid=False,
+    to_crs=None,
 ) -> Dict:
-    if offset is None:
-        offset = np.array([0, 0, 0])
+    """Read a las file.
+
+    Only the requested dimensions are decoded: uncompressed files are memory
+    mapped and only the needed fields of the records are copied, and only the
+    needed layers of LAZ files with point formats >= 6 are decompressed.
+    So reading only `other_dims=["classification"]` with `xyz=False`
+    costs a fraction of a full read.
+
+    When `bbox` or `polygon` is given, only the points inside them are returned.
+    The file is then decoded by chunks of `chunk_size` points that are filtered
+    one at a time, and nothing is decoded if the header bounds don't overlap.
+    Files written with a `spatial_order` also store the bounds of their chunks,
+    and only the chunks overlapping the query are decoded.
+
+    Args:
+        bbox (Sequence[float], optional): (xmin, ymin, xmax, ymax) or
+            (xmin, ymin, zmin, xmax, ymax, zmax), in file coordinates
+            (before `offset` is subtracted). Bounds are inclusive.
+        polygon (array-like, optional): The (n, 2) vertices of a polygon
+            in file coordinates.
+        mmap (bool): Memory map an uncompressed las file instead of reading it.
+            Returns a `jaklas.memmap.MappedPoints` dict-like object, where raw
+            dimensions are zero-copy views of the file and the scaled coordinates
+            and bit field dimensions are decoded when they are accessed.
+        workers (int, optional): Decompress LAZ files with this number of
+            processes. Each process decompresses a group of LAZ chunks directly
+            from the file. Starting the processes takes some time, so this is
+            only worth it for large files. Scripts must call `read` under
+            `if __name__ == "__main__":`, see `jaklas.laz.process_pool`.
+        xyz (bool): Whether to read the coordinates. If False, only `other_dims`
+            are returned.
+        out (Dict[str, np.ndarray], optional): Preallocated arrays to read some
+            of the returned keys into, like {"xyz": np.empty((n, 3), "f4")}.
+            They must have the shape of the result, and are returned in place
+            of new arrays. The coordinates are decoded block by block directly
+            in the output, so they never take more than its size in memory.
+        max_depth (int, optional): For COPC files, only read the octree nodes
+            down to this depth, the root being at depth 0. See `jaklas.copc`.
+        resolution (float, optional): For COPC files, only read the octree nodes
+            down to the depth whose point spacing is at most this resolution.
+
+        every_nth (int, optional): Only keep one point out of `every_nth`.
+        voxel_size (float, optional): Only keep the first point of each voxel
+            of this size. The voxels are aligned on the header minimum.
+        voxel_centroid (bool): With `voxel_size`, the coordinates of the kept
+            points are the centroid of the points of their voxel (rounded
+            to the scale of the file), the other dimensions are the ones
+            of the first point.
+        to_crs (int, optional): Reproject the coordinates from the CRS of the
+            file to this EPSG code (or any CRS that pyproj accepts). The
+            reprojection is done block by block while the coordinates are
+            decoded, before `offset` is subtracted. The transformers are
+            cached, see `jaklas.projection`.
+
+    With COPC files, `bbox`, `polygon`, `max_depth` and `resolution` only
+    decompress the octree nodes that are needed.
+
+    Like the filtering, the thinning by `every_nth` and `voxel_size` is done
+    chunk by chunk, so the memory used depends on the number of returned points.
+    `every_nth` is applied first, to the points inside `bbox` and `polygon`.
+    """
+    thinned = every_nth is not None or voxel_size is not None
+
+    if mmap:
+        if bbox is not None or polygon is not None or thinned or to_crs is not None:
+            raise ValueError(
+                "mmap can't be used with bbox, polygon, every_nth, voxel_size "
+                "or to_crs"
+            )
+        return MappedPoints(
+            path,
+            offset=offset,
+            combine_xyz=combine_xyz,
+            xyz_dtype=xyz_dtype,
+            other_dims=other_dims,
+            ignore_missing_dims=ignore_missing_dims,
+            xyz=xyz,
+        )
+
+    filtered = bbox is not None or polygon is not None
+    header = read_header(path)
+
+    by_depth = max_depth is not None or resolution is not None
+    if by_depth and not header.is_copc:
+        raise ValueError(f"max_depth and resolution need a COPC file, {path} is not")
+
+    transformer = None
+    if xyz and to_crs is not None:
+        transformer = _transformer(header, path, to_crs)
+
+    thinning = None
+    if thinned or voxel_centroid:
+        thinning = Thinning(
+            every_nth, voxel_size, voxel_centroid, header.min, header.max
+        )
+
+    decoded = filtered or thinning is not None or transformer is not None
+    if not decoded and _can_map(header, other_dims):
+        with profiling.phase("read.mapped") as phase:
+            data = MappedPoints(
+                path,
+                offset=offset,
+                combine_xyz=combine_xyz,
+                xyz_dtype=xyz_dtype,
+                other_dims=other_dims,
+                ignore_missing_dims=ignore_missing_dims,
+                xyz=xyz,
+            ).to_dict(out)
+            phase.bytes = _nbytes(data) if phase.enabled else None
+        return data
+
+    # the coordinates are needed to filter the points
+    selection = point_formats.decompression_selection(
+        other_dims, xyz or filtered or voxel_size is not None
+    )
+
+    with profiling.phase("read.points") as phase:
+        if header.is_copc and (filtered or by_depth):
+            las = copc.read_points(
+                path, bbox, polygon, max_depth, resolution, selection
+            )
+            if thinning is not None:
+                las = thinning.finish(thinning.filter(las))
+        elif filtered or thinning is not None:
+            las = _read_filtered(
+                path, bbox, polygon, chunk_size, workers, selection, thinning
+            )
+        elif _use_workers(header, workers):
+            las = laz.read_points(path, workers, selection)
+        else:
+            las = laspy.read(str(path), decompression_selection=selection)
+        # laspy.read returns a LasData, the others return points records
+        phase.bytes = getattr(las, "points", las).array.nbytes
+
+    with profiling.phase("read.decode") as phase:
+        data = _points_to_dict(
+            las,
+            path,
+            offset=offset,
+            combine_xyz=combine_xyz,
+            xyz_dtype=xyz_dtype,
+            other_dims=other_dims,
+            ignore_missing_dims=ignore_missing_dims,
+            xyz=xyz,
+            out=out,
+            transformer=transformer,
+            workers=workers,
+        )
+        phase.bytes = _nbytes(data) if phase.enabled else None
+    return data
+
+
+def iter_read(
+    path,
+    *,
+    chunk_size=1_000_000,
+    offset=None,
+    combine_xyz=True,
+    xyz_dtype=np.float64,
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    workers=None,
+    xyz=True,
+    to_crs=None,
+) -> Iterator[Dict]:
+    """Read a las file by chunks of at most `chunk_size` points.
+
+    This is the streaming counterpart of `read`: each yielded dict has the same
+    keys and dtypes as what `read` would return for the whole file, so peak
+    memory depends on `chunk_size` and not on the number of points in the file.
+
+    When filtering with `bbox` or `polygon`, chunks with no points inside
+    are skipped and the others are smaller than `chunk_size`.
+
+    With `workers`, the next chunks of a LAZ file are decompressed in parallel
+    while the current one is processed, see `read`.
+
+    Like with `read`, only the layers of LAZ files needed for `other_dims`
+    and `xyz` are decompressed, and `to_crs` reprojects the coordinates.
+    """
+    filtered = bbox is not None or polygon is not None
+    transformer = None
+    if xyz and to_crs is not None:
+        transformer = _transformer(read_header(path), path, to_crs)
+    selection = point_formats.decompression_selection(other_dims, xyz or filtered)
+    for points in _iter_points(path, chunk_size, bbox, polygon, workers, selection):
+        yield _points_to_dict(
+            points,
+            path,
+            offset=offset,
+            combine_xyz=combine_xyz,
+            xyz_dtype=xyz_dtype,
+            other_dims=other_dims,
+            ignore_missing_dims=ignore_missing_dims,
+            xyz=xyz,
+            transformer=transformer,
+        )
+
+
+def read_many(
+    paths,
+    *,
+    workers=None,
+    offset=None,
+    combine_xyz=True,
+    xyz_dtype=np.float64,
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    chunk_size=1_000_000,
+    xyz=True,
+    source_index=None,
+) -> Dict:
+    """Read many las files into a single dict of arrays.
+
+    The output arrays are allocated once from the point counts of the headers,
+    and each file is decoded directly into its slice of them, so there is no
+    concatenation that would double the peak memory.
+
+    Files are read `workers` at a time by a thread pool. LAZ files are then
+    decompressed by a pool of `workers` processes shared by all the files,
+    which needs an `if __name__ == "__main__":` guard in scripts, see `read`.
+
+    When `bbox` or `polygon` is given, the files that don't overlap them are
+    skipped, and the files whose bounds are inside `bbox` are read whole.
+    The others are filtered first, and copied in the output once its size is known.
+
+    Args:
+        paths (Union[str, Iterable]): A glob pattern (recursive '**' is supported)
+            or an iterable of paths.
+        other_dims (List[str], optional): The dimensions to read. None means the
+            dimensions found in all the files.
+        ignore_missing_dims (bool): If False, a dimension of `other_dims` missing
+            from a file raises a KeyError. If True, it's filled with zeros for
+            the points of these files, and left out when no file has it.
+        source_index (str, optional): The name of a key holding the index in
+            `paths` of the file of each point.
+
+    See `read` for the other arguments.
+    """
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths, recursive=True))
+    paths = [str(p) for p in paths]
+    workers = workers or 1
+    filtered = bbox is not None or polygon is not None
+
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        with profiling.phase("read_many.headers"):
+            headers = profiling.thread_map(threads, read_header, paths)
+
+        dtypes = _many_dimension_dtypes(paths, headers, other_dims, ignore_missing_dims)
+        options = dict(
+            offset=offset,
+            combine_xyz=combine_xyz,
+            xyz_dtype=xyz_dtype,
+            chunk_size=chunk_size,
+            xyz=xyz,
+        )
+
+        counts = [header.point_count for header in headers]
+        partial = []
+        for n, header in enumerate(headers):
+            if not filtered or not header.point_count:
+                continue
+            if not spatial.overlaps(header.min, header.max, bbox, polygon):
+                counts[n] = 0
+            elif polygon is not None or not spatial.contains(
+                header.min, header.max, bbox
+            ):
+                partial.append(n)
+
+        executor = None
+        if workers > 1 and any(header.is_compressed for header in headers):
+            executor = laz.process_pool(workers)
+
+        # the point counts of the partial files are taken from the coordinates
+        # when nothing else is read
+        partial_options = {**options, "xyz": xyz or not dtypes}
+        try:
+            with profiling.phase("read_many.filtered"):
+                # the partial files are filtered first, to know their point counts
+                filtered_data = dict(
+                    zip(
+                        partial,
+                        profiling.thread_map(
+                            threads,
+                            lambda n: _read_one(
+                                paths[n],
+                                headers[n],
+                                dtypes,
+                                bbox=bbox,
+                                polygon=polygon,
+                                executor=executor,
+                                workers=workers,
+                                **partial_options,
+                            ),
+                            partial,
+                        ),
+                    )
+                )
+                for n, data in filtered_data.items():
+                    counts[n] = len(next(iter(data.values()), ()))
+
+            with profiling.phase("read_many.points") as phase:
+                starts = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+                data = _allocate_many(
+                    int(starts[-1]), dtypes, source_index, len(paths), **options
+                )
+
+                def read_slice(n):
+                    out = {k: v[starts[n] : starts[n + 1]] for k, v in data.items()}
+                    if source_index is not None:
+                        out.pop(source_index)[:] = n
+                    if n in filtered_data:
+                        values = filtered_data.pop(n)
+                    elif counts[n]:
+                        values = _read_one(
+                            paths[n],
+                            headers[n],
+                            dtypes,
+                            executor=executor,
+                            workers=workers,
+                            out=out,
+                            **options,
+                        )
+                    else:
+                        return
+                    for key, output in out.items():
+                        if key not in values:
+                            output[:] = 0
+                        elif values[key] is not output:
+                            np.copyto(output, values[key], casting="same_kind")
+
+                profiling.thread_map(threads, read_slice, range(len(paths)))
+                phase.bytes = _nbytes(data)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    return data
+
+
+def _dimension_dtypes(header: Header) -> Dict[str, np.dtype]:
+    """The dimensions of a file, other than x, y and z, and their dtype
+    in the arrays returned by `read`."""
+    dtype = point_formats.record_dtype(header.point_format, header.extra_dimensions)
+    sub_fields = point_formats.composed_fields(header.point_format)
+    scaled = header.scaled_extra_dimensions
+
+    dtypes = {}
+    for name in dtype.names:
+        if name in "XYZ":
+            continue
+        composed = [s for s, (c, _) in sub_fields.items() if c == name]
+        if composed:
+            dtypes.update((sub_field, np.dtype("u1")) for sub_field in composed)
+        elif name in scaled:
+            dtypes[name] = np.dtype((np.float64, dtype.fields[name][0].shape))
+        else:
+            dtypes[name] = dtype.fields[name][0]
+    return dtypes
 
+
+def _many_dimension_dtypes(
+    paths, headers, other_dims, ignore_missing_dims
+) -> Dict[str, np.dtype]:
+    """The dimensions to read from many files, with a dtype that can hold
+    the values of all of them."""
+    file_dtypes = [_dimension_dtypes(header) for header in headers]
+    if other_dims is None:
+        other_dims = [
+            dim
+            for dim in (file_dtypes[0] if file_dtypes else [])
+            if all(dim in dtypes for dtypes in file_dtypes)
+        ]
+
+    result = {}
+    for dim in other_dims:
+        found = [dtypes[dim] for dtypes in file_dtypes if dim in dtypes]
+        if len(found) < len(file_dtypes) and not ignore_missing_dims:
+            path = paths[next(n for n, d in enumerate(file_dtypes) if dim not in d)]
+            raise KeyError(f"Las file {path} does not have dimension '{dim}'")
+        if found:
+            base = np.result_type(*(dtype.base for dtype in found))
+            result[dim] = np.dtype((base, found[0].shape))
+    return result
+
+
+def _allocate_many(
+    n_points, dtypes, source_index, n_files, *, combine_xyz, xyz_dtype, xyz, **_
+) -> Dict[str, np.ndarray]:
     data = {}
+    if xyz and combine_xyz:
+        data["xyz"] = np.empty((n_points, 3), dtype=xyz_dtype)
+    elif xyz:
+        for key in "xyz":
+            data[key] = np.empty(n_points, dtype=xyz_dtype)
+    for dim, dtype in dtypes.items():
+        data[dim] = np.empty((n_points, *dtype.shape), dtype=dtype.base)
+    if source_index is not None:
+        data[source_index] = np.empty(n_points, np.min_scalar_type(max(n_files - 1, 0)))
+    return data
+
+
+def _read_one(
+    path,
+    header: Header,
+    dtypes,
+    *,
+    executor,
+    workers,
+    bbox=None,
+    polygon=None,
+    out=None,
+    chunk_size,
+    xyz,
+    **options,
+) -> Dict:
+    """Read the dimensions of `dtypes` that are in a file, for read_many."""
+    file_dims = _dimension_dtypes(header)
+    other_dims = [dim for dim in dtypes if dim in file_dims]
+
+    if executor is None or not header.is_compressed:
+        return read(
+            path,
+            other_dims=other_dims,
+            bbox=bbox,
+            polygon=polygon,
+            chunk_size=chunk_size,
+            xyz=xyz,
+            out=out,
+            **options,
+        )
+
+    filtered = bbox is not None or polygon is not None
+    selection = point_formats.decompression_selection(other_dims, xyz or filtered)
+    if filtered:
+        # only the filtered chunks are kept, like with read
+        points = _read_filtered(
+            path, bbox, polygon, chunk_size, workers, selection, executor=executor
+        )
+    else:
+        points = laz.read_points(path, workers, selection, executor=executor)
+    return _points_to_dict(
+        points,
+        path,
+        other_dims=other_dims,
+        ignore_missing_dims=False,
+        xyz=xyz,
+        out=out,
+        **options,
+    )
+
+
+def _use_workers(header: Header, workers) -> bool:
+    return workers is not None and workers > 1 and header.is_compressed
+
 
-    las = laspy.read(str(path))
+def _can_map(header: Header, other_dims) -> bool:
+    """When some dimensions are selected in an uncompressed file, it's memory
+    mapped to copy only the needed fields. Scaled extra dimensions are left
+    to laspy, and so are full reads, where laspy decodes bit fields lazily."""
+    if header.is_compressed or other_dims is None:
+        return False
+    return not any(dim in other_dims for dim in header.scaled_extra_dimensions)
 
-    x = (las.x - offset[0]).astype(xyz_dtype)
-    y = (las.y - offset[1]).astype(xyz_dtype)
-    z = (las.z - offset[2]).astype(xyz_dtype)
 
-    if combine_xyz:
-        data["xyz"] = np.hstack([x[np.newaxis].T, y[np.newaxis].T, z[np.newaxis].T])
+def _iter_chunks(path, chunk_size, workers, selection, ranges=None, executor=None):
+    """Yield the points by chunks of `chunk_size`, only in the (start, stop)
+    point `ranges` when they are given (with workers, the LAZ chunks
+    overlapping them)."""
+    if _use_workers(read_header(path), workers):
+        batches = laz.iter_points(
+            path, chunk_size, workers, selection, ranges, executor
+        )
+        for points in batches:
+            # batches of LAZ chunks can be larger than chunk_size
+            for start in range(0, len(points), chunk_size):
+                yield points[start : start + chunk_size]
     else:
-        data["x"] = x
-        data["y"] = y
-        data["z"] = z
+        with laspy.open(str(path), decompression_selection=selection) as f:
+            if ranges is None:
+                yield from f.chunk_iterator(chunk_size)
+                return
+            for start, stop in ranges:
+                f.seek(start)
+                for position in range(start, stop, chunk_size):
+                    yield f.read_points(min(chunk_size, stop - position))
 
-    del x, y, z
+
+def _iter_points(
+    path, chunk_size, bbox, polygon, workers, selection, executor=None
+):
+    if bbox is None and polygon is None:
+        yield from _iter_chunks(path, chunk_size, workers, selection, None, executor)
+        return
+
+    header = read_header(path)
+    if not spatial.overlaps(header.min, header.max, bbox, polygon):
+        return
+
+    # with chunk bounds, only the chunks overlapping the query are decoded
+    ranges = chunk_bounds.ranges(header, bbox, polygon)
+    chunks = _iter_chunks(path, chunk_size, workers, selection, ranges, executor)
+    for points in chunks:
+        mask = spatial.mask(points.x, points.y, points.z, bbox, polygon)
+        if mask.all():
+            yield points
+        elif mask.any():
+            yield points[mask]
+
+
+def _read_filtered(
+    path, bbox, polygon, chunk_size, workers, selection, thinning=None, executor=None
+) -> laspy.ScaleAwarePointRecord:
+    chunks = []
+    filtered = _iter_points(
+        path, chunk_size, bbox, polygon, workers, selection, executor
+    )
+    for points in filtered:
+        if thinning is not None:
+            points = thinning.filter(points)
+        chunks.append(points.array)
+
+    with open(path, "rb") as f:
+        header = laspy.LasHeader.read_from(f)
+
+    if not chunks:
+        return laspy.ScaleAwarePointRecord.zeros(0, header=header)
+
+    points = laspy.ScaleAwarePointRecord(
+        np.concatenate(chunks), header.point_format, header.scales, header.offsets
+    )
+    if thinning is not None:
+        points = thinning.finish(points)
+    return points
+
+
+def _points_to_dict(
+    las,
+    path,
+    *,
+    offset,
+    combine_xyz,
+    xyz_dtype,
+    other_dims,
+    ignore_missing_dims,
+    xyz=True,
+    out=None,
+    transformer=None,
+    workers=None,
+) -> Dict:
+    if offset is None:
+        offset = np.array([0, 0, 0])
+
+    if isinstance(las, laspy.LasData):
+        las = las.points
+
+    data = {}
+    n_points = len(las)
+
+    if xyz and transformer is not None:
+        if combine_xyz:
+            data["xyz"] = decoding.output_array(out, "xyz", (n_points, 3), xyz_dtype)
+            outputs = [data["xyz"][:, axis] for axis in range(3)]
+        else:
+            for key in "xyz":
+                data[key] = decoding.output_array(out, key, (n_points,), xyz_dtype)
+            outputs = [data[key] for key in "xyz"]
+        projection.transform_xyz(
+            transformer,
+            [las.X, las.Y, las.Z],
+            xyz_offset=las.offsets,
+            subtract=offset,
+            out=outputs,
+            workers=workers,
+            scales=las.scales,
+        )
+    elif xyz:
+        raw = [las.X, las.Y, las.Z]
+        if combine_xyz:
+            data["xyz"] = decoding.decode_xyz(
+                raw,
+                las.scales,
+                las.offsets,
+                offset,
+                decoding.output_array(out, "xyz", (n_points, 3), xyz_dtype),
+            )
+        else:
+            for axis, key in enumerate("xyz"):
+                data[key] = decoding.scale_coordinates(
+                    raw[axis],
+                    las.scales[axis],
+                    las.offsets[axis],
+                    offset[axis],
+                    decoding.output_array(out, key, (n_points,), xyz_dtype),
+                )
 
     if other_dims is None:
         other_dims = set(las.point_format.dimension_names) - set("XYZ")
@@ -45,27 +653,144 @@ def read(
             else:
                 raise KeyError(f"Las file {path} does not have dimension '{dim}'")
 
-        data[dim] = getattr(las, dim)
+        value = getattr(las, dim)
+        if out is not None and dim in out:
+            value = np.asarray(value)
+            output = decoding.output_array(out, dim, value.shape, value.dtype)
+            np.copyto(output, value, casting="same_kind")
+            value = output
+        data[dim] = value
 
     return data
 
 
+def _transformer(header: Header, path, to_crs):
+    source = header.crs_wkt
+    if source is None:
+        raise ValueError(f"Las file {path} has no CRS to reproject from")
+    return projection.transformer(source, to_crs)
+
+
 def read_header(path) -> Header:
-    """Read some header information from las file.
+    """Read the header and the VLRs of a las file, without going through laspy.
+
+    See `jaklas.header.Header` for the available attributes.
 
     The main use case of this function if when you have a large list
     of las files, and you want to quickly scan bounding boxes.
 
-    Should be roughly 50x faster than laspy,
-    and close to 10x than the master branch of laspy.
+    Should be more than 10x faster than laspy, see the read_header and
+    laspy_read_header cases of `benchmarks/run.py`.
     """
-    with open(path, "rb") as f:
-        return Header(f)
+    with profiling.phase("read_header") as phase, open(path, "rb") as f:
+        header = Header(f)
+        phase.bytes = header.offset_to_point_data
+    return header
 
 
-def read_pandas(path, *, offset=None, xyz_dtype="d", other_dims=None, ignore_missing_dims=False):
-    import pandas as pd
+def read_pandas(
+    path,
+    *,
+    offset=None,
+    xyz_dtype="d",
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    chunk_size=1_000_000,
+    workers=None,
+    xyz=True,
+    max_depth=None,
+    resolution=None,
+    every_nth=None,
+    voxel_size=None,
+    voxel_centroid=False,
+    to_crs=None,
+):
+    data = read(
+        path,
+        offset=offset,
+        combine_xyz=False,
+        xyz_dtype=xyz_dtype,
+        other_dims=other_dims,
+        ignore_missing_dims=ignore_missing_dims,
+        bbox=bbox,
+        polygon=polygon,
+        chunk_size=chunk_size,
+        workers=workers,
+        xyz=xyz,
+        max_depth=max_depth,
+        resolution=resolution,
+        every_nth=every_nth,
+        voxel_size=voxel_size,
+        voxel_centroid=voxel_centroid,
+        to_crs=to_crs,
+    )
+
+    with profiling.phase("read_pandas.dataframe") as phase:
+        df = _to_dataframe(data)
+        if phase.enabled:
+            phase.bytes = int(df.memory_usage(index=False).sum())
+    return df
+
 
+def iter_read_pandas(
+    path,
+    *,
+    chunk_size=1_000_000,
+    offset=None,
+    xyz_dtype="d",
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    workers=None,
+    xyz=True,
+    to_crs=None,
+):
+    """Read a las file by chunks of at most `chunk_size` points as DataFrames."""
+    for data in iter_read(
+        path,
+        chunk_size=chunk_size,
+        offset=offset,
+        combine_xyz=False,
+        xyz_dtype=xyz_dtype,
+        other_dims=other_dims,
+        ignore_missing_dims=ignore_missing_dims,
+        bbox=bbox,
+        polygon=polygon,
+        workers=workers,
+        xyz=xyz,
+        to_crs=to_crs,
+    ):
+        yield _to_dataframe(data)
+
+
+def read_arrow(
+    path,
+    *,
+    offset=None,
+    xyz_dtype="d",
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    chunk_size=1_000_000,
+    workers=None,
+    xyz=True,
+    max_depth=None,
+    resolution=None,
+    every_nth=None,
+    voxel_size=None,
+    voxel_centroid=False,
+    to_crs=None,
+):
+    """Read a las file as a `pyarrow.Table`, with x, y and z columns.
+
+    The columns are built on the decoded arrays, without copying them
+    (except boolean dimensions, which Arrow stores as bits).
+    See `read` for the arguments.
+    """
     data = read(
         path,
         offset=offset,
@@ -73,9 +798,80 @@ def read_pandas(path, *, offset=None, xyz_dtype="d", other_dims=None, ignore_mis
         xyz_dtype=xyz_dtype,
         other_dims=other_dims,
         ignore_missing_dims=ignore_missing_dims,
+        bbox=bbox,
+        polygon=polygon,
+        chunk_size=chunk_size,
+        workers=workers,
+        xyz=xyz,
+        max_depth=max_depth,
+        resolution=resolution,
+        every_nth=every_nth,
+        voxel_size=voxel_size,
+        voxel_centroid=voxel_centroid,
+        to_crs=to_crs,
     )
 
+    with profiling.phase("read_arrow.table") as phase:
+        table = _to_arrow(data)
+        phase.bytes = table.nbytes
+    return table
+
+
+def iter_read_arrow(
+    path,
+    *,
+    chunk_size=1_000_000,
+    offset=None,
+    xyz_dtype="d",
+    other_dims=None,
+    ignore_missing_dims=False,
+    bbox=None,
+    polygon=None,
+    workers=None,
+    xyz=True,
+    to_crs=None,
+):
+    """Read a las file by chunks of at most `chunk_size` points
+    as `pyarrow.RecordBatch` objects."""
+    for data in iter_read(
+        path,
+        chunk_size=chunk_size,
+        offset=offset,
+        combine_xyz=False,
+        xyz_dtype=xyz_dtype,
+        other_dims=other_dims,
+        ignore_missing_dims=ignore_missing_dims,
+        bbox=bbox,
+        polygon=polygon,
+        workers=workers,
+        xyz=xyz,
+        to_crs=to_crs,
+    ):
+        yield _to_arrow(data, batch=True)
+
+
+def _nbytes(data: Dict) -> int:
+    """The size of the arrays of a dict returned by read (bit fields
+    decoded lazily by laspy are not counted)."""
+    return sum(value.nbytes for value in data.values() if hasattr(value, "nbytes"))
+
+
+def _to_dataframe(data):
+    import pandas as pd
+
     # laspy is reading some attributes as type object instead of array
     data = {k: np.ascontiguousarray(v) for k, v in data.items()}
 
-    return pd.DataFrame(data)
+    # the arrays are new (or contiguous copies), no need to copy them again
+    return pd.DataFrame(data, copy=False)
+
+
+def _to_arrow(data, batch=False):
+    import pyarrow as pa
+
+    names = list(data)
+    # pa.array wraps contiguous numeric arrays without copying them
+    arrays = [pa.array(np.ascontiguousarray(data[name])) for name in names]
+    if batch:
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+    return pa.Table.from_arrays(arrays, names=names)
@@ -0,0 +1,187 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def bbox_bounds(bbox: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the minimum and maximum xyz corners of a bounding box.
+
+    Args:
+        bbox (Sequence[float]): Either (xmin, ymin, xmax, ymax), in which case
+            z is not bounded, or (xmin, ymin, zmin, xmax, ymax, zmax).
+    """
+    bbox = np.asarray(bbox, "d")
+    if bbox.shape == (4,):
+        min_ = np.array([bbox[0], bbox[1], -np.inf])
+        max_ = np.array([bbox[2], bbox[3], np.inf])
+    elif bbox.shape == (6,):
+        min_, max_ = bbox[:3], bbox[3:]
+    else:
+        raise ValueError(
+            "bbox must be (xmin, ymin, xmax, ymax) or "
+            f"(xmin, ymin, zmin, xmax, ymax, zmax), got {bbox.tolist()}"
+        )
+    return min_, max_
+
+
+def polygon_bounds(polygon) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the minimum and maximum xyz corners of a 2d polygon."""
+    vertices = _vertices(polygon)
+    min_ = np.array([*vertices.min(axis=0), -np.inf])
+    max_ = np.array([*vertices.max(axis=0), np.inf])
+    return min_, max_
+
+
+def overlaps(min_, max_, bbox=None, polygon=None) -> bool:
+    """Returns True if the box given by min_ and max_ can contain points
+    inside bbox and polygon."""
+    min_ = np.asarray(min_, "d")
+    max_ = np.asarray(max_, "d")
+    for bounds in query_bounds(bbox, polygon):
+        if np.any(max_ < bounds[0]) or np.any(min_ > bounds[1]):
+            return False
+    return True
+
+
+def contains(min_, max_, bbox) -> bool:
+    """Returns True if the box given by min_ and max_ is inside bbox,
+    so that all its points are inside bbox too."""
+    bounds = bbox_bounds(bbox)
+    return bool(
+        np.all(np.asarray(min_, "d") >= bounds[0])
+        and np.all(np.asarray(max_, "d") <= bounds[1])
+    )
+
+
+def mask(x, y, z, bbox=None, polygon=None) -> np.ndarray:
+    """Returns a boolean mask of the points inside bbox and polygon.
+
+    Bounds are inclusive. The polygon containment uses the even-odd rule,
+    and is only computed for points inside the polygon bounding box.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    z = np.asarray(z)
+
+    inside = np.ones(len(x), dtype=bool)
+    for min_, max_ in query_bounds(bbox, polygon):
+        for coords, lower, upper in zip((x, y, z), min_, max_):
+            if np.isfinite(lower):
+                inside &= coords >= lower
+            if np.isfinite(upper):
+                inside &= coords <= upper
+
+    if polygon is not None:
+        candidates = np.flatnonzero(inside)
+        inside[candidates] = polygon_mask(x[candidates], y[candidates], polygon)
+
+    return inside
+
+
+def polygon_mask(x, y, polygon) -> np.ndarray:
+    """Returns a boolean mask of the points inside a 2d polygon.
+
+    Args:
+        polygon (array-like): The (n, 2) polygon vertices. The polygon is closed
+            automatically, repeating the first vertex at the end is optional.
+    """
+    vertices = _vertices(polygon)
+
+    inside = np.zeros(len(x), dtype=bool)
+    x0, y0 = vertices[-1]
+    for x1, y1 in vertices:
+        crosses = (y0 > y) != (y1 > y)
+        if crosses.any():
+            # x coordinate where the edge crosses the horizontal line of each point
+            x_edge = x0 + (x1 - x0) * (y[crosses] - y0) / (y1 - y0)
+            inside[crosses] ^= x[crosses] < x_edge
+        x0, y0 = x1, y1
+
+    return inside
+
+
+def _vertices(polygon) -> np.ndarray:
+    vertices = np.asarray(polygon, "d")
+    if vertices.ndim != 2 or vertices.shape[1] < 2 or len(vertices) < 3:
+        raise ValueError("polygon must be an array-like of at least 3 (x, y) vertices")
+    return vertices[:, :2]
+
+
+def query_bounds(bbox: Optional[Sequence[float]], polygon) -> list:
+    """Returns the (min, max) xyz corners of each of the bbox and polygon given."""
+    bounds = []
+    if bbox is not None:
+        bounds.append(bbox_bounds(bbox))
+    if polygon is not None:
+        bounds.append(polygon_bounds(polygon))
+    return bounds
+
+
+def curve_order(x, y, curve: str = "morton", bits: int = 16) -> np.ndarray:
+    """Returns the indices that sort 2d points along a space-filling curve.
+
+    The points are snapped to a grid of 2 ** bits square cells per axis
+    covering their bounding box, and sorted by the index of their cell
+    on the curve. Points of the same cell keep their order.
+
+    Args:
+        curve (str): "morton" (z-order) or "hilbert". The hilbert curve
+            has a better locality, the morton curve is faster to compute.
+    """
+    x = np.asarray(x, "d")
+    y = np.asarray(y, "d")
+    if not len(x):
+        return np.zeros(0, dtype=np.intp)
+
+    min_x, min_y = x.min(), y.min()
+    extent = max(x.max() - min_x, y.max() - min_y) or 1.0
+    cell_count = 2 ** bits
+    ix = np.minimum((x - min_x) * (cell_count / extent), cell_count - 1)
+    iy = np.minimum((y - min_y) * (cell_count / extent), cell_count - 1)
+    ix = ix.astype(np.int64)
+    iy = iy.astype(np.int64)
+
+    if curve == "morton":
+        keys = morton_keys(ix, iy)
+    elif curve == "hilbert":
+        keys = hilbert_keys(ix, iy, bits)
+    else:
+        raise ValueError(f"Unknown curve '{curve}', expected 'morton' or 'hilbert'")
+    return np.argsort(keys, kind="stable")
+
+
+def morton_keys(ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+    """Interleave the bits of two arrays of 32 bits integer cells."""
+    return _spread_bits(ix) | (_spread_bits(iy) << 1)
+
+
+def hilbert_keys(ix: np.ndarray, iy: np.ndarray, bits: int) -> np.ndarray:
+    """The distance of integer cells along a hilbert curve
+    covering 2 ** bits cells per axis."""
+    x = np.asarray(ix, dtype=np.int64)
+    y = np.asarray(iy, dtype=np.int64)
+    keys = np.zeros(len(x), dtype=np.int64)
+    last = 2 ** bits - 1
+    s = 2 ** (bits - 1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant, so that the curve is continuous
+        flip = rx & ~ry
+        x = np.where(flip, last - x, x)
+        y = np.where(flip, last - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return keys
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each bit of 32 bits integers."""
+    v = values.astype(np.uint64) & 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
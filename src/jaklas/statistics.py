@@ -0,0 +1,261 @@
+"""Statistics of las files computed in one streaming pass over their points.
+
+Each file is read by chunks with `iter_read`, and the statistics of the chunks
+are accumulated, so the memory used doesn't depend on the size of the files.
+The statistics of different files are merged, which lets a pool of processes
+compute them in parallel, each holding a single chunk at a time.
+"""
+import glob
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import laz
+from .read import _dimension_dtypes, iter_read, read_header
+
+
+class Stats:
+    """Statistics of the points of one or many las files.
+
+    Statistics computed on different points are combined with `merge`,
+    or with `+`.
+
+    Attributes:
+        point_count (int): The number of points.
+        min, max, sum (Dict[str, np.ndarray]): The minimum, the maximum and the
+            sum of the values of each dimension (x, y, z and the other ones).
+        counts (Dict[str, int]): The number of points having each dimension,
+            the same as point_count unless some files don't have it.
+        classification (np.ndarray): The number of points of each class, from 0
+            to 255, when the classification is part of the dimensions.
+        return_number (np.ndarray): The number of points of each return number,
+            from 0 to 15, when the return number is part of the dimensions.
+        cell_size (float): The size of the cells of the density grid.
+        density (np.ndarray): The number of points of each cell, indexed by
+            [x, y], when a cell_size is given. The cells are aligned on
+            multiples of cell_size, starting at `density_origin`.
+    """
+
+    def __init__(self, cell_size: Optional[float] = None):
+        if cell_size is not None and cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.point_count = 0
+        self.min = {}
+        self.max = {}
+        self.sum = {}
+        self.counts = {}
+        self.classification = None
+        self.return_number = None
+        self.cell_size = cell_size
+        self.density = None
+        # the (x, y) index of the first cell of the density grid
+        self._first_cell = np.zeros(2, dtype=np.int64)
+
+    @property
+    def mean(self) -> Dict[str, np.ndarray]:
+        return {
+            dim: self.sum[dim] / self.counts[dim]
+            for dim in self.sum
+            if self.counts[dim]
+        }
+
+    @property
+    def density_origin(self) -> Tuple[float, float]:
+        """The (x, y) of the lower corner of the first cell of the density grid."""
+        if self.cell_size is None:
+            return (0.0, 0.0)
+        x, y = self._first_cell * self.cell_size
+        return float(x), float(y)
+
+    def add(
+        self, data: Dict[str, np.ndarray], dimensions: Optional[Iterable[str]] = None
+    ) -> None:
+        """Accumulate the statistics of a chunk of points, as returned by
+        `iter_read` with `combine_xyz=False`.
+
+        Args:
+            dimensions (Iterable[str], optional): The dimensions of data to
+                compute statistics of, all of them by default. The density
+                grid uses x and y even when they're not part of them.
+        """
+        if not data:
+            return
+        n_points = len(next(iter(data.values())))
+        if not n_points:
+            return
+        self.point_count += n_points
+
+        dimensions = list(data) if dimensions is None else list(dimensions)
+        for dim in dimensions:
+            values = np.asarray(data[dim])
+            min_ = values.min(axis=0)
+            max_ = values.max(axis=0)
+            sum_ = values.sum(axis=0, dtype=np.float64)
+            if dim in self.min:
+                min_ = np.minimum(self.min[dim], min_)
+                max_ = np.maximum(self.max[dim], max_)
+                sum_ = self.sum[dim] + sum_
+            self.min[dim] = min_
+            self.max[dim] = max_
+            self.sum[dim] = sum_
+            self.counts[dim] = self.counts.get(dim, 0) + n_points
+
+        if "classification" in dimensions:
+            counts = np.bincount(data["classification"], minlength=256)
+            self.classification = _add(self.classification, counts)
+        if "return_number" in dimensions:
+            counts = np.bincount(data["return_number"], minlength=16)
+            self.return_number = _add(self.return_number, counts)
+        if self.cell_size is not None and "x" in data and "y" in data:
+            self._add_density(data["x"], data["y"])
+
+    def merge(self, other: "Stats") -> "Stats":
+        """Returns the statistics of the points of self and other."""
+        if self.cell_size != other.cell_size:
+            raise ValueError(
+                f"Can't merge statistics with the cell sizes {self.cell_size} "
+                f"and {other.cell_size}"
+            )
+        merged = Stats(self.cell_size)
+        merged.point_count = self.point_count + other.point_count
+        for dim in {**self.min, **other.min}:
+            if dim in self.min and dim in other.min:
+                merged.min[dim] = np.minimum(self.min[dim], other.min[dim])
+                merged.max[dim] = np.maximum(self.max[dim], other.max[dim])
+                merged.sum[dim] = self.sum[dim] + other.sum[dim]
+                merged.counts[dim] = self.counts[dim] + other.counts[dim]
+            else:
+                source = self if dim in self.min else other
+                merged.min[dim] = source.min[dim]
+                merged.max[dim] = source.max[dim]
+                merged.sum[dim] = source.sum[dim]
+                merged.counts[dim] = source.counts[dim]
+
+        merged.classification = _add(self.classification, other.classification)
+        merged.return_number = _add(self.return_number, other.return_number)
+        for stats in (self, other):
+            if stats.density is not None:
+                merged._add_grid(stats._first_cell, stats.density)
+        return merged
+
+    def __add__(self, other: "Stats") -> "Stats":
+        return self.merge(other)
+
+    def _add_density(self, x: np.ndarray, y: np.ndarray) -> None:
+        cells = [
+            np.floor(np.asarray(values) / self.cell_size).astype(np.int64)
+            for values in (x, y)
+        ]
+        first = np.array([c.min() for c in cells])
+        shape = [int(c.max() - f) + 1 for c, f in zip(cells, first)]
+        index = (cells[0] - first[0]) * shape[1] + (cells[1] - first[1])
+        counts = np.bincount(index, minlength=shape[0] * shape[1])
+        self._add_grid(first, counts.reshape(shape))
+
+    def _add_grid(self, first_cell: np.ndarray, counts: np.ndarray) -> None:
+        """Add the counts of a grid starting at first_cell to the density grid,
+        growing it when needed."""
+        if self.density is None:
+            self._first_cell = np.array(first_cell, dtype=np.int64)
+            self.density = counts.astype(np.int64)
+            return
+
+        first = np.minimum(self._first_cell, first_cell)
+        last = np.maximum(
+            self._first_cell + self.density.shape, first_cell + np.array(counts.shape)
+        )
+        if np.any(first != self._first_cell) or np.any(
+            last != self._first_cell + self.density.shape
+        ):
+            grown = np.zeros(tuple(last - first), dtype=np.int64)
+            start = self._first_cell - first
+            grown[
+                start[0] : start[0] + self.density.shape[0],
+                start[1] : start[1] + self.density.shape[1],
+            ] = self.density
+            self.density = grown
+            self._first_cell = first
+
+        start = np.asarray(first_cell) - self._first_cell
+        self.density[
+            start[0] : start[0] + counts.shape[0], start[1] : start[1] + counts.shape[1]
+        ] += counts
+
+
+def _add(counts: Optional[np.ndarray], other: Optional[np.ndarray]):
+    if counts is None:
+        return other
+    if other is None:
+        return counts
+    return counts + other
+
+
+def stats(
+    paths: Union[Path, str, Iterable[Union[Path, str]]],
+    *,
+    dimensions: Optional[Sequence[str]] = None,
+    cell_size: Optional[float] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 1_000_000,
+) -> Stats:
+    """Compute statistics of las files, reading them by chunks.
+
+        s = jaklas.stats("tiles/*.laz", cell_size=10, workers=4)
+        s.mean["z"], s.classification[2], s.density.max() / 10 ** 2
+
+    Args:
+        paths (Union[Path, str, Iterable]): A path, a glob pattern
+            (recursive '**' is supported) or an iterable of paths.
+        dimensions (Sequence[str], optional): The dimensions to compute
+            statistics of, among x, y, z and the ones returned by `read`.
+            All of them by default. The classification and return number
+            histograms are only computed when they're part of the dimensions.
+            Only the LAZ layers of these dimensions are decompressed.
+        cell_size (float, optional): Count the points of each square cell of
+            this size in a density grid, see `Stats`.
+        workers (int, optional): Read this number of files in parallel,
+            in processes. Each file is read by a single process. Scripts must
+            call `stats` under `if __name__ == "__main__":`, see `jaklas.read`.
+        chunk_size (int): The number of points read at once from a file.
+
+    Raises:
+        KeyError: When a dimension isn't in a file.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = sorted(glob.glob(str(paths), recursive=True)) or [paths]
+    paths = [str(path) for path in paths]
+    dimensions = None if dimensions is None else list(dimensions)
+
+    result = Stats(cell_size)
+    if workers is not None and workers > 1 and len(paths) > 1:
+        with laz.process_pool(workers) as executor:
+            futures = [
+                executor.submit(_file_stats, path, dimensions, cell_size, chunk_size)
+                for path in paths
+            ]
+            for future in as_completed(futures):
+                result = result.merge(future.result())
+        return result
+
+    for path in paths:
+        result = result.merge(_file_stats(path, dimensions, cell_size, chunk_size))
+    return result
+
+
+def _file_stats(path, dimensions, cell_size, chunk_size) -> Stats:
+    if dimensions is None:
+        other_dims = list(_dimension_dtypes(read_header(path)))
+        xyz = True
+    else:
+        other_dims = [dim for dim in dimensions if dim not in ("x", "y", "z")]
+        xyz = len(other_dims) < len(dimensions) or cell_size is not None
+
+    result = Stats(cell_size)
+    chunks = iter_read(
+        path, chunk_size=chunk_size, combine_xyz=False, other_dims=other_dims, xyz=xyz
+    )
+    for data in chunks:
+        result.add(data, dimensions)
+    return result
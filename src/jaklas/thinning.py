@@ -0,0 +1,136 @@
+"""Decimation and voxel downsampling of points decoded chunk by chunk."""
+from typing import Optional, Sequence
+
+import laspy
+import numpy as np
+
+
+class Thinning:
+    """Keeps every nth point, and then one point per voxel, of consecutive chunks.
+
+    The voxels already seen in previous chunks are remembered, so the memory used
+    depends on the number of kept points and not on the number of points read.
+
+    Args:
+        every_nth (int, optional): Keep one point out of every_nth.
+        voxel_size (float, optional): Keep the first point of each cube of this
+            size. The voxels are aligned on `min_`.
+        centroid (bool): With voxel_size, replace the coordinates of the kept
+            points by the centroid of the points of their voxel, in `finish`.
+        min_, max_ (Sequence[float]): The bounds of the points, usually
+            from the header.
+    """
+
+    def __init__(
+        self,
+        every_nth: Optional[int] = None,
+        voxel_size: Optional[float] = None,
+        centroid: bool = False,
+        min_: Sequence[float] = (0, 0, 0),
+        max_: Sequence[float] = (0, 0, 0),
+    ):
+        if every_nth is not None and every_nth < 1:
+            raise ValueError(f"every_nth must be at least 1, got {every_nth}")
+        if voxel_size is not None and voxel_size <= 0:
+            raise ValueError(f"voxel_size must be positive, got {voxel_size}")
+        if centroid and voxel_size is None:
+            raise ValueError("centroid needs a voxel_size")
+
+        self.every_nth = every_nth
+        self.voxel_size = voxel_size
+        self.centroid = centroid
+        self.min = np.asarray(min_, "d")
+
+        # number of points seen, for every_nth
+        self._position = 0
+
+        if voxel_size is not None:
+            extent = np.asarray(max_, "d") - self.min
+            self._shape = np.floor(extent / voxel_size).astype(np.int64) + 1
+            if np.prod(self._shape.astype("d")) >= 2 ** 62:
+                raise ValueError(f"voxel_size {voxel_size} is too small for the bounds")
+        # the sorted keys of the voxels seen, and their index in the kept points
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._index = np.zeros(0, dtype=np.int64)
+        self._count = 0
+        # with centroid, the sum of the coordinates (relative to min_) and the
+        # number of points of each voxel, in the order of the kept points
+        self._sums = np.zeros((0, 3), dtype="d")
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def filter(
+        self, points: laspy.ScaleAwarePointRecord
+    ) -> laspy.ScaleAwarePointRecord:
+        """Returns the points of the next chunk that are kept."""
+        if self.every_nth is not None:
+            start = -self._position % self.every_nth
+            self._position += len(points)
+            points = points[start :: self.every_nth]
+
+        if self.voxel_size is not None and len(points):
+            points = points[self._first_in_voxels(points)]
+
+        return points
+
+    def finish(
+        self, points: laspy.ScaleAwarePointRecord
+    ) -> laspy.ScaleAwarePointRecord:
+        """With centroid, set the coordinates of all the kept points
+        to the centroid of their voxel."""
+        if not self.centroid or not len(points):
+            return points
+
+        centroids = self._sums / self._counts[:, None] + self.min
+        for axis, name in enumerate("XYZ"):
+            quantized = np.round(
+                (centroids[:, axis] - points.offsets[axis]) / points.scales[axis]
+            )
+            points.array[name] = quantized
+        return points
+
+    def _first_in_voxels(self, points) -> np.ndarray:
+        coords = [
+            np.asarray(getattr(points, axis), "d") - self.min[n]
+            for n, axis in enumerate("xyz")
+        ]
+        cells = [
+            np.clip(np.floor(values / self.voxel_size), 0, size - 1).astype(np.int64)
+            for values, size in zip(coords, self._shape)
+        ]
+        keys = (cells[0] * self._shape[1] + cells[1]) * self._shape[2] + cells[2]
+        unique, first, inverse = np.unique(
+            keys, return_index=True, return_inverse=True
+        )
+
+        position = np.searchsorted(self._keys, unique)
+        seen = np.zeros(len(unique), dtype=bool)
+        known = position < len(self._keys)
+        seen[known] = self._keys[position[known]] == unique[known]
+
+        # new voxels are numbered in the order of their first point
+        new = np.flatnonzero(~seen)
+        new = new[np.argsort(first[new], kind="stable")]
+
+        if self.centroid:
+            sums = np.stack(
+                [np.bincount(inverse, values, len(unique)) for values in coords],
+                axis=1,
+            )
+            counts = np.bincount(inverse, minlength=len(unique))
+            existing = self._index[position[seen]]
+            self._sums[existing] += sums[seen]
+            self._counts[existing] += counts[seen]
+            self._sums = np.concatenate([self._sums, sums[new]])
+            self._counts = np.concatenate([self._counts, counts[new]])
+
+        keys = np.concatenate([self._keys, unique[new]])
+        index = np.concatenate(
+            [self._index, np.arange(self._count, self._count + len(new))]
+        )
+        # the keys are two sorted runs, a stable sort merges them quickly
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._index = index[order]
+        self._count += len(new)
+
+        return first[new]
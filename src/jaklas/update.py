@@ -0,0 +1,202 @@
+"""Change some dimensions of the points of a las file in place, or of a LAZ file
+by writing a new file that replaces it.
+
+Uncompressed las files are memory mapped, and the new values are written
+in the point records, so only the pages holding updated points are written.
+LAZ chunks can't be modified in place, so the chunks with updated points are
+decompressed, updated and compressed again, and the other chunks are copied
+as they are to the new file, without being decompressed.
+"""
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from . import laz, point_formats, profiling
+from .header import Header, patch_header
+from .write import _set_sub_field
+
+# number of points updated at once in uncompressed files
+BLOCK_SIZE = 1_000_000
+
+
+def update(
+    path: Union[Path, str],
+    values: Dict[str, np.ndarray],
+    mask: Optional[np.ndarray] = None,
+) -> None:
+    """Write new values of some dimensions of the points of a las or laz file.
+
+        data = jaklas.read(path, other_dims=["classification"])
+        ground = data["xyz"][:, 2] < 1.0
+        jaklas.update(path, {"classification": 2}, mask=ground)
+
+    The coordinates can't be updated. When return_number is updated,
+    the point counts by return of the header are updated too.
+
+    Args:
+        path (Union[Path, str]): The las or laz file.
+        values (Dict[str, np.ndarray]): The new values of each dimension, for
+            the selected points, or a single value given to all of them.
+            Sub dimensions of bit fields (classification for point formats < 6,
+            return_number, synthetic, ...) and extra dimensions can be updated.
+        mask (np.ndarray, optional): A boolean array of the length of the file
+            selecting the points to update. All the points by default.
+
+    Raises:
+        ValueError: When a dimension isn't in the file or can't be updated,
+            when the number of values doesn't match, or for COPC files.
+        OverflowError: When the values don't fit in their dimension.
+    """
+    with open(path, "rb") as f:
+        header = Header(f)
+
+    if header.is_copc:
+        raise ValueError(f"The COPC file {path} can't be updated")
+
+    dtype = point_formats.record_dtype(
+        header.point_format, header.extra_dimensions, header.point_record_length
+    )
+    sub_fields = point_formats.composed_fields(header.point_format)
+    known = set(dtype.names) - {"X", "Y", "Z"} - set(header.scaled_extra_dimensions)
+    known = (known - {field for field, _ in sub_fields.values()}) | set(sub_fields)
+    unknown = sorted(set(values) - known)
+    if unknown:
+        raise ValueError(f"The dimensions {unknown} of {path} can't be updated")
+
+    n_selected = header.point_count
+    if mask is not None:
+        mask = np.asarray(mask)
+        if mask.dtype != bool or mask.shape != (header.point_count,):
+            raise ValueError(
+                f"mask must be a boolean array of {header.point_count} values"
+            )
+        n_selected = int(np.count_nonzero(mask))
+
+    columns = {}
+    for name, column in values.items():
+        column = np.asarray(column)
+        if column.ndim and len(column) != n_selected:
+            raise ValueError(
+                f"{len(column)} values of {name} were given "
+                f"for {n_selected} selected points"
+            )
+        field = sub_fields[name][0] if name in sub_fields else name
+        if name not in sub_fields and np.issubdtype(dtype[field].base, np.integer):
+            _check_range(name, column, dtype[field].base)
+        columns[name] = column
+
+    updater = _Updater(columns, mask, sub_fields, dtype)
+    if header.is_compressed:
+        _update_laz(path, updater, mask)
+    else:
+        _update_las(path, header, updater)
+
+    if "return_number" in columns and np.any(updater.points_by_return):
+        _patch_points_by_return(path, header, updater.points_by_return)
+
+
+class _Updater:
+    """Write the new values in consecutive blocks of point records."""
+
+    def __init__(self, columns, mask, sub_fields, dtype):
+        self.columns = columns
+        self.mask = mask
+        self.sub_fields = sub_fields
+        self.dtype = dtype
+        # number of selected points in the previous blocks
+        self.position = 0
+        # the change of the number of points of each return number, from 1 to 15
+        self.points_by_return = np.zeros(15, dtype=np.int64)
+
+    def apply(self, records: np.ndarray, first_point: int) -> None:
+        if self.mask is None:
+            selection = slice(None)
+            count = len(records)
+        else:
+            selection = self.mask[first_point : first_point + len(records)]
+            count = int(np.count_nonzero(selection))
+            if not count:
+                return
+
+        # a view of the records without mask, or a copy of the selected ones
+        block = records[selection]
+        for name, column in self.columns.items():
+            if column.ndim:
+                column = column[self.position : self.position + count]
+            if name == "return_number":
+                self._count_returns(block, column, count)
+            if name in self.sub_fields:
+                column = np.broadcast_to(column, (count,))
+                _set_sub_field(block, name, column, *self.sub_fields[name])
+            else:
+                block[name] = column
+        if self.mask is not None:
+            records[selection] = block
+        self.position += count
+
+    def _count_returns(self, block, column, count) -> None:
+        field, bits = self.sub_fields["return_number"]
+        shift = (bits & -bits).bit_length() - 1
+        old = (block[field] & bits) >> shift
+        new = np.broadcast_to(column, (count,)).astype(np.int64)
+        self.points_by_return -= np.bincount(old, minlength=16)[1:16]
+        self.points_by_return += np.bincount(new, minlength=16)[1:16]
+
+
+def _update_las(path, header: Header, updater: _Updater) -> None:
+    if not header.point_count:
+        return
+    records = np.memmap(
+        path,
+        dtype=updater.dtype,
+        mode="r+",
+        offset=header.offset_to_point_data,
+        shape=(header.point_count,),
+    )
+    for start in range(0, header.point_count, BLOCK_SIZE):
+        with profiling.phase("update.records") as phase:
+            position = updater.position
+            updater.apply(records[start : start + BLOCK_SIZE], start)
+            phase.bytes = (updater.position - position) * header.point_record_length
+    records.flush()
+    del records
+
+
+def _update_laz(path, updater: _Updater, mask: Optional[np.ndarray]) -> None:
+    def selected(first_point, point_count):
+        return mask is None or mask[first_point : first_point + point_count].any()
+
+    def update_chunk(first_point, records):
+        updater.apply(records.view(updater.dtype), first_point)
+
+    with profiling.phase("update.chunks"):
+        laz.rewrite_chunks(path, update_chunk, selected)
+
+
+def _check_range(name: str, values: np.ndarray, dtype: np.dtype) -> None:
+    if not values.size:
+        return
+    info = np.iinfo(dtype)
+    if np.min(values) < info.min or np.max(values) > info.max:
+        raise OverflowError(
+            f"The values of {name} must be between {info.min} and {info.max}"
+        )
+
+
+def _patch_points_by_return(path, header: Header, change: np.ndarray) -> None:
+    points_by_return = np.array(header.points_by_return, dtype=np.int64)
+    points_by_return[: len(change)] += change[: len(points_by_return)]
+    with open(path, "r+b") as f:
+        buffer = bytearray(f.read(header.header_size))
+        patch_header(
+            buffer,
+            point_format=header.point_format,
+            version_minor=header.version_minor,
+            point_count=header.point_count,
+            points_by_return=points_by_return.tolist(),
+            min_=header.min,
+            max_=header.max,
+        )
+        f.seek(0)
+        f.write(buffer)
@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 import numpy as np
 
 
@@ -10,3 +12,20 @@ def sort(data, field: str, *args, **kwargs):
 
     argsort = np.argsort(data[field])
     return {k: v[argsort] for k, v in data.items()}
+
+
+def groups(values) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Group equal values with a single argsort.
+
+    Returns:
+        The unique values, and the indices of the elements equal to each of them,
+        in increasing order.
+    """
+    values = np.asarray(values)
+    if not len(values):
+        return values, []
+    argsort = np.argsort(values, kind="stable")
+    sorted_values = values[argsort]
+    starts = np.flatnonzero(sorted_values[1:] != sorted_values[:-1]) + 1
+    unique = sorted_values[np.concatenate([[0], starts])]
+    return unique, np.split(argsort, starts)
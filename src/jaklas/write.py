@@ -1,12 +1,29 @@
+import io
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import laspy
-import pyproj
-from laspy.vlrs.known import WktCoordinateSystemVlr
+import lazrs
+from laspy.vlrs.known import LasZipVlr, WktCoordinateSystemVlr
 
-from . import point_formats
+from . import (
+    chunk_bounds,
+    copc,
+    laz,
+    point_formats,
+    profiling,
+    projection,
+    spatial,
+    utils,
+)
+from .header import Header, patch_header
+
+# number of points encoded and written at a time
+_BLOCK_SIZE = 250_000
 
 
 def write(
@@ -14,10 +31,13 @@ def write(
     output_path: Union[Path, str],
     *,
     crs: Optional[int] = None,
+    source_crs: Optional[int] = None,
     xyz_offset: Tuple[float] = None,
     point_format: Optional[int] = None,
     scale: Tuple[float] = None,
     data_min_max: Optional[Dict[str, Tuple]] = None,
+    workers: Optional[int] = None,
+    spatial_order: Optional[str] = None,
 ):
     """Write point cloud data to an output path.
 
@@ -26,7 +46,8 @@ def write(
     Args:
         point_data (dict-like): Any object that implements the __getitem__ method.
             So a dictionnary, a pandas DataFrame, or a numpy structured array will
-            all work.
+            all work. A pyarrow Table, RecordBatch or RecordBatchReader works too,
+            its numeric columns are used without copies.
         output_path (Union[Path, str]): The output path to write the las file.
             The output directory is created if it doesn't exist.
         xyz_offset (Tuple[float], optional): Apply this xyz offset before
@@ -35,6 +56,11 @@ def write(
             The offset is applied by adding it to the coordinate.
             Defaults to (0, 0, 0).
         crs (int, optional): The EPSG code to write in the las header.
+        source_crs (int, optional): The EPSG code of the coordinates of point_data.
+            They are reprojected to `crs` block by block, after xyz_offset is
+            added, and the header offset is computed from the reprojected
+            coordinates. The transformers are cached, see `jaklas.projection`.
+            The reprojection is done by `workers` threads.
         point_format (int, optional): The las point format type identifier
             Only formats 0, 1, 2, 3, 6 and 7 are accepted.
             If None is given, the best point format will be guessed
@@ -54,26 +80,829 @@ def write(
             If the red data in the source point_data is uint8, you can set
             data_min_max = {'red': (0, 255)}
             and the data will be scaled to the uint16 range 0-65536.
+        workers (int, optional): Compress LAZ files with this number of processes.
+            Chunks of points are compressed independently by each process, and
+            the output is a standard LAZ file. Starting the processes takes some
+            time, so this is only worth it for large point clouds. Scripts must
+            call `write` under `if __name__ == "__main__":`, see
+            `jaklas.laz.process_pool`.
+        spatial_order (str, optional): "morton" or "hilbert". Write the points
+            in the order of this space-filling curve, see
+            `jaklas.spatial.curve_order`. Nearby points compress better and end up
+            in the same chunks, whose bounding boxes are stored in a VLR
+            (see `jaklas.chunk_bounds`), so that reading with a bbox or a polygon
+            only decodes the chunks overlapping it.
+
+    When the file name ends with ".copc.laz", a Cloud Optimized Point Cloud is
+    written, see `jaklas.copc`. Point formats < 6 are replaced by 6 or 7, and
+    `workers` is not used.
     """
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    point_data = _from_arrow(point_data)
 
-    if data_min_max is None:
-        data_min_max = {}
+    with profiling.phase("write.point_format"):
+        extra_dimensions = _extra_dimensions(point_data)
 
-    standard_dimensions = point_formats.standard_dimensions | {"xyz", "XYZ"}
-    extra_dimensions = sorted(set(point_data) - standard_dimensions)
+        if point_format is None:
+            point_format = point_formats.best_point_format(
+                point_data, extra_dimensions
+            )
+        if copc.is_copc(output_path):
+            point_format = point_formats.copc_point_format(point_format)
 
-    if point_format is None:
-        point_format = point_formats.best_point_format(point_data, extra_dimensions)
+    xyz = _find_xyz(point_data)
+    if source_crs is not None:
+        xyz = _reproject(xyz, xyz_offset, source_crs, crs, workers)
+        xyz_offset = None
 
-    if point_format not in point_formats.supported_point_formats:
+    with profiling.phase("write.min_max_offset") as phase:
+        min_, max_, offset = _min_max_offset(xyz)
+
+        offset = offset if xyz_offset is None else xyz_offset
+        if xyz_offset is None:
+            xyz_offset = (0, 0, 0)
+
+        min_ += xyz_offset
+        max_ += xyz_offset
+        scales = scale if scale else _get_scale(min_, max_, offset)
+        phase.bytes = sum(values.nbytes for values in xyz)
+
+    with profiling.phase("write.header"):
+        header = _create_header(
+            point_format,
+            {dim: point_data[dim].dtype for dim in extra_dimensions},
+            crs,
+            scales,
+            offset,
+        )
+
+    if copc.is_copc(output_path):
+        if spatial_order is not None:
+            raise ValueError("COPC files are ordered by octree node, not spatial_order")
+        _write_copc(
+            output_path,
+            header,
+            point_data,
+            xyz,
+            xyz_offset,
+            extra_dimensions,
+            data_min_max,
+        )
+        return
+
+    order = None
+    if spatial_order is not None:
+        with profiling.phase("write.spatial_order"):
+            order = spatial.curve_order(xyz[0], xyz[1], spatial_order)
+            bounds = chunk_bounds.compute(xyz, order, xyz_offset, header.scales)
+            header.vlrs.append(chunk_bounds.vlr(bounds))
+
+    _write_points(
+        output_path,
+        header,
+        point_data,
+        xyz,
+        xyz_offset,
+        extra_dimensions,
+        data_min_max,
+        workers,
+        order=order,
+    )
+
+
+def write_tiled(
+    point_data,
+    output_dir: Union[Path, str],
+    *,
+    tile_size: Union[float, Tuple[float, float]],
+    origin: Tuple[float, float] = (0, 0),
+    name: str = "{x:.0f}_{y:.0f}.las",
+    crs: Optional[int] = None,
+    source_crs: Optional[int] = None,
+    xyz_offset: Tuple[float] = None,
+    point_format: Optional[int] = None,
+    scale: Tuple[float] = None,
+    data_min_max: Optional[Dict[str, Tuple]] = None,
+    workers: Optional[int] = None,
+) -> Dict[Tuple[int, int], Path]:
+    """Split point cloud data in a grid of tiles, and write each tile to a file.
+
+    The tile of each point is computed once for all the points, and the points
+    are grouped by tile with a single argsort. Tiles are then written by a pool
+    of `workers` threads. For LAZ files, the points are compressed by a pool
+    of `workers` processes shared by all the tiles.
+
+    All the tiles share the point format, the scale and the offset, which are
+    inferred from all the points like `write` does. The bounds in the header
+    of each tile are the bounds of its points. Empty tiles are not written.
+
+    Args:
+        point_data (dict-like): See `write`.
+        output_dir (Union[Path, str]): The directory of the tiles.
+            It's created if it doesn't exist.
+        tile_size (Union[float, Tuple[float, float]]): The size of the tiles,
+            or their (x, y) sizes.
+        origin (Tuple[float, float]): A corner of the grid. Tile (0, 0) starts there.
+            Coordinates are compared after xyz_offset is added, and after
+            the reprojection to `crs` when `source_crs` is given.
+            Points on the border between two tiles go to the upper one.
+        name (str): The file name of a tile, formatted with the `x` and `y`
+            of its lower left corner and its `col` and `row` in the grid.
+            The suffix chooses between las and laz. The names must be unique,
+            the default one needs tile corners at different integer coordinates.
+        workers (int, optional): The number of tiles written at a time. For
+            LAZ tiles, it's also the number of compression processes, which
+            need an `if __name__ == "__main__":` guard in scripts, see `write`.
+
+    See `write` for the other arguments.
+
+    Returns:
+        Dict[Tuple[int, int], Path]: The path of each written tile,
+        by (col, row) in the grid.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or 1
+    point_data = _from_arrow(point_data)
+
+    with profiling.phase("write.point_format"):
+        extra_dimensions = _extra_dimensions(point_data)
+        if point_format is None:
+            point_format = point_formats.best_point_format(
+                point_data, extra_dimensions
+            )
+
+    columns = {dim: np.asarray(point_data[dim]) for dim in list(point_data)}
+    xyz = _find_xyz(columns)
+    if source_crs is not None:
+        xyz = _reproject(xyz, xyz_offset, source_crs, crs, workers)
+        xyz_offset = None
+        # the tiles are written from the reprojected coordinates
+        for key in ("xyz", "XYZ", *"xyzXYZ"):
+            columns.pop(key, None)
+        columns.update(zip("xyz", xyz))
+
+    with profiling.phase("write.min_max_offset"):
+        min_, max_, offset = _min_max_offset(xyz)
+        offset = offset if xyz_offset is None else xyz_offset
+        if xyz_offset is None:
+            xyz_offset = (0, 0, 0)
+        min_ += xyz_offset
+        max_ += xyz_offset
+        scales = scale if scale else _get_scale(min_, max_, offset)
+
+    header = _create_header(
+        point_format,
+        {dim: columns[dim].dtype for dim in extra_dimensions},
+        crs,
+        scales,
+        offset,
+    )
+
+    with profiling.phase("write.tiles") as phase:
+        tile_size = np.broadcast_to(np.asarray(tile_size, "d"), (2,))
+        cols, rows = (
+            np.floor((xyz[axis] + xyz_offset[axis] - origin[axis]) / tile_size[axis])
+            .astype(np.int64)
+            for axis in range(2)
+        )
+        if len(cols):
+            # a single key per tile, to group them with one argsort
+            min_col, min_row = cols.min(), rows.min()
+            n_rows = rows.max() - min_row + 1
+            keys, tiles = utils.groups((cols - min_col) * n_rows + rows - min_row)
+        else:
+            keys, tiles = [], []
+        phase.bytes = cols.nbytes + rows.nbytes
+
+    tile_paths = []
+    for key in keys:
+        col, row = divmod(int(key), int(n_rows))
+        col, row = col + int(min_col), row + int(min_row)
+        x, y = origin[0] + col * tile_size[0], origin[1] + row * tile_size[1]
+        path = output_dir / name.format(x=x, y=y, col=col, row=row)
+        tile_paths.append(((col, row), path))
+    if len({path for _, path in tile_paths}) < len(tile_paths):
         raise ValueError(
-            f"Unsupported point format {point_format} "
-            f"(not in {point_formats.supported_point_formats})"
+            f"The file names of the tiles given by '{name}' are not unique, "
+            "use {col} and {row}, or more decimals for {x} and {y}"
+        )
+
+    def write_tile(tile_path, indices):
+        (col, row), path = tile_path
+        tile_data = {dim: values[indices] for dim, values in columns.items()}
+        _write_points(
+            path,
+            header,
+            tile_data,
+            _find_xyz(tile_data),
+            xyz_offset,
+            extra_dimensions,
+            data_min_max,
+            workers,
+            executor,
         )
+        return (col, row), path
 
-    point_format_type = point_formats.point_formats[point_format]
+    executor = None
+    if workers > 1 and name.lower().endswith(".laz"):
+        executor = laz.process_pool(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            return dict(profiling.thread_map(threads, write_tile, tile_paths, tiles))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def append(
+    point_data,
+    path: Union[Path, str],
+    *,
+    xyz_offset: Tuple[float] = None,
+    data_min_max: Optional[Dict[str, Tuple]] = None,
+) -> None:
+    """Append points to an existing las or laz file, without rewriting it.
+
+    The points are encoded with the point format, the extra dimensions,
+    the scale and the offset of the file, and written after its points
+    (for LAZ files, the last chunk is completed and new chunks are added).
+    The point counts and the bounds are then patched in the header.
+
+    The dimensions of point_data must exist in the point format of the file,
+    and point_data must have all its extra dimensions, which are cast to the
+    types of the file. Files written with a `spatial_order` keep their order,
+    but their chunk bounds are marked as stale, see `jaklas.chunk_bounds`.
+
+    Args:
+        point_data (dict-like): See `write`.
+        path (Union[Path, str]): The las or laz file.
+        xyz_offset (Tuple[float], optional): Added to the coordinates, see `write`.
+        data_min_max (dict): Scale some dimensions, see `write`.
+
+    Raises:
+        ValueError: When the dimensions don't match the file, for COPC files,
+            or for point formats that `write` doesn't support.
+        OverflowError: When the coordinates don't fit with the scale and the
+            offset of the file.
+    """
+    point_data = _from_arrow(point_data)
+    with open(path, "rb") as f:
+        header = Header(f)
+
+    if header.is_copc:
+        raise ValueError(f"Points can't be appended to the COPC file {path}")
+    if header.point_format not in point_formats.supported_point_formats:
+        raise ValueError(
+            f"Points can't be appended to {path}, its point format "
+            f"{header.point_format} is not supported"
+        )
+    if header.scaled_extra_dimensions:
+        raise ValueError(
+            f"Points can't be appended to {path}, its extra dimensions "
+            f"{header.scaled_extra_dimensions} have a scale or an offset"
+        )
+
+    extra_dtypes = dict(header.extra_dimensions)
+    known = set(laspy.PointFormat(header.point_format).dimension_names)
+    known |= set(extra_dtypes) | {"xyz", "XYZ", "x", "y", "z"}
+    unknown = sorted(set(point_data) - known)
+    if unknown:
+        raise ValueError(
+            f"The dimensions {unknown} are not in the point format "
+            f"{header.point_format} of {path}"
+        )
+    missing = sorted(set(extra_dtypes) - set(point_data))
+    if missing:
+        raise ValueError(f"The extra dimensions {missing} of {path} are missing")
+
+    columns = {name: point_data[name] for name in point_data}
+    for dim, dtype in extra_dtypes.items():
+        columns[dim] = np.asarray(columns[dim]).astype(dtype, copy=False)
+    xyz = _find_xyz(columns)
+    if xyz_offset is None:
+        xyz_offset = (0, 0, 0)
+
+    with laspy.open(str(path), mode="a") as appender:
+        # the extra dimensions are encoded in the order of the file
+        blocks = _encode_points(
+            appender.header,
+            columns,
+            xyz,
+            xyz_offset,
+            list(extra_dtypes),
+            data_min_max,
+        )
+        for points in blocks:
+            with profiling.phase("write.append_points") as phase:
+                appender.append_points(points)
+                phase.bytes = points.array.nbytes
+        chunk_bounds.mark_stale(appender.header)
+
+
+class Writer:
+    """Write point cloud data to a las file, one batch at a time.
+
+    Use it as a context manager, the header mins, maxs and point counts
+    are patched when the writer is closed:
+
+        with jaklas.Writer("out.laz", scale=(0.001,) * 3, offset=(0, 0, 0)) as w:
+            for batch in batches:
+                w.write(batch)
+
+    When the scale and the offset are both known, batches are streamed to disk
+    as they come. Otherwise, the writer works in two passes: batches are spooled
+    to a temporary directory next to the output file, and the offset and scale
+    are inferred from all the coordinates on close, the same way `write` does.
+
+    Args:
+        output_path (Union[Path, str]): The output path to write the las file.
+            The output directory is created if it doesn't exist.
+        crs (int, optional): The EPSG code to write in the las header.
+        xyz_offset (Tuple[float], optional): Added to the coordinates of each
+            batch before writing them, see `write`.
+        point_format (int, optional): The las point format type identifier.
+            If None is given, it is guessed from the first batch (or from all
+            batches in two pass mode).
+        offset (Tuple[float], optional): The offset of the las header.
+            Defaults to xyz_offset when it is given.
+        scale (Tuple[float], optional): The coordinate precision, see `write`.
+        data_min_max (dict): Scale some dimensions, see `write`.
+        workers (int, optional): Compress LAZ files with this number of processes,
+            see `write` (and its note about `if __name__ == "__main__":`).
+    """
+
+    def __init__(
+        self,
+        output_path: Union[Path, str],
+        *,
+        crs: Optional[int] = None,
+        xyz_offset: Tuple[float] = None,
+        point_format: Optional[int] = None,
+        offset: Tuple[float] = None,
+        scale: Tuple[float] = None,
+        data_min_max: Optional[Dict[str, Tuple]] = None,
+        workers: Optional[int] = None,
+    ):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.crs = crs
+        self.xyz_offset = (0, 0, 0) if xyz_offset is None else xyz_offset
+        self.point_format = point_format
+        self.offset = xyz_offset if offset is None else offset
+        self.scale = scale
+        self.data_min_max = data_min_max
+        self.workers = workers
+
+        self.two_pass = self.offset is None or self.scale is None
+
+        self._extra_dimensions = None
+        self._extra_dtypes = None
+        self._writer = None
+        self._closed = False
+
+        # two pass mode
+        self._spool = None
+        self._spooled_batches = []
+        self._min = None
+        self._max = None
+        self._max_classification = None
+
+    def write(self, point_data) -> None:
+        """Write a batch of points.
+
+        Args:
+            point_data (dict-like): Same as the point_data argument of `write`.
+                All batches must have the same fields.
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed Writer.")
+
+        point_data = _from_arrow(point_data)
+        xyz = _find_xyz(point_data)
+        if not len(xyz[0]):
+            return
+
+        if self._extra_dimensions is None:
+            self._extra_dimensions = _extra_dimensions(point_data)
+            self._extra_dtypes = {
+                dim: point_data[dim].dtype for dim in self._extra_dimensions
+            }
+
+        if self.two_pass:
+            self._spool_batch(point_data, xyz)
+            return
+
+        if self._writer is None:
+            if self.point_format is None:
+                self.point_format = point_formats.best_point_format(
+                    point_data, self._extra_dimensions
+                )
+            self._open(self.scale, self.offset)
+
+        self._write_batch(point_data, xyz)
+
+    def close(self) -> None:
+        """Write the remaining points and patch the header."""
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            if self.two_pass:
+                self._write_spooled_batches()
+            if self._writer is None:
+                # nothing was written, still create a valid empty file
+                if self.point_format is None:
+                    self.point_format = point_formats.best_point_format({})
+                self._extra_dtypes = self._extra_dtypes or {}
+                self._extra_dimensions = self._extra_dimensions or []
+                scale = (0.001, 0.001, 0.001) if self.scale is None else self.scale
+                offset = (0, 0, 0) if self.offset is None else self.offset
+                self._open(scale, offset)
+        finally:
+            if self._writer is not None:
+                with profiling.phase("write.close"):
+                    self._writer.close()
+            if self._spool is not None:
+                self._spool.cleanup()
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _open(self, scale, offset) -> None:
+        header = _create_header(
+            self.point_format, self._extra_dtypes, self.crs, scale, offset
+        )
+        self._writer = _open_writer(self.output_path, header, self.workers)
 
+    def _write_batch(self, point_data, xyz) -> None:
+        blocks = _encode_points(
+            self._writer.header,
+            point_data,
+            xyz,
+            self.xyz_offset,
+            self._extra_dimensions,
+            self.data_min_max,
+        )
+        _write_blocks(self._writer, blocks)
+
+    def _spool_batch(self, point_data, xyz) -> None:
+        with profiling.phase("write.spool") as phase:
+            phase.bytes = self._spool_arrays(point_data, xyz)
+
+    def _spool_arrays(self, point_data, xyz) -> int:
+        if self._spool is None:
+            self._spool = tempfile.TemporaryDirectory(
+                prefix=".jaklas-", dir=self.output_path.parent
+            )
+
+        min_, max_, _ = _min_max_offset(xyz)
+        if self._min is None:
+            self._min, self._max = min_, max_
+        else:
+            self._min = np.minimum(self._min, min_)
+            self._max = np.maximum(self._max, max_)
+
+        if "classification" in point_data:
+            max_classification = np.max(point_data["classification"])
+            if self._max_classification is None:
+                self._max_classification = max_classification
+            else:
+                self._max_classification = max(
+                    self._max_classification, max_classification
+                )
+
+        names = list(point_data)
+        arrays = [np.asarray(point_data[name]) for name in names]
+        path = Path(self._spool.name) / f"{len(self._spooled_batches)}.npz"
+        np.savez(path, *arrays)
+        self._spooled_batches.append((path, names))
+        return sum(array.nbytes for array in arrays)
+
+    def _write_spooled_batches(self) -> None:
+        if not self._spooled_batches:
+            return
+
+        if self.point_format is None:
+            # only the field names and the classification values are looked at
+            sample = dict.fromkeys(self._spooled_batches[0][1])
+            if self._max_classification is not None:
+                sample["classification"] = np.array([self._max_classification])
+            self.point_format = point_formats.best_point_format(
+                sample, self._extra_dimensions
+            )
+
+        offset = (self._min + self._max) / 2 if self.offset is None else self.offset
+        min_ = self._min + self.xyz_offset
+        max_ = self._max + self.xyz_offset
+        scale = self.scale if self.scale else _get_scale(min_, max_, offset)
+
+        self._open(scale, offset)
+
+        for path, names in self._spooled_batches:
+            with np.load(path) as arrays:
+                point_data = {
+                    name: arrays[f"arr_{n}"] for n, name in enumerate(names)
+                }
+            self._write_batch(point_data, _find_xyz(point_data))
+            path.unlink()
+
+
+class WritePlan:
+    """The point format, the record layout and the header of files sharing a schema,
+    computed once to write many files quickly.
+
+        plan = jaklas.WritePlan.from_sample(df, crs=2950, scale=(0.001,) * 3)
+        for df, path in tiles:
+            plan.write(df, path)
+
+    `write` guesses the point format, creates the header and the extra bytes VLR
+    and resolves the CRS for each file. A plan does it once, and keeps the
+    serialized header as a template. Writing a file then only computes the
+    offset (and the scale, when it isn't fixed) from the coordinates, encodes
+    the points, and patches the point counts and the bounds in the template.
+
+    The point data given to `write` must have the extra dimensions of the
+    sample, they are cast to the dtypes of the sample.
+
+    Args:
+        point_format (int): The las point format type identifier.
+        extra_dtypes (Dict[str, np.dtype]): The dtype of each extra dimension.
+        crs (int, optional): The EPSG code to write in the headers.
+        scale (Tuple[float], optional): The coordinate precision, see `write`.
+            Defaults to a scale computed from the coordinates of each file.
+        data_min_max (dict): Scale some dimensions, see `write`.
+    """
+
+    def __init__(
+        self,
+        point_format: int,
+        extra_dtypes: Dict[str, np.dtype],
+        *,
+        crs: Optional[int] = None,
+        scale: Tuple[float] = None,
+        data_min_max: Optional[Dict[str, Tuple]] = None,
+    ):
+        self.point_format = point_format
+        self.extra_dimensions = sorted(extra_dtypes)
+        self.extra_dtypes = {dim: np.dtype(extra_dtypes[dim]) for dim in extra_dtypes}
+        self.scale = scale
+        self.data_min_max = data_min_max
+
+        self._header = _create_header(
+            point_format,
+            {dim: extra_dtypes[dim] for dim in self.extra_dimensions},
+            crs,
+            scale if scale else (0.01, 0.01, 0.01),
+            (0, 0, 0),
+        )
+        self._laz_vlr = lazrs.LazVlr.new_for_compression(
+            point_format, self._header.point_format.num_extra_bytes
+        )
+        self._templates = {}
+
+    @classmethod
+    def from_sample(
+        cls,
+        point_data,
+        *,
+        crs: Optional[int] = None,
+        point_format: Optional[int] = None,
+        scale: Tuple[float] = None,
+        data_min_max: Optional[Dict[str, Tuple]] = None,
+    ) -> "WritePlan":
+        """Create a plan for the fields and dtypes of some point data.
+
+        Args:
+            point_data (dict-like): See `write`. When point_format isn't given,
+                it's guessed from this sample, so its classification values must
+                be representative of the files to write.
+
+        See `WritePlan` for the other arguments.
+        """
+        point_data = _from_arrow(point_data)
+        extra_dimensions = _extra_dimensions(point_data)
+        if point_format is None:
+            point_format = point_formats.best_point_format(
+                point_data, extra_dimensions
+            )
+        extra_dtypes = {
+            dim: np.asarray(point_data[dim]).dtype for dim in extra_dimensions
+        }
+        return cls(
+            point_format,
+            extra_dtypes,
+            crs=crs,
+            scale=scale,
+            data_min_max=data_min_max,
+        )
+
+    def write(
+        self,
+        point_data,
+        output_path: Union[Path, str],
+        *,
+        xyz_offset: Tuple[float] = None,
+    ) -> None:
+        """Write point data to a las or laz file.
+
+        Args:
+            point_data (dict-like): See `write`.
+            output_path (Union[Path, str]): The output path, the directory
+                must exist.
+            xyz_offset (Tuple[float], optional): See `write`.
+        """
+        if copc.is_copc(output_path):
+            raise ValueError("WritePlan can't write COPC files, use jaklas.write")
+
+        point_data = _from_arrow(point_data)
+        extra_dimensions = _extra_dimensions(point_data)
+        if extra_dimensions != self.extra_dimensions:
+            raise ValueError(
+                f"The extra dimensions {extra_dimensions} are not the ones "
+                f"of the plan {self.extra_dimensions}"
+            )
+
+        columns = {name: point_data[name] for name in point_data}
+        for dim, dtype in self.extra_dtypes.items():
+            columns[dim] = np.asarray(columns[dim]).astype(dtype, copy=False)
+        xyz = _find_xyz(columns)
+        with profiling.phase("write.min_max_offset"):
+            min_, max_, offset = _min_max_offset(xyz)
+            offset = offset if xyz_offset is None else xyz_offset
+            if xyz_offset is None:
+                xyz_offset = (0, 0, 0)
+            min_ += xyz_offset
+            max_ += xyz_offset
+            scales = self.scale if self.scale else _get_scale(min_, max_, offset)
+
+        header = copy(self._header)
+        header.scales = np.array(scales, "d")
+        header.offsets = np.array(offset, "d")
+        blocks = _encode_points(
+            header, columns, xyz, xyz_offset, extra_dimensions, self.data_min_max
+        )
+
+        compressed = Path(output_path).suffix.lower() == ".laz"
+        buffer = bytearray(self._template(compressed))
+        point_count = 0
+        points_by_return = np.zeros(16, dtype=np.int64)
+        raw_min = np.full(3, np.iinfo(np.int32).max, dtype=np.int64)
+        raw_max = np.full(3, np.iinfo(np.int32).min, dtype=np.int64)
+
+        with open(output_path, "wb") as f:
+            f.write(buffer)
+            compressor = None
+            if compressed:
+                compressor = lazrs.LasZipCompressor(f, self._laz_vlr)
+            for points in blocks:
+                with profiling.phase("write.write_points") as phase:
+                    array = points.array
+                    for axis, name in enumerate("XYZ"):
+                        raw_min[axis] = min(raw_min[axis], array[name].min())
+                        raw_max[axis] = max(raw_max[axis], array[name].max())
+                    return_numbers = np.asarray(points.return_number)
+                    points_by_return += np.bincount(return_numbers, minlength=16)
+                    point_count += len(array)
+                    if compressor is not None:
+                        compressor.compress_many(array.view(np.uint8))
+                    else:
+                        f.write(array.view(np.uint8))
+                    phase.bytes = array.nbytes
+            if compressor is not None:
+                compressor.done()
+
+            patch_header(
+                buffer,
+                point_format=self.point_format,
+                version_minor=header.version.minor,
+                point_count=point_count,
+                points_by_return=points_by_return[1:],
+                min_=raw_min * header.scales + header.offsets,
+                max_=raw_max * header.scales + header.offsets,
+                scale=header.scales,
+                offset=header.offsets,
+            )
+            f.seek(0)
+            f.write(buffer)
+
+    def _template(self, compressed: bool) -> bytes:
+        """The header and the VLRs, serialized once for las and laz files."""
+        if compressed not in self._templates:
+            header = deepcopy(self._header)
+            if compressed:
+                header.vlrs.append(LasZipVlr(self._laz_vlr.record_data()))
+                header.are_points_compressed = True
+            buffer = io.BytesIO()
+            header.write_to(buffer)
+            self._templates[compressed] = buffer.getvalue()
+        return self._templates[compressed]
+
+
+def _write_blocks(writer, blocks) -> None:
+    for points in blocks:
+        with profiling.phase("write.write_points") as phase:
+            writer.write_points(points)
+            phase.bytes = points.array.nbytes
+
+
+def _write_points(
+    output_path,
+    header,
+    point_data,
+    xyz,
+    xyz_offset,
+    extra_dimensions,
+    data_min_max,
+    workers,
+    executor=None,
+    order=None,
+) -> None:
+    blocks = _encode_points(
+        header, point_data, xyz, xyz_offset, extra_dimensions, data_min_max, order
+    )
+
+    writer = _open_writer(output_path, header, workers, executor)
+    try:
+        _write_blocks(writer, blocks)
+    finally:
+        with profiling.phase("write.close"):
+            writer.close()
+
+
+def _write_copc(
+    output_path, header, point_data, xyz, xyz_offset, extra_dimensions, data_min_max
+) -> None:
+    with profiling.phase("write.octree"):
+        octree = copc.Octree(xyz, xyz_offset)
+
+    gps_time_range = (0.0, 0.0)
+    if "gps_time" in point_data:
+        gps_time = np.asarray(point_data["gps_time"])
+        gps_time_range = (float(gps_time.min()), float(gps_time.max()))
+
+    blocks = _encode_points(
+        header,
+        point_data,
+        xyz,
+        xyz_offset,
+        extra_dimensions,
+        data_min_max,
+        octree.order,
+    )
+    with profiling.phase("write.copc"):
+        copc.write_points(output_path, header, octree, blocks, gps_time_range)
+
+
+def _open_writer(output_path, header, workers, executor=None):
+    is_laz = Path(output_path).suffix.lower() == ".laz"
+    if workers is not None and workers > 1 and is_laz:
+        return laz.LazWriter(output_path, header, workers, executor)
+    return laspy.open(str(output_path), mode="w", header=header)
+
+
+def _from_arrow(point_data):
+    """Returns the columns of an Arrow table, record batch or record batch reader
+    as a dict of numpy arrays, and any other point data unchanged.
+
+    Columns of fixed size lists, like an "xyz" column of 3 values,
+    become 2d arrays. The numeric arrays are not copied when a column
+    is made of a single chunk.
+    """
+    if hasattr(point_data, "read_all"):
+        # pyarrow.RecordBatchReader
+        point_data = point_data.read_all()
+    if not hasattr(point_data, "schema") or not hasattr(point_data, "column_names"):
+        return point_data
+
+    columns = {}
+    for name, column in zip(point_data.column_names, point_data.columns):
+        if hasattr(column, "combine_chunks"):
+            # pyarrow.ChunkedArray
+            n_chunks = column.num_chunks
+            column = column.chunk(0) if n_chunks == 1 else column.combine_chunks()
+        if column.null_count:
+            raise ValueError(f"Column '{name}' has null values")
+        list_size = getattr(column.type, "list_size", None)
+        if list_size is not None:
+            values = column.flatten().to_numpy(zero_copy_only=False)
+            columns[name] = values.reshape(-1, list_size)
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+
+def _extra_dimensions(point_data) -> List[str]:
+    standard_dimensions = point_formats.standard_dimensions | {"xyz", "XYZ"}
+    return sorted(set(point_data) - standard_dimensions)
+
+
+def _find_xyz(point_data) -> List[np.ndarray]:
     xyz = None
     for coords in ["xyz", "XYZ"]:
         if coords in point_data:
@@ -91,56 +920,159 @@ def write(
     if not xyz:
         raise ValueError("Could not find xyz coordinates from input data.")
 
-    las = laspy.create(file_version="1.4", point_format=point_format)
+    return xyz
+
+
+def _reproject(xyz, xyz_offset, source_crs, crs, workers) -> List[np.ndarray]:
+    """The coordinates reprojected from source_crs to crs, xyz_offset included."""
+    if crs is None:
+        raise ValueError("source_crs needs a crs to reproject the points to")
+    with profiling.phase("write.reproject") as phase:
+        xyz = projection.transform_xyz(
+            projection.transformer(source_crs, crs),
+            [np.asarray(values) for values in xyz],
+            (0, 0, 0) if xyz_offset is None else xyz_offset,
+            workers=workers,
+        )
+        phase.bytes = sum(values.nbytes for values in xyz)
+    return xyz
+
+
+def _create_header(point_format, extra_dtypes, crs, scales, offsets):
+    if point_format not in point_formats.supported_point_formats:
+        raise ValueError(
+            f"Unsupported point format {point_format} "
+            f"(not in {point_formats.supported_point_formats})"
+        )
+
+    header = laspy.LasHeader(version="1.4", point_format=point_format)
 
     if crs is not None:
-        wkt = pyproj.CRS.from_epsg(crs).to_wkt()
-        las.vlrs.append(WktCoordinateSystemVlr(wkt))
-        las.header.global_encoding.wkt = 1
+        with profiling.phase("write.crs"):
+            wkt = projection.wkt(crs)
+        header.vlrs.append(WktCoordinateSystemVlr(wkt))
+        header.global_encoding.wkt = 1
 
     extra_bytes_params = [
-        laspy.point.format.ExtraBytesParams(name=dim, type=point_data[dim].dtype)
-        for dim in extra_dimensions
+        laspy.point.format.ExtraBytesParams(name=dim, type=dtype)
+        for dim, dtype in extra_dtypes.items()
     ]
-    las.add_extra_dims(extra_bytes_params)
+    header.add_extra_dims(extra_bytes_params)
 
-    min_, max_, offset = _min_max_offset(xyz)
+    header.scales = np.array(scales, "d")
+    header.offsets = np.array(offsets, "d")
+
+    return header
 
-    offset = offset if xyz_offset is None else xyz_offset
-    if xyz_offset is None:
-        xyz_offset = (0, 0, 0)
 
-    min_ += xyz_offset
-    max_ += xyz_offset
-    las.header.mins, las.header.maxs = min_, max_
-    scales = scale if scale else _get_scale(min_, max_, offset)
-    las.change_scaling(scales=scales, offsets=offset)
+def _encode_points(
+    header, point_data, xyz, xyz_offset, extra_dimensions, data_min_max, order=None
+) -> Iterator[laspy.ScaleAwarePointRecord]:
+    """Encode the points by blocks of `_BLOCK_SIZE` records.
+
+    Each block is a single structured array with the record dtype of the file,
+    filled one field at a time, and the coordinates are quantized in place.
+    So the memory used doesn't depend on the number of points.
+
+    With `order`, the points are taken in this order, one block at a time.
+    """
+    if data_min_max is None:
+        data_min_max = {}
 
-    las.x = xyz[0].astype("d") + xyz_offset[0]
-    las.y = xyz[1].astype("d") + xyz_offset[1]
-    las.z = xyz[2].astype("d") + xyz_offset[2]
+    point_format = header.point_format
+    point_format_type = point_formats.point_formats[point_format.id]
 
+    columns = {}
     if "gps_time" in point_format_type and "gps_time" in point_data:
-        las.gps_time = point_data["gps_time"]
+        columns["gps_time"] = point_data["gps_time"]
 
     if "intensity" in point_format_type and "intensity" in point_data:
-        las.intensity = scale_data(
-            "intensity", point_data["intensity"], data_min_max.get("intensity")
-        )
+        columns["intensity"] = point_data["intensity"]
 
     if "classification" in point_format_type and "classification" in point_data:
-        # convert pd.Series to numpy array, if applicable
-        las.classification = np.array(point_data["classification"])
+        columns["classification"] = point_data["classification"]
 
     colors = ["red", "green", "blue"]
     if all(c in point_format_type and c in point_data for c in colors):
         for c in colors:
-            setattr(las, c, scale_data(c, point_data[c], data_min_max.get(c)))
+            columns[c] = point_data[c]
 
     for dim in extra_dimensions:
-        setattr(las, dim, point_data[dim])
+        columns[dim] = point_data[dim]
+
+    # convert pd.Series to numpy arrays, if applicable
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+    xyz = [np.asarray(values) for values in xyz]
+
+    # the extra dimensions are cast to the types of the header
+    dtype = point_formats.record_dtype(
+        point_format.id,
+        [(dim.name, dim.dtype) for dim in point_format.extra_dimensions],
+        point_format.size,
+    )
+    sub_fields = point_formats.composed_fields(point_format.id)
 
-    las.write(str(output_path))
+    n_points = len(xyz[0])
+    for start in range(0, n_points, _BLOCK_SIZE):
+        with profiling.phase("write.encode") as phase:
+            block = slice(start, start + _BLOCK_SIZE)
+            if order is not None:
+                block = order[block]
+            array = np.zeros(min(_BLOCK_SIZE, n_points - start), dtype=dtype)
+
+            for axis, name in enumerate("XYZ"):
+                _quantize(
+                    xyz[axis][block],
+                    xyz_offset[axis],
+                    header.scales[axis],
+                    header.offsets[axis],
+                    array[name],
+                )
+
+            for name, values in columns.items():
+                values = values[block]
+                if name in data_min_max:
+                    values = scale_data(name, values, data_min_max[name])
+                if name in sub_fields:
+                    _set_sub_field(array, name, values, *sub_fields[name])
+                else:
+                    array[name] = values
+            phase.bytes = array.nbytes
+
+        yield laspy.ScaleAwarePointRecord(
+            array, point_format, header.scales, header.offsets
+        )
+
+
+def _quantize(values, xyz_offset, scale, offset, out) -> None:
+    """Same as setting the x, y or z of laspy points, without the temporaries."""
+    if not len(values):
+        return
+
+    values = np.add(values, xyz_offset, dtype="d")
+
+    max_allowed = np.iinfo(np.int32).max * scale + offset
+    min_allowed = np.iinfo(np.int32).min * scale + offset
+    if values.max() > max_allowed or values.min() < min_allowed:
+        raise OverflowError("Values given do not fit after applying offset and scale")
+
+    values -= offset
+    values /= scale
+    np.round(values, out=values)
+    out[:] = values
+
+
+def _set_sub_field(array, name, values, composed_field, mask) -> None:
+    shift = (mask & -mask).bit_length() - 1
+    max_allowed = mask >> shift
+    if len(values) and np.max(values) > max_allowed:
+        raise OverflowError(
+            f"value {np.max(values)} is greater than allowed (max: {max_allowed})"
+        )
+    field_dtype = array.dtype[composed_field]
+    shifted = np.left_shift(values, shift).astype(field_dtype)
+    cleared = array[composed_field] & np.invert(field_dtype.type(mask))
+    array[composed_field] = cleared | shifted
 
 
 def scale_data(field_name, data, min_max):
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+import jaklas
+import numpy as np
+import pytest
+from jaklas import catalog
+
+TEST_DATA = Path(__file__).parent / "data"
+TEMP_DIR = Path(__file__).parent / "temp"
+
+
+def _write_tiles():
+    paths = []
+    for n, (x, y) in enumerate([(0, 0), (10, 0), (0, 10), (10, 10)]):
+        xyz = np.random.random((100 + n, 3)) * 10 + (x, y, 0)
+        path = TEMP_DIR / "tiles" / f"{x}_{y}.las"
+        jaklas.write({"xyz": xyz}, path)
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_catalog(workers):
+    paths = _write_tiles()
+    cat = catalog(str(TEMP_DIR / "tiles" / "*.las"), workers=workers)
+    assert len(cat) == 4
+    assert list(cat.path) == sorted(str(p) for p in paths)
+    assert sorted(cat.point_count) == [100, 101, 102, 103]
+    assert np.all(cat.point_format == 0)
+    for n, path in enumerate(cat.path):
+        header = jaklas.read_header(path)
+        assert np.allclose(cat.min[n], header.min)
+        assert np.allclose(cat.max[n], header.max)
+        assert np.allclose(cat.scale[n], header.scale)
+
+
+def test_catalog_query():
+    paths = _write_tiles()
+    cat = catalog(paths)
+    assert list(cat.query(bbox=(1, 1, 2, 2)).path) == [str(paths[0])]
+    assert len(cat.query(bbox=(5, 5, 15, 15))) == 4
+    assert len(cat.query(bbox=(12, 1, 13, 20))) == 2
+    assert len(cat.query(bbox=(100, 100, 200, 200))) == 0
+    assert len(cat.query(polygon=[(11, 11), (12, 11), (12, 12)])) == 1
+    assert cat.overlaps(bbox=(12, 1, 13, 20)).tolist() == [False, True, False, True]
+
+
+def test_catalog_cache():
+    paths = _write_tiles()
+    cache = TEMP_DIR / "catalog.npz"
+    cat = catalog(paths, cache=cache)
+    assert cache.exists()
+
+    cached = jaklas.Catalog.load(cache)
+    assert np.array_equal(cached.path, cat.path)
+    assert np.array_equal(cached.point_count, cat.point_count)
+
+    # rewrite a file, only this row should change
+    jaklas.write({"xyz": np.random.random((5, 3)) + 100}, paths[1])
+    stat = os.stat(paths[1])
+    os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cat2 = catalog(paths, cache=cache)
+    assert cat2.point_count.tolist() == [100, 5, 102, 103]
+    assert np.array_equal(cat2.min[[0, 2, 3]], cat.min[[0, 2, 3]])
+    assert jaklas.Catalog.load(cache).point_count.tolist() == [100, 5, 102, 103]
+
+
+def test_catalog_empty():
+    cat = catalog(str(TEMP_DIR / "nothing" / "*.las"))
+    assert len(cat) == 0
+    assert len(cat.query(bbox=(0, 0, 1, 1))) == 0
+
+
+def test_catalog_to_pandas():
+    cat = catalog([TEST_DATA / "very_small.las", TEST_DATA / "very_small.laz"])
+    df = cat.to_pandas()
+    assert len(df) == 2
+    assert list(df.point_count) == [71, 71]
+    assert "min_x" in df and "max_z" in df
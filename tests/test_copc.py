@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import laspy
+import numpy as np
+import pytest
+
+import jaklas
+from jaklas import copc
+
+TEMP_DIR = Path(__file__).parent / "temp"
+
+
+def _point_data(n_points=300_000):
+    rng = np.random.default_rng(0)
+    return {
+        "xyz": rng.random((n_points, 3)) * (100, 100, 10) + (1000, 2000, 0),
+        "intensity": rng.integers(0, 1000, n_points).astype("u2"),
+        "gps_time": np.arange(n_points) * 0.001,
+        "new_stuff": np.arange(n_points, dtype="f4"),
+    }
+
+
+def test_octree():
+    xyz = np.random.random((50_000, 3)) * 10
+    octree = copc.Octree(xyz.T, max_node_points=1000, grid_size=16)
+    assert sorted(octree.order) == list(range(50_000))
+    assert octree.counts.sum() == 50_000
+    assert octree.keys[0].tolist() == [0, 0, 0, 0]
+    assert len(octree.keys) == len(octree.counts) > 8
+
+    # the points are inside the cube of their node
+    node_size = 2 * octree.halfsize / 2.0 ** octree.keys[:, 0]
+    node_min = octree.center - octree.halfsize + octree.keys[:, 1:] * node_size[:, None]
+    node_of_points = np.repeat(np.arange(len(octree.counts)), octree.counts)
+    points = xyz[octree.order]
+    assert np.all(points >= node_min[node_of_points] - 1e-9)
+    assert np.all(points <= (node_min + node_size[:, None])[node_of_points] + 1e-9)
+
+
+def test_write_copc():
+    data = _point_data()
+    path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, path)
+
+    header = jaklas.read_header(path)
+    assert header.is_copc and header.point_format == 6
+    assert header.vlrs[0].user_id == "copc"
+
+    with laspy.CopcReader.open(str(path)) as reader:
+        assert len(reader.query()) == len(data["xyz"])
+        assert reader.copc_info.gps_max == data["gps_time"][-1]
+
+    # it's also a standard LAZ file
+    result = jaklas.read(path)
+    order = np.argsort(result["gps_time"])
+    assert np.allclose(result["xyz"][order], data["xyz"], atol=0.0001)
+    assert np.array_equal(result["new_stuff"][order], data["new_stuff"])
+
+
+def test_read_copc_bbox():
+    data = _point_data()
+    path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, path)
+
+    xy = data["xyz"][:, :2]
+    bbox = (1010, 2010, 1030, 2020)
+    inside = np.all((xy >= bbox[:2]) & (xy <= bbox[2:]), axis=1)
+    result = jaklas.read(path, bbox=bbox, other_dims=["gps_time"])
+    assert np.allclose(np.sort(result["gps_time"]), data["gps_time"][inside])
+
+    polygon = [(1000, 2000), (1100, 2000), (1000, 2100)]
+    inside = (xy - (1000, 2000)).sum(axis=1) < 100
+    df = jaklas.read_pandas(path, polygon=polygon)
+    assert np.allclose(np.sort(df["gps_time"]), data["gps_time"][inside])
+
+
+def test_read_copc_depth():
+    data = _point_data()
+    path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, path)
+
+    root = jaklas.read(path, max_depth=0)
+    assert 0 < len(root["xyz"]) < len(data["xyz"])
+    deeper = jaklas.read(path, max_depth=1)
+    assert len(root["xyz"]) < len(deeper["xyz"]) <= len(data["xyz"])
+
+    coarse = jaklas.read(path, resolution=100)
+    assert len(coarse["xyz"]) == len(root["xyz"])
+    assert len(jaklas.read(path, resolution=1e-6)["xyz"]) == len(data["xyz"])
+
+    with pytest.raises(ValueError):
+        jaklas.read(path, max_depth=0, resolution=1)
+    with pytest.raises(ValueError):
+        jaklas.read(Path(__file__).parent / "data" / "very_small.laz", max_depth=0)
+
+
+def test_write_copc_point_format():
+    data = {**_point_data(1000), "red": np.zeros(1000, "u2")}
+    data["green"] = data["blue"] = data["red"]
+    path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, path, point_format=3)
+    assert jaklas.read_header(path).point_format == 7
+    with pytest.raises(ValueError):
+        jaklas.write(data, path, spatial_order="morton")
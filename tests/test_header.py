@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import jaklas
+import laspy
+import numpy as np
+import pyproj
+import pytest
+from jaklas import read_header
+from laspy.vlrs.known import WktCoordinateSystemVlr
+from laspy.vlrs.vlrlist import VLRList
+
+TEST_DATA = Path(__file__).parent / "data"
+TEMP_DIR = Path(__file__).parent / "temp"
+very_small_las = TEST_DATA / "very_small.las"
+very_small_laz = TEST_DATA / "very_small.laz"
+
+
+def _write_1_4(path, crs=None):
+    data = {
+        "xyz": np.random.random((100, 3)) * 100,
+        "classification": np.full(100, 100, "u1"),
+        "new_stuff": np.arange(100, dtype="u2"),
+        "new_stuff_float": np.arange(100, dtype="f8"),
+    }
+    jaklas.write(data, path, crs=crs)
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_header_matches_laspy(path):
+    header = read_header(path)
+
+    with laspy.open(str(path)) as f:
+        assert header.version == str(f.header.version)
+        assert header.point_format == f.header.point_format.id
+        assert header.point_count == f.header.point_count
+        assert header.point_record_length == f.header.point_format.size
+        assert header.offset_to_point_data == f.header.offset_to_point_data
+        assert header.number_of_vlrs == len(f.header.vlrs)
+        assert header.is_compressed == f.header.are_points_compressed
+        n_returns = len(header.points_by_return)
+        assert header.points_by_return == list(f.header.number_of_points_by_return[:n_returns])
+        assert header.generating_software == f.header.generating_software
+        assert header.scale == list(f.header.scales)
+        assert header.min == list(f.header.mins)
+        assert header.crs_wkt is None
+        assert header.extra_dimensions == []
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_header_1_4(suffix):
+    path = TEMP_DIR / f"temp{suffix}"
+    _write_1_4(path, crs=2950)
+    header = read_header(path)
+
+    assert header.version == "1.4"
+    assert header.point_format == 6
+    assert header.point_count == 100
+    assert header.is_compressed == (suffix == ".laz")
+    assert header.crs_wkt == pyproj.CRS.from_epsg(2950).to_wkt()
+    assert header.extra_dimensions == [
+        ("new_stuff", np.dtype("u2")),
+        ("new_stuff_float", np.dtype("f8")),
+    ]
+    assert header.extra_bytes_size == 10
+    assert header.point_record_length == 40
+
+
+def test_header_evlrs():
+    path = TEMP_DIR / "temp.las"
+    _write_1_4(path)
+    las = laspy.read(str(path))
+    wkt = pyproj.CRS.from_epsg(2950).to_wkt()
+    las.evlrs = VLRList([WktCoordinateSystemVlr(wkt)])
+    las.write(str(path))
+
+    header = read_header(path)
+    assert header.number_of_evlrs == 1
+    assert header.start_of_first_evlr > header.offset_to_point_data
+    assert header.crs_wkt == wkt
+
+    with open(path, "rb") as f:
+        assert jaklas.header.Header(f, read_evlrs=False).crs_wkt is None
+
+
+def test_header_many_vlrs():
+    """The VLRs don't fit in the first read"""
+    path = TEMP_DIR / "temp.las"
+    _write_1_4(path)
+    las = laspy.read(str(path))
+    for n in range(10):
+        las.vlrs.append(laspy.VLR("test", n, "description", b"x" * 1000))
+    las.write(str(path))
+
+    header = read_header(path)
+    assert header.offset_to_point_data > 10000
+    assert [v.record_id for v in header.vlrs if v.user_id == "test"] == list(range(10))
+    assert all(v.data == b"x" * 1000 for v in header.vlrs if v.user_id == "test")
+    assert len(header.extra_dimensions) == 2
+
+
+def test_header_not_las():
+    path = TEMP_DIR / "temp.las"
+    path.write_bytes(b"not a las file" * 100)
+    with pytest.raises(ValueError):
+        read_header(path)
@@ -0,0 +1,20 @@
+from laspy import DecompressionSelection
+
+from jaklas.point_formats import decompression_selection
+
+
+def test_decompression_selection():
+    assert decompression_selection(None) == DecompressionSelection.all()
+    assert decompression_selection([], xyz=False) == DecompressionSelection.base()
+    selection = decompression_selection(["classification", "return_number"])
+    assert selection == (
+        DecompressionSelection.base()
+        | DecompressionSelection.Z
+        | DecompressionSelection.CLASSIFICATION
+    )
+    selection = decompression_selection(["red", "new_stuff"], xyz=False)
+    assert selection == (
+        DecompressionSelection.base()
+        | DecompressionSelection.RGB
+        | DecompressionSelection.ALL_EXTRA_BYTES
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import importlib
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import jaklas
+from jaklas import aiter_files, iter_files, read
+
+TEST_DATA = Path(__file__).parent / "data"
+paths = [TEST_DATA / "very_small.las", TEST_DATA / "very_small.laz"] * 3
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_iter_files(workers):
+    files = iter_files(paths, prefetch=2, workers=workers, other_dims=["gps_time"])
+    result = list(files)
+    assert [path for path, _ in result] == [str(p) for p in paths]
+    expected = read(paths[0], other_dims=["gps_time"])
+    for _, data in result:
+        assert sorted(data) == ["gps_time", "xyz"]
+        assert np.array_equal(data["xyz"], expected["xyz"])
+        assert np.array_equal(data["gps_time"], expected["gps_time"])
+
+
+def test_iter_files_glob():
+    result = list(iter_files(str(TEST_DATA / "*.la[sz]"), xyz=False))
+    names = [Path(path).name for path, _ in result]
+    assert names == ["very_small.las", "very_small.laz"]
+
+
+def test_iter_files_prefetch(monkeypatch):
+    running = []
+    lock = threading.Lock()
+
+    def slow_read(path, **kwargs):
+        with lock:
+            running.append(path)
+        time.sleep(0.02)
+        return {"path": path}
+
+    module = importlib.import_module("jaklas.prefetch")
+    monkeypatch.setattr(module, "read", slow_read)
+
+    for prefetch in [1, 3]:
+        running.clear()
+        consumed = 0
+        for path, data in iter_files(paths, prefetch=prefetch):
+            assert data["path"] == path
+            consumed += 1
+            # the next files are read while this one is processed
+            time.sleep(0.05)
+            assert len(running) == min(consumed + prefetch, len(paths))
+        assert consumed == len(paths)
+
+    # a budget of one file, no file is read ahead of the one being processed
+    size = jaklas.read_header(paths[0]).point_count * 24
+    running.clear()
+    consumed = 0
+    for path, data in iter_files(paths, prefetch=3, max_bytes=size, other_dims=[]):
+        consumed += 1
+        time.sleep(0.05)
+        assert len(running) == consumed
+    assert consumed == len(paths)
+
+
+def test_iter_files_break():
+    files = iter_files(paths, prefetch=4)
+    path, data = next(files)
+    files.close()
+    assert path == str(paths[0])
+
+    with pytest.raises(FileNotFoundError):
+        list(iter_files([paths[0], "missing.las"]))
+
+
+def test_aiter_files():
+    async def collect():
+        return [path async for path, _ in aiter_files(paths, prefetch=2, xyz=False)]
+
+    assert asyncio.run(collect()) == [str(p) for p in paths]
@@ -0,0 +1,106 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import jaklas
+from jaklas import profiling
+
+TEMP_DIR = Path(__file__).parent / "temp"
+
+point_data = {
+    "xyz": np.random.random((1000, 3)) * 100,
+    "intensity": np.arange(1000, dtype="u2"),
+    "classification": np.full(1000, 2, "u1"),
+}
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_profile(suffix):
+    path = TEMP_DIR / f"temp{suffix}"
+    phases = []
+    with jaklas.profile(callback=phases.append) as report:
+        jaklas.write(point_data, path, crs=2950)
+        jaklas.read(path)
+        jaklas.read_pandas(path)
+        jaklas.read_header(path)
+
+    assert phases == report.phases
+    summary = report.summary()
+    for name in [
+        "write.point_format",
+        "write.min_max_offset",
+        "write.header",
+        "write.crs",
+        "write.encode",
+        "write.write_points",
+        "write.close",
+        "read_header",
+        "read.points",
+        "read.decode",
+        "read_pandas.dataframe",
+    ]:
+        assert name in summary
+        assert summary[name].seconds >= 0
+    assert summary["write.encode"].bytes == 1000 * 20  # point format 0
+    assert summary["read.points"].calls == 2
+    assert summary["read.points"].peak_bytes is None
+    assert "write.encode" in str(report)
+
+    # nothing is recorded after the block
+    jaklas.read(path)
+    assert len(report.phases) == len(phases)
+
+
+def test_profile_threads():
+    paths = [TEMP_DIR / "a.las", TEMP_DIR / "b.las"]
+    for path in paths:
+        jaklas.write(point_data, path)
+    with jaklas.profile() as report:
+        jaklas.read_many(paths)
+        jaklas.write_tiled(point_data, TEMP_DIR / "tiles", tile_size=50, workers=2)
+
+    summary = report.summary()
+    # the phases of the files read and written in threads are recorded
+    assert summary["read_header"].calls >= 2
+    assert summary["read.mapped"].calls == 2
+    assert summary["write.encode"].calls >= 2
+
+
+def test_profile_memory():
+    path = TEMP_DIR / "temp.las"
+    jaklas.write(point_data, path)
+    with jaklas.profile(memory=True) as report:
+        jaklas.read(path, other_dims=["intensity"])
+    mapped = report.summary()["read.mapped"]
+    assert mapped.bytes == 1000 * (3 * 8 + 2)
+    assert mapped.peak_bytes >= mapped.bytes
+
+
+def test_profile_nested_peak():
+    with jaklas.profile(memory=True) as report:
+        with profiling.phase("outer"):
+            with profiling.phase("inner"):
+                array = np.ones(1_000_000)
+            del array
+    inner, outer = report.phases
+    assert inner.peak_bytes >= 8_000_000
+    assert outer.peak_bytes >= inner.peak_bytes
+
+
+def test_profile_logging(caplog):
+    path = TEMP_DIR / "temp.las"
+    jaklas.write(point_data, path)
+    with caplog.at_level(logging.DEBUG, logger="jaklas.profiling"):
+        with jaklas.profile():
+            jaklas.read_header(path)
+    assert "read_header" in caplog.text
+
+
+def test_phase_disabled():
+    phase = profiling.phase("anything")
+    with phase:
+        phase.bytes = 10
+    assert not phase.enabled
+    assert phase.bytes is None
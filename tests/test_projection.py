@@ -0,0 +1,48 @@
+import numpy as np
+import pyproj
+
+from jaklas import projection
+
+# MTM zone 8 to UTM zone 18, both in meters
+xyz = [
+    np.random.random(200_000) * 1000 + 300_000,
+    np.random.random(200_000) * 1000 + 5_040_000,
+    np.random.random(200_000) * 100,
+]
+
+
+def test_cached():
+    assert projection.wkt(2950) is projection.wkt(2950)
+    assert projection.wkt(2950) == pyproj.CRS.from_epsg(2950).to_wkt()
+    assert projection.transformer(2950, 32618) is projection.transformer(2950, 32618)
+
+
+def test_transform_xyz():
+    transformer = pyproj.Transformer.from_crs(2950, 32618, always_xy=True)
+    expected = transformer.transform(xyz[0] + 1, xyz[1] + 2, xyz[2] + 3)
+
+    for workers in [None, 3]:
+        result = projection.transform_xyz(
+            projection.transformer(2950, 32618),
+            xyz,
+            xyz_offset=(1, 2, 3),
+            workers=workers,
+        )
+        assert np.allclose(result, expected)
+
+
+def test_transform_xyz_scaled_out():
+    raw = [np.round(values / 0.01).astype("i4") for values in xyz]
+    out = np.empty((len(raw[0]), 3), dtype="f4")
+    projection.transform_xyz(
+        projection.transformer(2950, 32618),
+        raw,
+        subtract=(300_000, 5_000_000, 0),
+        out=[out[:, axis] for axis in range(3)],
+        scales=(0.01, 0.01, 0.01),
+    )
+    expected = projection.transformer(2950, 32618).transform(
+        *[values * 0.01 for values in raw]
+    )
+    assert np.allclose(out[:, 0] + 300_000, expected[0], atol=0.1)
+    assert np.allclose(out[:, 1] + 5_000_000, expected[1], atol=1)
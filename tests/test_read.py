@@ -1,9 +1,24 @@
+import tracemalloc
 from pathlib import Path
 
 import numpy as np
 import laspy
+import pyproj
 import pytest
-from jaklas import read, read_header, read_pandas, write
+from jaklas import (
+    chunk_bounds,
+    iter_read,
+    iter_read_arrow,
+    iter_read_pandas,
+    laz,
+    read,
+    read_arrow,
+    read_header,
+    read_many,
+    read_pandas,
+    update,
+    write,
+)
 
 TEST_DATA = Path(__file__).parent / "data"
 TEMP_DIR = Path(__file__).parent / "temp"
@@ -98,3 +113,526 @@ def test_read_ignore_missing_dims():
     assert len(data["xyz"]) == 71
     assert "intensity" in data
     assert "missing" not in data
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_iter_read(path):
+    chunks = list(iter_read(path, chunk_size=30))
+    assert [len(c["xyz"]) for c in chunks] == [30, 30, 11]
+    data = read(path)
+    assert np.allclose(np.concatenate([c["xyz"] for c in chunks]), data["xyz"])
+    assert np.array_equal(
+        np.concatenate([c["classification"] for c in chunks]), data["classification"]
+    )
+
+
+def test_iter_read_options():
+    chunks = list(
+        iter_read(
+            very_small_las,
+            chunk_size=50,
+            offset=(1, 1, 1),
+            combine_xyz=False,
+            xyz_dtype="f",
+            other_dims=["intensity"],
+        )
+    )
+    data = read(very_small_las, combine_xyz=False, xyz_dtype="f")
+    assert all(sorted(c) == ["intensity", "x", "y", "z"] for c in chunks)
+    assert chunks[0]["x"].dtype == np.float32
+    assert np.allclose(np.concatenate([c["x"] for c in chunks]), data["x"] - 1)
+
+
+def test_iter_read_wrong_dim():
+    with pytest.raises(KeyError):
+        list(iter_read(very_small_las, other_dims=["wrong"]))
+
+
+def test_iter_read_pandas():
+    chunks = list(iter_read_pandas(very_small_laz, chunk_size=40))
+    assert [len(c) for c in chunks] == [40, 31]
+    df = read_pandas(very_small_laz)
+    assert list(chunks[0].columns) == list(df.columns)
+    assert chunks[1].classification.dtype == "uint8"
+
+
+def _center_bbox(path):
+    xyz = read(path)["xyz"]
+    center = (xyz.min(axis=0) + xyz.max(axis=0)) / 2
+    return xyz, center
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_read_bbox(path):
+    xyz, center = _center_bbox(path)
+    bbox = (xyz[:, 0].min(), xyz[:, 1].min(), center[0], center[1])
+    expected = (xyz[:, 0] <= center[0]) & (xyz[:, 1] <= center[1])
+    assert 0 < expected.sum() < len(xyz)
+
+    data = read(path, bbox=bbox, chunk_size=20)
+    assert np.allclose(data["xyz"], xyz[expected])
+    assert len(data["classification"]) == expected.sum()
+
+    bbox_3d = (*bbox[:2], center[2], *bbox[2:], np.inf)
+    data = read(path, bbox=bbox_3d, chunk_size=20)
+    assert np.allclose(data["xyz"], xyz[expected & (xyz[:, 2] >= center[2])])
+
+
+def test_read_bbox_no_overlap():
+    data = read(very_small_las, bbox=(0, 0, 1, 1))
+    full = read(very_small_las)
+    assert sorted(data) == sorted(full)
+    assert data["xyz"].shape == (0, 3)
+    assert data["gps_time"].dtype == full["gps_time"].dtype
+
+    df = read_pandas(very_small_las, bbox=(0, 0, 1, 1))
+    assert len(df) == 0 and "classification" in df
+
+
+def test_read_polygon():
+    xyz, center = _center_bbox(very_small_las)
+    min_, max_ = xyz.min(axis=0), xyz.max(axis=0)
+    # triangle covering the lower left half of the bounding box
+    polygon = [(min_[0], min_[1]), (max_[0], min_[1]), (min_[0], max_[1])]
+    relative = (xyz[:, :2] - min_[:2]) / (max_[:2] - min_[:2])
+    expected = relative.sum(axis=1) < 1
+
+    data = read(very_small_las, polygon=polygon, offset=center)
+    assert np.allclose(data["xyz"], xyz[expected] - center)
+
+
+def test_iter_read_bbox():
+    xyz, center = _center_bbox(very_small_las)
+    bbox = (center[0], center[1], np.inf, np.inf)
+    chunks = list(iter_read(very_small_las, chunk_size=10, bbox=bbox))
+    assert all(0 < len(c["xyz"]) <= 10 for c in chunks)
+    expected = (xyz[:, 0] >= center[0]) & (xyz[:, 1] >= center[1])
+    assert np.allclose(np.concatenate([c["xyz"] for c in chunks]), xyz[expected])
+    assert list(iter_read(very_small_las, bbox=(0, 0, 1, 1))) == []
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_read_header_point_count(path):
+    header = read_header(path)
+
+    with laspy.open(str(path)) as f:
+        assert header.point_count == f.header.point_count
+        assert header.point_format == f.header.point_format.id
+
+
+def test_read_mmap():
+    data = read(very_small_las)
+    mapped = read(very_small_las, mmap=True)
+    assert sorted(mapped) == sorted(data)
+    for dim in data:
+        assert np.allclose(np.asarray(mapped[dim]), np.asarray(data[dim]))
+        assert np.asarray(mapped[dim]).dtype == np.asarray(data[dim]).dtype
+
+
+def test_read_mmap_zero_copy():
+    mapped = read(very_small_las, mmap=True, offset=(1, 1, 1), combine_xyz=False)
+    assert isinstance(mapped["gps_time"], np.memmap)
+    assert np.shares_memory(mapped["gps_time"], mapped.array)
+    # nothing is decoded before being accessed
+    assert mapped._decoded == {}
+    x = mapped["x"]
+    assert list(mapped._decoded) == ["x"]
+    assert mapped["x"] is x
+    assert np.allclose(x, read(very_small_las, combine_xyz=False)["x"] - 1)
+
+
+def test_read_mmap_point_format_6():
+    data = {
+        "xyz": np.random.random((100, 3)) * 100,
+        "classification": (np.random.random(100) * 255).astype("u1"),
+        "new_stuff": np.arange(100, dtype="u2"),
+        "new_stuff_float": np.arange(100, dtype="f4"),
+    }
+    path = TEMP_DIR / "temp.las"
+    write(data, path, point_format=6)
+    # write doesn't store return numbers, update sets them in the bit fields
+    update(path, {"return_number": 3})
+    mapped = read(path, mmap=True, other_dims=["classification", "new_stuff_float"])
+    assert sorted(mapped) == ["classification", "new_stuff_float", "xyz"]
+    assert np.allclose(mapped["xyz"], data["xyz"], atol=0.0001)
+    assert np.array_equal(mapped["classification"], data["classification"])
+    assert np.array_equal(mapped["new_stuff_float"], data["new_stuff_float"])
+
+    mapped = read(path, mmap=True)
+    assert np.array_equal(mapped["new_stuff"], data["new_stuff"])
+    assert np.all(mapped["return_number"] == 3)
+
+
+def test_read_mmap_errors():
+    with pytest.raises(ValueError):
+        read(very_small_laz, mmap=True)
+    with pytest.raises(KeyError):
+        read(very_small_las, mmap=True, other_dims=["wrong"])
+    mapped = read(very_small_las, mmap=True, other_dims=["wrong"], ignore_missing_dims=True)
+    assert list(mapped) == ["xyz"]
+
+
+def _write_multi_chunk_laz():
+    # laspy writes LAZ chunks of 50 000 points
+    n_points = 120_000
+    data = {
+        "xyz": np.random.random((n_points, 3)) * 100,
+        "intensity": np.arange(n_points, dtype="u2"),
+        "gps_time": np.arange(n_points, dtype="f8"),
+        "new_stuff": np.arange(n_points, dtype="f4"),
+    }
+    path = TEMP_DIR / "temp.laz"
+    write(data, path)
+    return path
+
+
+def test_read_workers():
+    path = _write_multi_chunk_laz()
+    expected = read(path)
+    data = read(path, workers=2)
+    assert sorted(data) == sorted(expected)
+    for dim in data:
+        assert np.array_equal(np.asarray(data[dim]), np.asarray(expected[dim]))
+
+    bbox = (0, 0, 50, 50)
+    data = read(path, workers=2, bbox=bbox)
+    assert np.array_equal(data["xyz"], read(path, bbox=bbox)["xyz"])
+
+
+def test_iter_read_workers():
+    path = _write_multi_chunk_laz()
+    expected = read(path)
+    chunks = list(iter_read(path, chunk_size=30_000, workers=3))
+    assert all(len(c["xyz"]) <= 30_000 for c in chunks)
+    assert np.array_equal(np.concatenate([c["xyz"] for c in chunks]), expected["xyz"])
+    assert np.array_equal(
+        np.concatenate([c["new_stuff"] for c in chunks]), expected["new_stuff"]
+    )
+
+
+def test_read_workers_las():
+    # uncompressed files are read normally
+    data = read(very_small_las, workers=2)
+    assert np.array_equal(data["xyz"], read(very_small_las)["xyz"])
+
+
+def _write_point_format_6(path, n_points=120_000):
+    data = {
+        "xyz": np.random.random((n_points, 3)) * 100,
+        "classification": (np.random.random(n_points) * 255).astype("u1"),
+        "intensity": np.arange(n_points, dtype="u2"),
+        "gps_time": np.arange(n_points, dtype="f8"),
+        "new_stuff": np.arange(n_points, dtype="f4"),
+    }
+    write(data, path)
+    return data
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_read_selected_dims(suffix):
+    path = TEMP_DIR / f"temp{suffix}"
+    data = _write_point_format_6(path)
+
+    selected = read(path, other_dims=["classification"], xyz=False)
+    assert list(selected) == ["classification"]
+    assert np.array_equal(selected["classification"], data["classification"])
+
+    selected = read(path, other_dims=["new_stuff", "withheld"], combine_xyz=False)
+    assert sorted(selected) == ["new_stuff", "withheld", "x", "y", "z"]
+    assert np.array_equal(selected["new_stuff"], data["new_stuff"])
+    assert np.allclose(selected["z"], data["xyz"][:, 2], atol=0.0001)
+
+    chunks = list(iter_read(path, other_dims=["gps_time"], xyz=False))
+    assert list(chunks[0]) == ["gps_time"]
+    gps_time = np.concatenate([c["gps_time"] for c in chunks])
+    assert np.array_equal(gps_time, data["gps_time"])
+
+    df = read_pandas(path, other_dims=["intensity"], xyz=False, bbox=(0, 0, 50, 50))
+    inside = np.all(data["xyz"][:, :2] <= 50, axis=1)
+    assert list(df.columns) == ["intensity"]
+    assert np.array_equal(df["intensity"], data["intensity"][inside])
+
+
+def test_read_selected_dims_workers():
+    path = TEMP_DIR / "temp.laz"
+    data = _write_point_format_6(path)
+    selected = read(path, other_dims=["classification"], xyz=False, workers=2)
+    assert np.array_equal(selected["classification"], data["classification"])
+
+
+def test_read_selected_dims_wrong_dim():
+    with pytest.raises(KeyError):
+        read(very_small_las, other_dims=["wrong"])
+    data = read(very_small_las, other_dims=["wrong"], ignore_missing_dims=True)
+    assert list(data) == ["xyz"]
+
+
+def test_read_scaled_extra_dimension():
+    header = laspy.LasHeader(point_format=6, version="1.4")
+    header.add_extra_dim(
+        laspy.ExtraBytesParams("scaled", "i4", scales=[0.01], offsets=[10])
+    )
+    las = laspy.LasData(header)
+    las.x = np.arange(10.0)
+    las.y = np.arange(10.0)
+    las.z = np.arange(10.0)
+    las.scaled = np.arange(10) * 0.5 + 10
+    path = TEMP_DIR / "temp.las"
+    las.write(str(path))
+
+    assert read_header(path).scaled_extra_dimensions == ["scaled"]
+    data = read(path, other_dims=["scaled"])
+    assert np.allclose(data["scaled"], np.arange(10) * 0.5 + 10)
+
+
+def test_read_out():
+    path = TEMP_DIR / "temp.las"
+    data = _write_point_format_6(path, n_points=1000)
+    out = {"xyz": np.empty((1000, 3), "f4"), "intensity": np.empty(1000, "u4")}
+    for suffix in [".las", ".laz"]:
+        path = TEMP_DIR / f"temp{suffix}"
+        write(data, path)
+        result = read(path, out=out, other_dims=["intensity", "classification"])
+        assert result["xyz"] is out["xyz"]
+        assert result["intensity"] is out["intensity"]
+        assert np.allclose(out["xyz"], data["xyz"], atol=0.0001)
+        assert np.array_equal(out["intensity"], data["intensity"])
+        assert np.array_equal(result["classification"], data["classification"])
+
+    out = {"x": np.empty(1000), "z": np.empty(1000)}
+    result = read(path, out=out, offset=(1, 2, 3), combine_xyz=False)
+    assert result["z"] is out["z"]
+    assert np.allclose(result["z"], data["xyz"][:, 2] - 3, atol=0.0001)
+    assert np.allclose(result["y"], data["xyz"][:, 1] - 2, atol=0.0001)
+
+    with pytest.raises(ValueError):
+        read(path, out={"xyz": np.empty((10, 3))})
+
+
+def test_read_xyz_peak_memory():
+    n_points = 1_000_000
+    path = TEMP_DIR / "temp.las"
+    write({"xyz": np.random.random((n_points, 3)) * 100}, path)
+    output_size = n_points * 3 * 8
+
+    tracemalloc.start()
+    try:
+        read(path, other_dims=[])
+        _, peak = tracemalloc.get_traced_memory()
+        # no full size temporary besides the output
+        assert peak < 1.1 * output_size
+
+        out = {"xyz": np.empty((n_points, 3))}
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        read(path, other_dims=[], out=out)
+        _, peak = tracemalloc.get_traced_memory()
+        assert peak - current < 0.1 * output_size
+    finally:
+        tracemalloc.stop()
+
+
+def _write_tiles(n_tiles=3, n_points=1000, suffix=".las"):
+    paths, tiles = [], []
+    for n in range(n_tiles):
+        data = {
+            "xyz": np.random.random((n_points, 3)) * 100 + [n * 100, 0, 0],
+            "intensity": np.arange(n_points, dtype="u2") + n,
+            "classification": np.full(n_points, n, "u1"),
+        }
+        if n == 0:
+            data["new_stuff"] = np.arange(n_points, dtype="f4")
+        path = TEMP_DIR / f"tile_{n}{suffix}"
+        write(data, path)
+        paths.append(path)
+        tiles.append(data)
+    return paths, tiles
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_read_many(suffix):
+    paths, tiles = _write_tiles(suffix=suffix)
+    data = read_many(paths, workers=2, source_index="file")
+    assert sorted(data) == sorted([*read(paths[1]), "file"])
+    assert np.allclose(
+        data["xyz"], np.concatenate([t["xyz"] for t in tiles]), atol=0.0001
+    )
+    assert np.array_equal(
+        data["intensity"], np.concatenate([t["intensity"] for t in tiles])
+    )
+    assert np.array_equal(data["file"], np.repeat([0, 1, 2], 1000))
+    assert data["file"].dtype == np.uint8
+
+    expected = read(paths[2], offset=(1, 2, 3), combine_xyz=False, xyz_dtype="f")
+    data = read_many(
+        str(TEMP_DIR / f"tile_*{suffix}"),
+        offset=(1, 2, 3),
+        combine_xyz=False,
+        xyz_dtype="f",
+        other_dims=["classification"],
+    )
+    assert sorted(data) == ["classification", "x", "y", "z"]
+    assert data["x"].dtype == np.float32
+    assert np.array_equal(data["x"][2000:], expected["x"])
+
+
+def test_read_many_missing_dims():
+    paths, tiles = _write_tiles()
+    with pytest.raises(KeyError):
+        read_many(paths, other_dims=["new_stuff"])
+
+    data = read_many(
+        paths, other_dims=["new_stuff", "missing"], ignore_missing_dims=True
+    )
+    assert sorted(data) == ["new_stuff", "xyz"]
+    assert np.array_equal(data["new_stuff"][:1000], tiles[0]["new_stuff"])
+    assert np.all(data["new_stuff"][1000:] == 0)
+
+
+def test_read_many_bbox():
+    paths, tiles = _write_tiles()
+    xyz = np.concatenate([t["xyz"] for t in tiles])
+    # the first tile is inside, the second is partial and the third is outside
+    bbox = (-1, -1, 150, 101)
+    expected = np.all((xyz[:, :2] >= -1) & (xyz[:, :2] <= [150, 101]), axis=1)
+
+    data = read_many(paths, workers=2, bbox=bbox, source_index="file")
+    assert np.allclose(data["xyz"], xyz[expected], atol=0.0001)
+    assert np.array_equal(data["file"], np.repeat([0, 1, 2], 1000)[expected])
+
+    data = read_many(paths, bbox=bbox, xyz=False, other_dims=[], source_index="file")
+    assert list(data) == ["file"]
+    assert len(data["file"]) == expected.sum()
+
+
+def test_read_many_bbox_workers():
+    path = _write_multi_chunk_laz()
+    write(read(path), path, spatial_order="hilbert")
+    bbox = (0, 0, 30, 30)
+    expected = read(path, bbox=bbox)
+
+    data = read_many([path, path], workers=2, bbox=bbox)
+    assert np.array_equal(data["xyz"], np.concatenate([expected["xyz"]] * 2))
+    assert np.array_equal(data["gps_time"], np.tile(expected["gps_time"], 2))
+
+    # with chunk bounds, only the LAZ chunks overlapping the bbox are decoded
+    ranges = chunk_bounds.ranges(read_header(path), bbox)
+    decoded = list(laz.iter_points(path, 50_000, 2, ranges=ranges))
+    assert sum(len(points) for points in decoded) < 120_000
+    assert sum(len(points) for points in decoded) >= len(expected["xyz"])
+
+
+def test_read_many_empty():
+    data = read_many([], source_index="file")
+    assert data["xyz"].shape == (0, 3)
+    assert len(data["file"]) == 0
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_read_bbox_chunk_bounds(suffix, monkeypatch):
+    path = TEMP_DIR / f"temp{suffix}"
+    data = _write_point_format_6(path, n_points=200_000)
+    write(data, path, spatial_order="hilbert")
+    bbox = (0, 0, 30, 30)
+    inside = np.all(data["xyz"][:, :2] <= 30, axis=1)
+
+    decoded = []
+    read_points = laspy.LasReader.read_points
+
+    def count_points(self, n):
+        points = read_points(self, n)
+        decoded.append(len(points))
+        return points
+
+    monkeypatch.setattr(laspy.LasReader, "read_points", count_points)
+    result = read(path, bbox=bbox, chunk_size=20_000)
+    assert np.array_equal(np.sort(result["gps_time"]), data["gps_time"][inside])
+    # only some of the chunks are decoded
+    assert inside.sum() <= sum(decoded) < 100_000
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_read_every_nth(path):
+    data = read(path)
+    thinned = read(path, every_nth=4, chunk_size=10)
+    assert np.array_equal(thinned["xyz"], data["xyz"][::4])
+    assert np.array_equal(thinned["gps_time"], data["gps_time"][::4])
+
+
+def test_read_voxel_size():
+    path = TEMP_DIR / "temp.laz"
+    data = _write_point_format_6(path, n_points=100_000)
+    thinned = read_pandas(path, voxel_size=10, chunk_size=20_000)
+    # the voxels are aligned on the minimum of the points
+    min_ = read_header(path).min
+    cells = np.floor((thinned[["x", "y", "z"]].to_numpy() - min_) / 10)
+    assert len(thinned) == len(np.unique(cells, axis=0))
+    assert 1000 <= len(thinned) <= 1331
+
+    centroids = read(path, voxel_size=10, voxel_centroid=True, other_dims=[])
+    assert np.allclose(centroids["xyz"].mean(axis=0), 50, atol=1)
+    assert np.all(np.floor((centroids["xyz"] - min_) / 10) == cells)
+
+    both = read(path, every_nth=1000, voxel_size=10, bbox=(0, 0, 50, 50))
+    assert len(both["xyz"]) <= 100
+    assert np.all(both["xyz"][:, :2] <= 50)
+
+    with pytest.raises(ValueError):
+        read(path, voxel_centroid=True)
+
+
+@pytest.mark.parametrize("path", [very_small_las, very_small_laz])
+def test_read_arrow(path):
+    pa = pytest.importorskip("pyarrow")
+
+    df = read_pandas(path)
+    table = read_arrow(path)
+    assert isinstance(table, pa.Table)
+    assert table.column_names == list(df.columns)
+    for name in df.columns:
+        assert np.array_equal(table.column(name).to_numpy(), df[name].to_numpy())
+
+    batches = list(iter_read_arrow(path, chunk_size=10, other_dims=["intensity"]))
+    assert all(isinstance(batch, pa.RecordBatch) for batch in batches)
+    assert all(batch.num_rows <= 10 for batch in batches)
+    chunked = pa.Table.from_batches(batches)
+    assert chunked.column_names == ["x", "y", "z", "intensity"]
+    assert np.array_equal(chunked.column("x").to_numpy(), df["x"].to_numpy())
+
+    # an arrow table round trips through write
+    table = table.select(["x", "y", "z", "intensity", "classification", "gps_time"])
+    write(table, TEMP_DIR / "temp.las")
+    written = read_arrow(TEMP_DIR / "temp.las", other_dims=table.column_names[3:])
+    assert written.schema.equals(table.schema)
+    for name in table.column_names:
+        assert np.allclose(written.column(name), table.column(name))
+
+
+def test_read_to_crs():
+    path = TEMP_DIR / "temp.laz"
+    data = {
+        "xyz": np.random.random((1000, 3)) * 1000 + (300_000, 5_040_000, 0),
+        "intensity": np.arange(1000, dtype="u2"),
+    }
+    write(data, path, crs=2950, scale=(0.001,) * 3)
+    expected = read(path)["xyz"]
+    transformer = pyproj.Transformer.from_crs(2950, 32618, always_xy=True)
+    expected = np.stack(transformer.transform(*expected.T), axis=1)
+
+    offset = (600_000, 5_000_000, 0)
+    result = read(path, to_crs=32618, offset=offset, xyz_dtype="f4")
+    assert result["xyz"].dtype == np.float32
+    assert np.allclose(result["xyz"] + offset, expected, atol=0.01)
+
+    bbox = (300_000, 5_040_000, 300_500, 5_041_000)
+    df = read_pandas(path, to_crs="EPSG:32618", bbox=bbox)
+    assert 0 < len(df) < 1000
+    assert np.all(df["x"] > 600_000)
+
+    chunks = list(iter_read(path, chunk_size=300, to_crs=32618, other_dims=[]))
+    assert np.allclose(np.concatenate([c["xyz"] for c in chunks]), expected)
+
+    with pytest.raises(ValueError):
+        read(path, to_crs=32618, mmap=True)
+    with pytest.raises(ValueError):
+        read(very_small_las, to_crs=32618)
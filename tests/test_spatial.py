@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from jaklas import spatial
+
+xy = np.random.random((1000, 2)) * 10
+
+# a "U" shape, concave
+polygon_u = [(0, 0), (10, 0), (10, 10), (7, 10), (7, 3), (3, 3), (3, 10), (0, 10)]
+
+
+def test_polygon_mask_square():
+    square = [(2, 2), (6, 2), (6, 6), (2, 6)]
+    mask = spatial.polygon_mask(xy[:, 0], xy[:, 1], square)
+    expected = np.all((xy > 2) & (xy < 6), axis=1)
+    assert np.array_equal(mask, expected)
+
+
+def test_polygon_mask_concave():
+    mask = spatial.polygon_mask(xy[:, 0], xy[:, 1], polygon_u)
+    in_notch = (xy[:, 0] > 3) & (xy[:, 0] < 7) & (xy[:, 1] > 3)
+    assert np.array_equal(mask, ~in_notch)
+
+
+def test_mask_bbox():
+    z = np.random.random(1000)
+    mask = spatial.mask(xy[:, 0], xy[:, 1], z, bbox=(1, 1, 0.5, 4, 5, 1))
+    expected = (
+        (xy[:, 0] >= 1) & (xy[:, 0] <= 4) & (xy[:, 1] >= 1) & (xy[:, 1] <= 5) & (z >= 0.5)
+    )
+    assert np.array_equal(mask, expected)
+
+
+def test_overlaps():
+    assert spatial.overlaps((0, 0, 0), (1, 1, 1), bbox=(0.5, 0.5, 2, 2))
+    assert spatial.overlaps((0, 0, 0), (1, 1, 1), bbox=(1, 1, 2, 2))
+    assert not spatial.overlaps((0, 0, 0), (1, 1, 1), bbox=(0, 0, 2, 1, 1, 3))
+    assert not spatial.overlaps((0, 0, 0), (1, 1, 1), polygon=[(2, 2), (3, 2), (3, 3)])
+
+
+def test_wrong_bbox():
+    with pytest.raises(ValueError):
+        spatial.bbox_bounds((0, 0, 1))
+
+
+def test_contains():
+    assert spatial.contains((1, 1, 0), (2, 2, 1), bbox=(0, 0, 2, 2))
+    assert not spatial.contains((1, 1, 0), (3, 2, 1), bbox=(0, 0, 2, 2))
+
+
+@pytest.mark.parametrize("curve", ["morton", "hilbert"])
+def test_curve_order(curve):
+    x, y = np.meshgrid(np.arange(16.0), np.arange(16.0))
+    order = spatial.curve_order(x.ravel(), y.ravel(), curve, bits=4)
+    assert sorted(order) == list(range(256))
+    steps = np.abs(np.diff(x.ravel()[order])) + np.abs(np.diff(y.ravel()[order]))
+    if curve == "hilbert":
+        # the hilbert curve only goes to neighbor cells
+        assert np.all(steps == 1)
+    # each quadrant is visited before the next one
+    quadrants = (x.ravel()[order] >= 8) * 2 + (y.ravel()[order] >= 8)
+    assert np.count_nonzero(np.diff(quadrants)) == 3
+
+
+def test_curve_order_wrong_curve():
+    with pytest.raises(ValueError):
+        spatial.curve_order(xy[:, 0], xy[:, 1], "peano")
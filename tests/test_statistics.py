@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import laspy
+import numpy as np
+import pytest
+
+import jaklas
+from jaklas import Stats
+
+TEMP_DIR = Path(__file__).parent / "temp"
+TEST_DATA = Path(__file__).parent / "data"
+
+rng = np.random.default_rng(0)
+
+
+def _write_tiles(n_tiles=3, n_points=30_000):
+    paths, datas = [], []
+    for n in range(n_tiles):
+        data = {
+            "xyz": rng.random((n_points, 3)) * 100 + (n * 100, 0, 0),
+            "intensity": rng.integers(0, 1000, n_points).astype("u2"),
+            "classification": rng.integers(0, 10, n_points).astype("u1"),
+        }
+        path = TEMP_DIR / f"tile_{n}.laz"
+        jaklas.write(data, path, scale=(0.01,) * 3)
+        paths.append(path)
+        # compare with the quantized values of the files
+        datas.append(jaklas.read(path, combine_xyz=False))
+    return paths, datas
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_stats(workers):
+    paths, datas = _write_tiles()
+    result = jaklas.stats(paths, cell_size=10, workers=workers, chunk_size=7_000)
+
+    n_points = sum(len(data["x"]) for data in datas)
+    assert result.point_count == n_points
+    for dim in ["x", "z", "intensity", "classification"]:
+        values = np.concatenate([data[dim] for data in datas])
+        assert result.min[dim] == values.min()
+        assert result.max[dim] == values.max()
+        assert np.isclose(result.mean[dim], values.mean())
+
+    classification = np.concatenate([data["classification"] for data in datas])
+    assert np.array_equal(
+        result.classification, np.bincount(classification, minlength=256)
+    )
+    assert result.return_number[0] == n_points
+
+    x = np.concatenate([data["x"] for data in datas])
+    y = np.concatenate([data["y"] for data in datas])
+    first = np.floor(x.min() / 10), np.floor(y.min() / 10)
+    assert result.density_origin == (first[0] * 10, first[1] * 10)
+    assert result.density.sum() == n_points
+    inside = (x >= 120) & (x < 130) & (y >= 40) & (y < 50)
+    assert result.density[int(12 - first[0]), int(4 - first[1])] == np.sum(inside)
+
+
+def test_stats_dimensions():
+    paths, datas = _write_tiles(n_tiles=1)
+    result = jaklas.stats(str(paths[0]), dimensions=["z", "classification"], cell_size=50)
+    assert sorted(result.min) == ["classification", "z"]
+    assert result.return_number is None
+    assert result.classification.sum() == result.point_count
+    assert result.density.sum() == result.point_count
+
+    result = jaklas.stats(paths, dimensions=["intensity"])
+    assert sorted(result.min) == ["intensity"]
+    assert result.density is None and result.classification is None
+    with pytest.raises(KeyError):
+        jaklas.stats(paths, dimensions=["red"])
+
+
+def test_stats_merge():
+    paths, _ = _write_tiles(n_tiles=2)
+    first = jaklas.stats(paths[0], cell_size=25)
+    second = jaklas.stats(paths[1], cell_size=25)
+    merged = first + second
+    expected = jaklas.stats(paths, cell_size=25)
+
+    assert merged.point_count == expected.point_count
+    assert np.array_equal(merged.density, expected.density)
+    assert np.array_equal(merged.classification, expected.classification)
+    assert merged.mean == pytest.approx(expected.mean)
+    assert (Stats(cell_size=25) + first).max == first.max
+    with pytest.raises(ValueError):
+        first.merge(Stats(cell_size=1))
+
+
+def test_stats_extra_dimensions():
+    las = laspy.read(str(TEST_DATA / "very_small.las"))
+    result = jaklas.stats(TEST_DATA / "very_small.las")
+    assert result.point_count == len(las.points)
+    assert np.isclose(result.mean["z"], np.mean(las.z))
+    assert result.max["gps_time"] == np.max(las.gps_time)
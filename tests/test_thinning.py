@@ -0,0 +1,65 @@
+import laspy
+import numpy as np
+import pytest
+
+from jaklas.thinning import Thinning
+
+
+def _points(xyz):
+    header = laspy.LasHeader(point_format=6, version="1.4")
+    header.scales = np.array([0.001, 0.001, 0.001])
+    header.offsets = np.zeros(3)
+    points = laspy.ScaleAwarePointRecord.zeros(len(xyz), header=header)
+    points.x, points.y, points.z = xyz.T
+    points.intensity = np.arange(len(xyz))
+    return points
+
+
+def _chunks(points, size):
+    return [points[start : start + size] for start in range(0, len(points), size)]
+
+
+def test_every_nth():
+    points = _points(np.random.random((100, 3)))
+    thinning = Thinning(every_nth=7)
+    kept = [thinning.filter(chunk) for chunk in _chunks(points, 30)]
+    intensity = np.concatenate([np.asarray(chunk.intensity) for chunk in kept])
+    assert np.array_equal(intensity, np.arange(0, 100, 7))
+
+
+def test_voxel():
+    xyz = np.random.random((10_000, 3)) * 10
+    points = _points(xyz)
+    thinning = Thinning(voxel_size=2, min_=(0, 0, 0), max_=(10, 10, 10))
+    kept = [thinning.filter(chunk) for chunk in _chunks(points, 1000)]
+    intensity = np.concatenate([np.asarray(chunk.intensity) for chunk in kept])
+
+    # the first point of each voxel, in the order of the points
+    cells = np.floor(np.asarray([points.x, points.y, points.z]).T / 2)
+    _, first = np.unique(cells, axis=0, return_index=True)
+    assert np.array_equal(intensity, np.sort(first))
+
+
+def test_voxel_centroid():
+    xyz = np.array([[0.1, 0.1, 0.1], [5.1, 0.1, 0.1], [0.3, 0.5, 0.1], [5.3, 0.1, 0.7]])
+    points = _points(xyz)
+    thinning = Thinning(voxel_size=1, centroid=True, max_=(6, 1, 1))
+    kept = [thinning.filter(chunk) for chunk in _chunks(points, 1)]
+    kept = laspy.ScaleAwarePointRecord(
+        np.concatenate([chunk.array for chunk in kept]),
+        points.point_format,
+        points.scales,
+        points.offsets,
+    )
+    kept = thinning.finish(kept)
+    assert list(kept.intensity) == [0, 1]
+    assert np.allclose(kept.x, [0.2, 5.2]) and np.allclose(kept.z, [0.1, 0.4])
+
+
+def test_wrong_arguments():
+    with pytest.raises(ValueError):
+        Thinning(every_nth=0)
+    with pytest.raises(ValueError):
+        Thinning(centroid=True)
+    with pytest.raises(ValueError):
+        Thinning(voxel_size=1e-9, max_=(1e6, 1e6, 1e6))
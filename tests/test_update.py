@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import laspy
+import numpy as np
+import pytest
+from laspy.vlrs.vlrlist import VLRList
+
+import jaklas
+from jaklas import laz
+from jaklas.header import Header
+
+TEMP_DIR = Path(__file__).parent / "temp"
+
+n_points = 120_000
+rng = np.random.default_rng(42)
+data = {
+    "xyz": rng.random((n_points, 3)) * 100,
+    "intensity": np.arange(n_points, dtype="u2"),
+    "classification": np.full(n_points, 1, dtype="u1"),
+    "new_stuff": np.arange(n_points, dtype="f4"),
+}
+
+
+@pytest.mark.parametrize("point_format", [1, 6])
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_update(suffix, point_format):
+    path = TEMP_DIR / f"updated{suffix}"
+    jaklas.write(data, path, point_format=point_format)
+    jaklas.update(path, {"return_number": 1, "number_of_returns": 2})
+    points_by_return = jaklas.read_header(path).points_by_return
+    assert list(points_by_return[:2]) == [n_points, 0]
+
+    mask = data["xyz"][:, 2] < 30
+    classification = rng.integers(2, 20, np.count_nonzero(mask)).astype("u1")
+    jaklas.update(path, {"classification": classification}, mask=mask)
+    jaklas.update(path, {"new_stuff": -1.5, "return_number": 2}, mask=~mask)
+
+    f = laspy.read(str(path))
+    expected = data["classification"].copy()
+    expected[mask] = classification
+    assert np.array_equal(f.classification, expected)
+    assert np.array_equal(f.return_number, np.where(mask, 1, 2))
+    assert np.array_equal(f.new_stuff, np.where(mask, data["new_stuff"], -1.5))
+    # the other dimensions and fields of the same bytes are unchanged
+    assert np.all(f.number_of_returns == 2)
+    assert np.array_equal(f.intensity, data["intensity"])
+    assert not np.any(f.synthetic)
+    assert np.allclose(f.xyz, data["xyz"], atol=0.001)
+
+    points_by_return = jaklas.read_header(path).points_by_return
+    assert list(points_by_return[:2]) == [np.sum(mask), np.sum(~mask)]
+
+    jaklas.update(path, {"user_data": np.arange(n_points) % 200})
+    assert np.array_equal(laspy.read(str(path)).user_data, np.arange(n_points) % 200)
+
+
+def test_update_laz_chunks():
+    path = TEMP_DIR / "updated.laz"
+    jaklas.write(data, path)
+    with open(path, "rb") as f:
+        before = laz.read_chunk_table(path, Header(f))
+
+    mask = np.zeros(n_points, dtype=bool)
+    mask[60_000:60_010] = True
+    jaklas.update(path, {"intensity": 7}, mask=mask)
+
+    with open(path, "rb") as f:
+        after = laz.read_chunk_table(path, Header(f))
+    # only the second chunk was compressed again
+    assert after[0] == before[0] and after[2] == before[2]
+    intensity = jaklas.read(path, other_dims=["intensity"])["intensity"]
+    assert np.array_equal(intensity, np.where(mask, 7, data["intensity"]))
+
+
+def test_update_laz_evlrs():
+    las = laspy.create(point_format=6, file_version="1.4")
+    las.x = np.arange(1000, dtype="d")
+    las.y = las.z = np.zeros(1000)
+    las.evlrs = VLRList([laspy.VLR("test", 1, "evlr", b"some data")])
+    path = TEMP_DIR / "evlrs.laz"
+    las.write(str(path))
+
+    jaklas.update(path, {"classification": 5})
+
+    f = laspy.read(str(path))
+    assert np.all(f.classification == 5)
+    assert f.evlrs[0].record_data == b"some data"
+
+
+def test_update_errors():
+    path = TEMP_DIR / "updated.las"
+    jaklas.write(data, path, point_format=1)
+    with pytest.raises(ValueError):
+        jaklas.update(path, {"red": 1})
+    with pytest.raises(ValueError):
+        jaklas.update(path, {"x": 1.0})
+    with pytest.raises(ValueError):
+        jaklas.update(path, {"intensity": [1, 2, 3]})
+    with pytest.raises(ValueError):
+        jaklas.update(path, {"intensity": 1}, mask=np.ones(10, dtype=bool))
+    with pytest.raises(OverflowError):
+        jaklas.update(path, {"classification": 32})
+    with pytest.raises(OverflowError):
+        jaklas.update(path, {"intensity": -1})
+    assert np.array_equal(laspy.read(str(path)).intensity, data["intensity"])
+
+    copc_path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, copc_path)
+    with pytest.raises(ValueError):
+        jaklas.update(copc_path, {"classification": 2})
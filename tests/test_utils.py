@@ -29,3 +29,11 @@ def test_sort(data):
     sorted_data = utils.sort(data, "gps_time")
     assert not np.allclose(data["x"], sorted_data["x"])
     assert np.allclose(np.sort(data["gps_time"]), sorted_data["gps_time"])
+
+
+def test_groups():
+    unique, indices = utils.groups([3, 1, 3, 2, 1])
+    assert list(unique) == [1, 2, 3]
+    assert [list(i) for i in indices] == [[1, 4], [3], [0, 2]]
+    unique, indices = utils.groups([])
+    assert len(unique) == 0 and indices == []
@@ -1,3 +1,4 @@
+import importlib
 from copy import deepcopy
 from pathlib import Path
 
@@ -273,3 +274,438 @@ def test_write_crs():
     wkt = f.vlrs.get("WktCoordinateSystemVlr")[0].string
     expected_wkt = pyproj.CRS.from_epsg(2950).to_wkt()
     assert expected_wkt == wkt
+
+
+def _batches(data, size=30):
+    n_points = len(data["x"])
+    for start in range(0, n_points, size):
+        yield {k: v[start : start + size] for k, v in data.items()}
+
+
+@pytest.mark.parametrize("output", [TEMP_OUTPUT, TEMP_OUTPUT_LAZ])
+def test_writer_streaming(output):
+    data = point_data_gps_time
+    with jaklas.Writer(output, scale=(0.0001,) * 3, offset=(50, 50, 50)) as writer:
+        assert not writer.two_pass
+        for batch in _batches(data):
+            writer.write(batch)
+    f = laspy.read(str(output))
+    assert f.header.point_count == 100
+    assert f.point_format.id == 1
+    assert np.allclose(f.header.scales, 0.0001)
+    assert np.allclose(f.header.offsets, 50)
+    assert np.allclose(f.header.mins, xyz.min(axis=0), atol=0.0001)
+    assert np.allclose(f.header.maxs, xyz.max(axis=0), atol=0.0001)
+    assert np.allclose(f.x, data["x"], atol=0.0001)
+    assert np.allclose(f.y, data["y"], atol=0.0001)
+    assert np.allclose(f.z, data["z"], atol=0.0001)
+    assert np.allclose(f.gps_time, data["gps_time"])
+    assert np.allclose(f.classification, data["classification"])
+
+
+def test_writer_two_pass():
+    data = deepcopy(point_data_large_classification)
+    data["x"] = data["x"] + 320000
+    data["new_stuff"] = (np.random.random(100) * 100).astype("u1")
+    # the large classifications are not in the first batch
+    data["classification"] = data["classification"].copy()
+    data["classification"][:30] = 1
+    data["classification"][-1] = 200
+    with jaklas.Writer(TEMP_OUTPUT) as writer:
+        assert writer.two_pass
+        for batch in _batches(data):
+            writer.write(batch)
+        assert not TEMP_OUTPUT.exists()
+    jaklas.write(data, TEMP_DIR / "expected.las")
+    f = laspy.read(str(TEMP_OUTPUT))
+    expected = laspy.read(str(TEMP_DIR / "expected.las"))
+    assert f.point_format.id == expected.point_format.id == 6
+    assert np.allclose(f.header.scales, expected.header.scales)
+    assert np.allclose(f.header.offsets, expected.header.offsets)
+    assert np.allclose(f.x, data["x"], atol=0.0001)
+    assert np.allclose(f.classification, data["classification"])
+    assert np.allclose(f.new_stuff, data["new_stuff"])
+    assert f.new_stuff.dtype == np.dtype("u1")
+    assert not any(p.name.startswith(".jaklas") for p in TEMP_DIR.iterdir())
+
+
+def test_writer_xyz_offset():
+    xyz_offset = (3e5, 5e6, 100)
+    with jaklas.Writer(TEMP_OUTPUT, xyz_offset=xyz_offset, scale=(0.001,) * 3) as w:
+        assert not w.two_pass
+        w.write(point_data_pandas)
+    f = laspy.read(str(TEMP_OUTPUT))
+    assert np.allclose(f.header.offsets, xyz_offset)
+    assert np.allclose(f.x, point_data["x"] + xyz_offset[0], atol=0.001)
+
+
+def test_writer_empty():
+    with jaklas.Writer(TEMP_OUTPUT):
+        pass
+    f = laspy.read(str(TEMP_OUTPUT))
+    assert f.header.point_count == 0
+
+
+def test_writer_closed():
+    writer = jaklas.Writer(TEMP_OUTPUT, scale=(0.001,) * 3, offset=(0, 0, 0))
+    writer.write(point_data)
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write(point_data)
+
+
+@pytest.mark.parametrize("output", [TEMP_OUTPUT, TEMP_OUTPUT_LAZ])
+def test_writer_batch_dtypes(output):
+    xyz = np.random.random((2000, 3)) * 100
+    extra = np.random.random(2000)
+    with jaklas.Writer(output, scale=(0.001,) * 3, offset=(0, 0, 0)) as writer:
+        writer.write({"xyz": xyz[:1000], "ex": extra[:1000].astype("f4")})
+        # the extra dimension is cast to the type of the first batch
+        writer.write({"xyz": xyz[1000:], "ex": extra[1000:]})
+    f = laspy.read(str(output))
+    assert f.header.point_count == 2000
+    assert f.ex.dtype == np.dtype("f4")
+    assert np.allclose(f.xyz, xyz, atol=0.001)
+    assert np.allclose(f.ex, extra.astype("f4"))
+
+
+def _large_point_data(n_points=120_000):
+    rng = np.random.default_rng(0)
+    return {
+        "xyz": rng.random((n_points, 3)) * 100,
+        "intensity": rng.integers(0, 1000, n_points).astype("u2"),
+        "gps_time": np.arange(n_points) * 0.001,
+    }
+
+
+def test_write_workers():
+    data = _large_point_data()
+    jaklas.write(data, TEMP_OUTPUT_LAZ, workers=2)
+    jaklas.write(data, TEMP_DIR / "expected.laz")
+    f = laspy.read(str(TEMP_OUTPUT_LAZ))
+    expected = laspy.read(str(TEMP_DIR / "expected.laz"))
+    assert f.header.point_count == 120_000
+    assert np.allclose(f.header.mins, expected.header.mins)
+    assert np.allclose(f.header.maxs, expected.header.maxs)
+    assert np.array_equal(f.points.array, expected.points.array)
+    # the compressed points are the same as with a single process
+    with open(TEMP_OUTPUT_LAZ, "rb") as a, open(TEMP_DIR / "expected.laz", "rb") as b:
+        a.seek(f.header.offset_to_point_data)
+        b.seek(expected.header.offset_to_point_data)
+        assert a.read() == b.read()
+
+
+def test_writer_workers():
+    data = _large_point_data()
+    with jaklas.Writer(
+        TEMP_OUTPUT_LAZ, scale=(0.001,) * 3, offset=(0, 0, 0), workers=2
+    ) as writer:
+        for start in range(0, 120_000, 35_000):
+            writer.write({k: v[start : start + 35_000] for k, v in data.items()})
+    f = laspy.read(str(TEMP_OUTPUT_LAZ))
+    assert f.header.point_count == 120_000
+    assert np.allclose(f.xyz, data["xyz"], atol=0.001)
+    assert np.allclose(f.gps_time, data["gps_time"])
+
+
+def test_writer_workers_empty():
+    with jaklas.Writer(TEMP_OUTPUT_LAZ, workers=2):
+        pass
+    f = laspy.read(str(TEMP_OUTPUT_LAZ))
+    assert f.header.point_count == 0
+
+
+@pytest.mark.parametrize("output", [TEMP_OUTPUT, TEMP_OUTPUT_LAZ])
+def test_write_blocks(monkeypatch, output):
+    data = {**point_data_gps_time_color, "new_stuff": np.arange(100, dtype="i2")}
+    jaklas.write(data, TEMP_DIR / f"expected{output.suffix}")
+    monkeypatch.setattr(importlib.import_module("jaklas.write"), "_BLOCK_SIZE", 30)
+    jaklas.write(data, output)
+    f = laspy.read(str(output))
+    expected = laspy.read(str(TEMP_DIR / f"expected{output.suffix}"))
+    assert f.header.point_count == 100
+    assert np.array_equal(f.points.array, expected.points.array)
+    assert np.allclose(f.header.mins, expected.header.mins)
+    assert np.allclose(f.header.maxs, expected.header.maxs)
+
+
+def test_write_overflow():
+    with pytest.raises(OverflowError):
+        jaklas.write(point_data_large_classification, TEMP_OUTPUT, point_format=1)
+    with pytest.raises(OverflowError):
+        jaklas.write(point_data, TEMP_OUTPUT, scale=(1e-9,) * 3, xyz_offset=(0, 0, 0))
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_write_tiled(suffix):
+    n_points = 1000
+    data = pd.DataFrame(
+        {
+            "x": np.random.random(n_points) * 300,
+            "y": np.random.random(n_points) * 200,
+            "z": np.random.random(n_points),
+            "intensity": np.arange(n_points, dtype="u2"),
+            "new_stuff": np.arange(n_points, dtype="f4"),
+        }
+    )
+    output_dir = TEMP_DIR / "tiles"
+    paths = jaklas.write_tiled(
+        data,
+        output_dir,
+        tile_size=100,
+        name="{x:.0f}_{y:.0f}" + suffix,
+        workers=2,
+    )
+    assert sorted(paths) == [(c, r) for c in range(3) for r in range(2)]
+    assert paths[(2, 1)] == output_dir / f"200_100{suffix}"
+
+    headers = [jaklas.read_header(path) for path in paths.values()]
+    assert sum(h.point_count for h in headers) == n_points
+    assert all(h.scale == headers[0].scale for h in headers)
+    assert all(h.offset == headers[0].offset for h in headers)
+
+    for (col, row), path in paths.items():
+        tile = jaklas.read_pandas(path)
+        inside = (data.x // 100 == col) & (data.y // 100 == row)
+        expected = data[inside]
+        assert np.allclose(tile.x, expected.x, atol=0.0001)
+        assert np.array_equal(tile.new_stuff, expected.new_stuff)
+        header = jaklas.read_header(path)
+        assert np.allclose(header.min[0], expected.x.min(), atol=0.0001)
+        assert np.allclose(header.max[1], expected.y.max(), atol=0.0001)
+
+
+def test_write_tiled_origin():
+    data = {"xyz": np.array([[0.0, 0, 0], [10, 10, 1], [-1, 25, 2]])}
+    paths = jaklas.write_tiled(
+        data,
+        TEMP_DIR,
+        tile_size=(20, 10),
+        origin=(-5, 5),
+        name="{col}_{row}.las",
+    )
+    assert sorted(paths) == [(0, -1), (0, 0), (0, 2)]
+    assert jaklas.read_header(paths[(0, 2)]).point_count == 1
+
+
+def test_write_tiled_names():
+    data = {"xyz": np.random.random((1000, 3))}
+    # the corners 0.5 and 1.0 round to the same default name
+    with pytest.raises(ValueError):
+        jaklas.write_tiled(data, TEMP_DIR, tile_size=0.5)
+    assert not list(TEMP_DIR.glob("*.las"))
+
+    paths = jaklas.write_tiled(data, TEMP_DIR, tile_size=0.5, name="{x}_{y}.las")
+    assert len(paths) == 4
+    assert sum(jaklas.read_header(p).point_count for p in paths.values()) == 1000
+
+
+@pytest.mark.parametrize("spatial_order", ["morton", "hilbert"])
+def test_write_spatial_order(spatial_order):
+    data = _large_point_data()
+    output = TEMP_DIR / "temp.laz"
+    jaklas.write(data, output, spatial_order=spatial_order)
+
+    result = jaklas.read(output)
+    order = np.argsort(result["gps_time"])
+    assert np.allclose(result["xyz"][order], data["xyz"], atol=0.0001)
+    assert np.array_equal(result["intensity"][order], data["intensity"])
+    assert not np.array_equal(order, np.arange(len(order)))
+
+    chunk_size, bounds = jaklas.chunk_bounds.read(jaklas.read_header(output))
+    assert chunk_size == 50_000 and len(bounds) == 3
+    chunks = [result["xyz"][n : n + chunk_size] for n in range(0, 120_000, chunk_size)]
+    for chunk, chunk_min_max in zip(chunks, bounds):
+        assert np.all(chunk >= chunk_min_max[:3])
+        assert np.all(chunk <= chunk_min_max[3:])
+
+
+def test_write_arrow():
+    pa = pytest.importorskip("pyarrow")
+
+    n_points = 1000
+    data = {
+        "xyz": np.random.random((n_points, 3)) * 100,
+        "intensity": np.arange(n_points, dtype="u2"),
+        "gps_time": np.arange(n_points, dtype="f8"),
+        "new_stuff": np.arange(n_points, dtype="f4"),
+    }
+    xyz = pa.FixedSizeListArray.from_arrays(pa.array(data["xyz"].ravel()), 3)
+    table = pa.table(
+        {"xyz": xyz, **{k: v for k, v in data.items() if k != "xyz"}}
+    )
+
+    batches = table.to_batches(max_chunksize=300)
+    inputs = [
+        table,
+        pa.Table.from_batches(batches),
+        pa.RecordBatchReader.from_batches(table.schema, batches),
+    ]
+    for point_data in inputs:
+        jaklas.write(point_data, TEMP_OUTPUT_LAZ)
+        f = laspy.read(str(TEMP_OUTPUT_LAZ))
+        assert np.allclose(f.xyz, data["xyz"], atol=0.0001)
+        assert np.array_equal(f.intensity, data["intensity"])
+        assert np.array_equal(f.gps_time, data["gps_time"])
+        assert np.array_equal(f.new_stuff, data["new_stuff"])
+
+    with jaklas.Writer(TEMP_OUTPUT, scale=(0.001,) * 3, offset=(0, 0, 0)) as writer:
+        for batch in batches:
+            writer.write(batch)
+    f = laspy.read(str(TEMP_OUTPUT))
+    assert np.array_equal(f.gps_time, data["gps_time"])
+
+    nulls = table.set_column(1, "intensity", pa.array([None] * n_points, "uint16"))
+    with pytest.raises(ValueError):
+        jaklas.write(nulls, TEMP_OUTPUT)
+
+
+def test_write_source_crs():
+    data = {
+        "xyz": np.random.random((1000, 3)) * 1000 + (300_000, 5_040_000, 0),
+        "intensity": np.arange(1000, dtype="u2"),
+    }
+    jaklas.write(data, TEMP_OUTPUT, crs=32618, source_crs=2950)
+
+    f = laspy.read(str(TEMP_OUTPUT))
+    transformer = pyproj.Transformer.from_crs(2950, 32618, always_xy=True)
+    expected = np.stack(transformer.transform(*data["xyz"].T), axis=1)
+    assert np.allclose(f.xyz, expected, atol=0.001)
+    assert np.allclose(f.header.mins, expected.min(axis=0), atol=0.001)
+    assert f.header.parse_crs().to_epsg() == 32618
+
+    tiles = jaklas.write_tiled(
+        data,
+        TEMP_DIR / "tiles",
+        tile_size=500,
+        crs=32618,
+        source_crs=2950,
+        xyz_offset=(10, 0, 0),
+    )
+    expected = np.stack(transformer.transform(*(data["xyz"] + (10, 0, 0)).T), axis=1)
+    for (col, row), path in tiles.items():
+        xyz = laspy.read(str(path)).xyz
+        assert np.all(np.floor(xyz[:, 0] / 500) == col)
+    xyz = np.concatenate([laspy.read(str(path)).xyz for path in tiles.values()])
+    assert len(xyz) == 1000
+    assert np.allclose(np.sort(xyz[:, 0]), np.sort(expected[:, 0]), atol=0.001)
+
+    with pytest.raises(ValueError):
+        jaklas.write(data, TEMP_OUTPUT, source_crs=2950)
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_write_plan(suffix):
+    data = {**point_data_gps_time, "new_stuff": np.arange(100, dtype="f4")}
+    plan = jaklas.WritePlan.from_sample(data, crs=2950)
+    assert plan.point_format == 1
+    assert plan.extra_dimensions == ["new_stuff"]
+
+    for n in range(3):
+        sample = {k: v[n * 10 : n * 10 + 50] for k, v in data.items()}
+        planned = TEMP_DIR / f"planned{suffix}"
+        written = TEMP_DIR / f"written{suffix}"
+        plan.write(sample, planned)
+        jaklas.write(sample, written, crs=2950)
+
+        a, b = laspy.read(str(planned)), laspy.read(str(written))
+        assert a.header.point_format == b.header.point_format
+        assert a.header.point_count == 50
+        assert np.array_equal(a.header.scales, b.header.scales)
+        assert np.array_equal(a.header.offsets, b.header.offsets)
+        assert np.array_equal(a.header.mins, b.header.mins)
+        assert np.array_equal(a.header.maxs, b.header.maxs)
+        assert np.array_equal(a.points.array, b.points.array)
+        assert a.header.parse_crs().to_epsg() == 2950
+        assert jaklas.read_header(planned).point_count == 50
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_write_plan_cast(suffix):
+    data = {"xyz": xyz, "new_stuff": np.random.random(100).astype("f4")}
+    plan = jaklas.WritePlan.from_sample(data)
+    path = TEMP_DIR / f"planned{suffix}"
+    plan.write({**data, "new_stuff": data["new_stuff"].astype("f8")}, path)
+
+    f = laspy.read(str(path))
+    assert f.header.point_count == 100
+    assert f.new_stuff.dtype == np.dtype("f4")
+    assert np.array_equal(f.new_stuff, data["new_stuff"])
+    assert np.allclose(f.xyz, xyz, atol=0.001)
+
+
+def test_write_plan_scale():
+    plan = jaklas.WritePlan.from_sample(point_data_color_pandas, scale=(0.01,) * 3)
+    plan.write(point_data_color_pandas, TEMP_OUTPUT, xyz_offset=(1, 2, 3))
+    f = laspy.read(str(TEMP_OUTPUT))
+    assert f.header.point_format.id == 2
+    assert np.allclose(f.header.scales, 0.01)
+    assert np.allclose(f.header.offsets, (1, 2, 3))
+    assert np.allclose(f.x, point_data_color["x"] + 1, atol=0.005)
+    assert np.allclose(f.red, point_data_color["red"].astype("u2"))
+
+    with pytest.raises(ValueError):
+        plan.write({**point_data_color, "new_stuff": xyz[:, 0]}, TEMP_OUTPUT)
+    with pytest.raises(ValueError):
+        plan.write(point_data_color, TEMP_DIR / "a.copc.laz")
+
+
+@pytest.mark.parametrize("suffix", [".las", ".laz"])
+def test_append(suffix):
+    n_points = 120_000
+    data = {
+        "xyz": np.random.random((n_points, 3)) * 100,
+        "intensity": np.arange(n_points, dtype="u2"),
+        "new_stuff": np.arange(n_points, dtype="f4"),
+    }
+    path = TEMP_DIR / f"appended{suffix}"
+    jaklas.write(data, path, scale=(0.001,) * 3, spatial_order="hilbert")
+
+    appended = {k: v[:70_000] for k, v in data.items()}
+    appended["xyz"] = appended["xyz"] + (50, 0, 0)
+    appended["new_stuff"] = appended["new_stuff"].astype("f8")
+    jaklas.append(appended, path)
+    df = pd.DataFrame(data["xyz"][:10], columns=["x", "y", "z"])
+    df["intensity"] = data["intensity"][:10]
+    df["new_stuff"] = data["new_stuff"][:10]
+    jaklas.append(df, path)
+
+    f = laspy.read(str(path))
+    assert f.header.point_count == n_points + 70_010
+    assert jaklas.read_header(path).point_count == n_points + 70_010
+    assert np.allclose(f.header.maxs[0], appended["xyz"][:, 0].max(), atol=0.001)
+    assert np.allclose(f.xyz[n_points:-10], appended["xyz"], atol=0.001)
+    assert np.array_equal(f.new_stuff[n_points:-10], appended["new_stuff"])
+    assert np.array_equal(f.intensity[-10:], data["intensity"][:10])
+
+    # the chunk bounds don't cover the appended points anymore
+    inside = jaklas.read(path, bbox=(120, -10, 200, 110), other_dims=[])
+    assert len(inside["xyz"]) == np.sum(np.asarray(f.x) >= 120)
+
+    if suffix == ".laz":
+        result = jaklas.read(path, workers=2, other_dims=[])
+        assert np.allclose(result["xyz"], f.xyz)
+
+
+def test_append_wrong_dimensions():
+    data = {"xyz": xyz, "gps_time": gps_time, "intensity": intensity}
+    jaklas.write(data, TEMP_OUTPUT)
+    with pytest.raises(ValueError):
+        jaklas.append({**data, "red": intensity}, TEMP_OUTPUT)
+    with pytest.raises(ValueError):
+        jaklas.append({**data, "new_stuff": intensity}, TEMP_OUTPUT)
+    with pytest.raises(OverflowError):
+        jaklas.append({**data, "xyz": xyz + 1e6}, TEMP_OUTPUT)
+    assert laspy.read(str(TEMP_OUTPUT)).header.point_count == 100
+
+    copc_path = TEMP_DIR / "temp.copc.laz"
+    jaklas.write(data, copc_path)
+    with pytest.raises(ValueError):
+        jaklas.append(data, copc_path)
+
+    las = laspy.create(point_format=8, file_version="1.4")
+    las.x, las.y, las.z = xyz.T
+    las.write(str(TEMP_OUTPUT))
+    with pytest.raises(ValueError, match="point format 8"):
+        jaklas.append({"xyz": xyz}, TEMP_OUTPUT)
+    assert laspy.read(str(TEMP_OUTPUT)).header.point_count == 100